@@ -7,7 +7,6 @@ FontAuditor_Mac_V3.py
 import os
 import csv
 import re
-import hashlib
 import gc
 from pathlib import Path
 from datetime import datetime
@@ -21,29 +20,26 @@ def install_requirements():
         os.system('pip3 install --upgrade fonttools tqdm -q')
 
 install_requirements()
-from fontTools.ttLib import TTFont
 from tqdm import tqdm
-
-def get_file_md5(file_path):
-    hash_md5 = hashlib.md5()
-    try:
-        with open(file_path, "rb") as f:
-            for chunk in iter(lambda: f.read(4096), b""):
-                hash_md5.update(chunk)
-        return hash_md5.hexdigest()
-    except Exception:
-        return "MD5_Error"
-
-def get_clean_meta(name_table, name_id):
-    # 嘗試不同編碼紀錄 (ID4: Full Name, ID1: Family Name)
-    record = name_table.getName(name_id, 3, 1, 1033) or \
-             name_table.getName(name_id, 1, 0, 0) or \
-             name_table.getName(name_id, 3, 1, 1028)
-    if not record: return "N/A"
+from checkpoint import open_checkpoint
+from hasher import hash_files
+from hash_cache import HashCache
+from sfnt_reader import NAME_PREFERENCES, parse_faces
+from walker import prefetch, walk_files
+
+def get_clean_meta(font, name_id):
+    # 嘗試不同編碼紀錄 (ID4: Full Name, ID1: Family Name)；順序為 (3,1,1033) → (1,0,0) → (3,1,1028)
     try:
-        return re.sub(r'\s+', ' ', record.toUnicode()).strip()
-    except:
+        text = font.name(name_id, *NAME_PREFERENCES)
+    except UnicodeDecodeError:
         return "Encoding Error"
+    if text is None: return "N/A"
+    return re.sub(r'\s+', ' ', text).strip()
+
+def read_metas(buf):
+    # 每個字型 (.ttc 集合內各一筆) 的 [全名, 家族, 版本]；直接解析雜湊時已映射的緩衝區
+    return [[get_clean_meta(font, 4), get_clean_meta(font, 1), get_clean_meta(font, 5)]
+            for font in parse_faces(buf)]
 
 def run_audit():
     print("=== macOS 字體深度盤點工具 V3 (相容性修正版) ===")
@@ -60,38 +56,36 @@ def run_audit():
     report_folder = Path.home() / "Desktop/Font_Audit_Reports"
     report_folder.mkdir(parents=True, exist_ok=True)
     csv_file = report_folder / f"Font_Inventory_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv"
+    # 檢查點：每個盤點完成的檔案附加記錄其 Metadata，中斷後重跑直接沿用，不再開啟字體
+    checkpoint = open_checkpoint('FontAuditor_Mac', scan_path)
 
-    fieldnames = ['狀態 (Status)', 'MD5_Hash', '字體全名 (ID4)', '字體家族 (ID1)', '版本 (ID5)', '檔案大小(MB)', '原始路徑', '衝突來源']
+    fieldnames = ['狀態 (Status)', 'MD5_Hash', '字型編號 (Face)', '字體全名 (ID4)', '字體家族 (ID1)', '版本 (ID5)', '檔案大小(MB)', '原始路徑', '衝突來源']
     font_exts = {'.ttf', '.otf', '.ttc', '.dfont'}
     
-    print("🔍 正在檢索檔案結構...")
-    file_list = []
-    for p in scan_path.rglob('*'):
-        try:
-            if p.is_file() and p.suffix.lower() in font_exts and not p.name.startswith('._'):
-                file_list.append(p)
-        except:
-            continue
-
-    total_files = len(file_list)
-    if total_files == 0:
-        print("📭 找不到字體檔案。")
-        return
+    # 背景走訪 → 雜湊 → 寫報表同時進行，不先建立完整檔案清單
+    print("🔍 正在檢索並盤點字體檔案...")
+    file_list = prefetch(walk_files(scan_path, exts=font_exts))
 
+    total_files = 0
     seen_hashes = {}
     duplicate_count = 0
     error_count = 0
 
-    with open(csv_file, 'w', newline='', encoding='utf-8-sig') as f:
+    # 雜湊快取：字體庫多半不變動，重跑時只需重新計算新增或修改過的檔案
+    with open(csv_file, 'w', newline='', encoding='utf-8-sig') as f, HashCache() as cache, checkpoint:
         writer = csv.DictWriter(f, fieldnames=fieldnames)
         writer.writeheader()
 
-        with tqdm(total=total_files, desc="盤點進度", unit="file", colour='green') as pbar:
-            for file_path in file_list:
-                font = None
+        with tqdm(desc="盤點進度", unit="file", colour='green') as pbar:
+            # 報表欄位為 MD5，因此指定 md5 演算法；雜湊由執行緒池並行預先計算
+            # 每個檔案只讀取一次：同一份 mmap 緩衝區先算 MD5 再解析 name 表；
+            # 檢查點中已有結果的檔案不解析，雜湊也由檢查點提供，完全不開啟字體
+            for rec, file_hash, parsed in hash_files(file_list, algorithm="md5", cache=checkpoint.hashes(cache),
+                                                     parse=read_metas, parse_when=lambda r: r.path not in checkpoint):
+                file_path = Path(rec.path)
                 try:
-                    # 第一階段：計算 MD5 (這部分你之前的結果顯示是成功的)
-                    file_hash = get_file_md5(file_path)
+                    # 第一階段：取得 MD5 (讀取失敗時標記為 MD5_Error)
+                    file_hash = file_hash or "MD5_Error"
                     
                     status = "Unique"
                     conflict_source = ""
@@ -103,20 +97,29 @@ def run_audit():
                         seen_hashes[file_hash] = str(file_path)
 
                     # 第二階段：讀取 Metadata (已移除相容性問題參數)
-                    # 只保留最基本的參數以確保舊版 fontTools 也能跑
-                    font = TTFont(str(file_path), fontNumber=0, lazy=True)
-                    names = font['name']
-
-                    writer.writerow({
-                        '狀態 (Status)': status,
-                        'MD5_Hash': file_hash,
-                        '字體全名 (ID4)': get_clean_meta(names, 4),
-                        '字體家族 (ID1)': get_clean_meta(names, 1),
-                        '版本 (ID5)': get_clean_meta(names, 5),
-                        '檔案大小(MB)': round(file_path.stat().st_size / (1024 * 1024), 2),
-                        '原始路徑': str(file_path),
-                        '衝突來源': conflict_source
-                    })
+                    # 上次中斷前已盤點過的檔案直接沿用檢查點中的結果
+                    metas = checkpoint.result(rec.path)
+                    if metas and isinstance(metas[0], str):
+                        metas = [metas]  # 舊版檢查點只記錄第一個字型
+                    if metas is None:
+                        # 只解析 name 表，特殊格式才退回 fontTools；讀取或解析失敗時 parsed 為例外物件
+                        if isinstance(parsed, Exception):
+                            raise parsed
+                        metas = parsed
+                        checkpoint.mark(rec.path, metas)
+
+                    for face, meta in enumerate(metas):
+                        writer.writerow({
+                            '狀態 (Status)': status,
+                            'MD5_Hash': file_hash,
+                            '字型編號 (Face)': face,
+                            '字體全名 (ID4)': meta[0],
+                            '字體家族 (ID1)': meta[1],
+                            '版本 (ID5)': meta[2],
+                            '檔案大小(MB)': round(rec.size / (1024 * 1024), 2),
+                            '原始路徑': str(file_path),
+                            '衝突來源': conflict_source
+                        })
                 except Exception as e:
                     error_count += 1
                     writer.writerow({
@@ -126,11 +129,17 @@ def run_audit():
                         '原始路徑': str(file_path)
                     })
                 finally:
-                    if font: font.close()
                     pbar.update(1)
                     if pbar.n % 50 == 0:
                         f.flush()
                         gc.collect()
+            total_files = pbar.n
+    checkpoint.complete()
+
+    if total_files == 0:
+        csv_file.unlink()
+        print("📭 找不到字體檔案。")
+        return
 
     print("-" * 50)
     print(f"✨ 盤點完成！")
@@ -1,22 +1,14 @@
 # -*- coding: utf-8 -*-
 import os
-import shutil
 import csv
-import hashlib
 from pathlib import Path
 from datetime import datetime
-from tqdm import tqdm
-
-def get_file_md5(file_path):
-    """計算 PDF 檔案的指紋"""
-    hash_md5 = hashlib.md5()
-    try:
-        with open(file_path, "rb") as f:
-            for chunk in iter(lambda: f.read(4096), b""):
-                hash_md5.update(chunk)
-        return hash_md5.hexdigest()
-    except:
-        return None
+from hash_cache import HashCache
+from actions import ACTION_LABELS, apply_action, prompt_action
+from journal import Journal, resume_interrupted
+from mover import MoveExecutor
+from dedup import print_stage_report, stream_duplicates
+from walker import prefetch, walk_files
 
 def run_pdf_cleanup():
     print("=== PDF 重複檔案自動清理工具 ===")
@@ -26,72 +18,62 @@ def run_pdf_cleanup():
     if not os.path.exists(scan_root):
         print("❌ 路徑不存在。")
         return
+    resume_interrupted(scan_root)
+    action = prompt_action()
 
     # 2. 設定回收區 (放在桌面)
     cleanup_folder = Path.home() / "Desktop" / f"PDF_Cleanup_Archive_{datetime.now().strftime('%Y%m%d_%H%M')}"
     cleanup_folder.mkdir(parents=True, exist_ok=True)
     log_file = cleanup_folder / "pdf_cleanup_log.csv"
 
-    # 3. 搜尋所有 PDF 檔案
-    all_files = [p for p in Path(scan_root).rglob('*') if p.suffix.lower() == '.pdf' and not p.name.startswith('._')]
-    
-    seen_hashes = {} # md5 -> first_path
-    actions = []
-    saved_size = 0 # 累計省下的空間
+    # 3. 串流處理：背景搜尋 PDF → 大小 → 頭尾取樣 → 完整指紋 → 搬移，發現重複即處理
+    all_files = prefetch(walk_files(scan_root, ignore_dirs={cleanup_folder.name}, exts={'.pdf'}))
+    stats = {}
+
+    print("🔍 正在掃描並比對 PDF 檔案...")
+
+    # 還原日誌：每個處置執行前先寫入，可事後還原 (python journal.py restore)
+    #    雜湊快取：大小與修改時間未變的檔案沿用上次的完整指紋
+    with HashCache() as cache, Journal.create(scan_root, 'PDFCleaner') as journal, open(log_file, 'w', encoding='utf-8-sig', newline='') as csvf:
+        writer = csv.DictWriter(csvf, fieldnames=['檔案名稱', '原始路徑', '原因', '處置', '大小(MB)'])
+        writer.writeheader()
 
-    print(f"🔍 正在掃描 {len(all_files)} 個 PDF 檔案...")
+        # 每組第一個掃描到的檔案保留，其餘發現重複！
+        # 搬移交給執行器：同名檔案預先編號、同裝置直接 rename，報表批次寫入
+        with MoveExecutor(cleanup_folder, writer, journal=journal) as mover:
+            for rec, keep in stream_duplicates(all_files, cache=cache, stats=stats):
+                f_path = Path(rec.path)
+                row = {
+                    '檔案名稱': f_path.name,
+                    '原始路徑': f_path,
+                    '原因': f"與 {keep} 內容完全相同",
+                    '處置': ACTION_LABELS[action],
+                    '大小(MB)': round(rec.size / (1024 * 1024), 2)
+                }
+                try:
+                    # 先逐位元組驗證內容相同，再搬移至回收區或以連結取代
+                    apply_action(action, f_path, keep, mover, row, rec.size)
+                except Exception as e:
+                    print(f"處置失敗: {f_path.name} - {str(e)}")
 
-    for f_path in tqdm(all_files, desc="比對指紋中"):
-        f_hash = get_file_md5(f_path)
-        if not f_hash: continue
+        for src, e in mover.errors:
+            print(f"搬移失敗: {os.path.basename(src)} - {str(e)}")
+        journal.finish()
+    moved, saved_size = mover.completed, mover.completed_bytes # 累計省下的空間
 
-        if f_hash in seen_hashes:
-            # 發現重複！
-            f_size = f_path.stat().st_size
-            saved_size += f_size
-            actions.append({
-                'file': f_path,
-                'reason': f"與 {seen_hashes[f_hash]} 內容完全相同",
-                'dest': cleanup_folder / f_path.name,
-                'size_mb': round(f_size / (1024 * 1024), 2)
-            })
-        else:
-            # 這是目前唯一的檔案
-            seen_hashes[f_hash] = str(f_path)
+    print_stage_report(stats)
 
-    # 4. 執行搬移
-    if not actions:
+    # 4. 結果
+    if not moved:
         print("✨ 恭喜！沒有發現任何重複的 PDF 檔案。")
         return
 
-    print(f"🚀 發現 {len(actions)} 個重複檔案，預計可清出 {round(saved_size / (1024*1024), 2)} MB")
-    
-    with open(log_file, 'w', encoding='utf-8-sig', newline='') as csvf:
-        writer = csv.DictWriter(csvf, fieldnames=['檔案名稱', '原始路徑', '原因', '大小(MB)'])
-        writer.writeheader()
-        
-        for act in actions:
-            try:
-                # 處理同名檔案搬移衝突
-                final_dest = act['dest']
-                if final_dest.exists():
-                    final_dest = cleanup_folder / f"{datetime.now().microsecond}_{act['file'].name}"
-                
-                shutil.move(str(act['file']), str(final_dest))
-                writer.writerow({
-                    '檔案名稱': act['file'].name,
-                    '原始路徑': act['file'],
-                    '原因': act['reason'],
-                    '大小(MB)': act['size_mb']
-                })
-            except Exception as e:
-                print(f"搬移失敗: {act['file'].name} - {str(e)}")
-
     print("-" * 50)
     print(f"✅ 清理完成！")
-    print(f"📦 已移出：{len(actions)} 個重複 PDF")
+    print(f"📦 已處置：{moved} 個重複 PDF ({ACTION_LABELS[action]})")
     print(f"💾 釋放空間：{round(saved_size / (1024*1024), 2)} MB")
     print(f"📂 詳情請見桌面資料夾：{cleanup_folder.name}")
+    print(f"⏪ 如需還原：python journal.py restore {journal.path.name}")
 
 if __name__ == "__main__":
     run_pdf_cleanup()
\ No newline at end of file
@@ -1,46 +1,84 @@
 
 # -*- coding: utf-8 -*-
 import os
-import hashlib
+import argparse
 from pathlib import Path
+from walker import walk_files
+from hasher import compare_pairs
+from hash_cache import HashCache
+from merkle import SIDECAR_NAME, build_tree, compare_trees
 
-def get_file_info(file_path):
-    """取得檔案的大小與 MD5 雜湊值"""
-    try:
-        stat = file_path.stat()
-        size = stat.st_size
-        # 對於大型專案，這裡可以先只比對大小以提升速度
-        # 若需要極度精確再啟用 MD5
-        return {"size": size, "path": file_path}
-    except Exception:
-        return None
+IGNORE_DIRS = {'.git', '__pycache__', '.DS_Store', 'node_modules', SIDECAR_NAME}
+
+def get_file_info(record):
+    """取得檔案的大小 (直接使用走訪時快取的 stat，不再額外呼叫 stat)"""
+    # 對於大型專案，這裡可以先只比對大小以提升速度
+    # 若需要極度精確，使用 --verify 只對大小相同的檔案逐區塊比對內容
+    return {"size": record.size, "path": Path(record.path)}
 
 def scan_directory(root_path, ignore_dirs=None):
     """掃描目錄並建立相對路徑映射表"""
     if ignore_dirs is None:
-        ignore_dirs = {'.git', '__pycache__', '.DS_Store', 'node_modules'}
+        ignore_dirs = IGNORE_DIRS
     
     data = {}
     root = Path(root_path).expanduser()
     
-    for p in root.rglob('*'):
-        # 檢查是否在忽略名單中
-        if any(part in ignore_dirs for part in p.parts):
-            continue
-            
-        if p.is_file():
-            # 使用「相對路徑」作為 Key，這是比對的關鍵
-            rel_path = p.relative_to(root)
-            data[rel_path] = get_file_info(p)
+    # 忽略名單中的目錄在走訪時即剪枝，不會進入
+    for rec in walk_files(root, ignore_dirs, skip_prefixes=()):
+        # 使用「相對路徑」作為 Key，這是比對的關鍵
+        rel_path = os.path.relpath(rec.path, root)
+        data[rel_path] = get_file_info(rec)
     return data, root
 
-def compare_projects(path_a, path_b):
+def compare_projects_merkle(path_a, path_b):
+    """依內容摘要比對：每個目錄的 Merkle 摘要存於側車索引，相同的子樹整棵略過"""
+    with HashCache() as cache:
+        tree_a = build_tree(path_a, IGNORE_DIRS, cache=cache)
+        tree_b = build_tree(path_b, IGNORE_DIRS, cache=cache)
+    
+    diff_report = []
+    stats = {}
+    for status, rel_p, size_a, size_b in compare_trees(tree_a, tree_b, stats):
+        if status == 'only_a':
+            diff_report.append(f"[僅存在 A] {rel_p}")
+        elif status == 'only_b':
+            diff_report.append(f"[僅存在 B] {rel_p}")
+        elif size_a == size_b:
+            diff_report.append(f"[內容差異] {rel_p} (大小相同，內容不同)")
+        else:
+            diff_report.append(f"[內容差異] {rel_p} (B比A大 {size_b - size_a} bytes)")
+    
+    print(f"🌳 略過 {stats['skipped_dirs']} 個相同子樹，重新雜湊 A {tree_a['rehashed']} / B {tree_b['rehashed']} 個檔案")
+    count_a = sum(len(node['files']) for node in tree_a['dirs'].values())
+    count_b = sum(len(node['files']) for node in tree_b['dirs'].values())
+    return diff_report, count_a, count_b
+
+def verify_same_size(data_a, data_b):
+    """只對兩邊都存在且大小相同的檔案並行比對內容，回傳內容不同 (或無法讀取) 的相對路徑集合"""
+    ties = [rel_p for rel_p, info in data_a.items()
+            if rel_p in data_b and info['size'] == data_b[rel_p]['size'] and info['size'] > 0]
+    pairs = ((data_a[rel_p]['path'], data_b[rel_p]['path']) for rel_p in ties)
+    mismatched = {}
+    for rel_p, (_, identical) in zip(ties, compare_pairs(pairs)):
+        if not identical:
+            mismatched[rel_p] = "無法讀取" if identical is None else "大小相同，內容不同"
+    print(f"🔬 逐區塊驗證 {len(ties)} 組大小相同的檔案，發現 {len(mismatched)} 組內容不同")
+    return mismatched
+
+def compare_projects(path_a, path_b, merkle=False, verify=False):
     print(f"🔍 正在掃描與比對...\nPath A: {path_a}\nPath B: {path_b}\n" + "-"*50)
     
+    if merkle:
+        diff_report, count_a, count_b = compare_projects_merkle(path_a, path_b)
+        print_report(diff_report, count_a, count_b)
+        return
+    
     data_a, root_a = scan_directory(path_a)
     data_b, root_b = scan_directory(path_b)
     
     all_rel_paths = sorted(set(data_a.keys()) | set(data_b.keys()))
+    mismatched = verify_same_size(data_a, data_b) if verify else {}
     
     diff_report = []
     
@@ -57,7 +95,12 @@ def compare_projects(path_a, path_b):
             if data_a[rel_p]['size'] != data_b[rel_p]['size']:
                 size_diff = data_b[rel_p]['size'] - data_a[rel_p]['size']
                 diff_report.append(f"[內容差異] {rel_p} (B比A大 {size_diff} bytes)")
+            elif rel_p in mismatched:
+                diff_report.append(f"[內容差異] {rel_p} ({mismatched[rel_p]})")
+
+    print_report(diff_report, len(data_a), len(data_b))
 
+def print_report(diff_report, count_a, count_b):
     # 輸出結果
     if not diff_report:
         print("✨ 兩個資料夾結構與內容完全一致！")
@@ -66,9 +109,16 @@ def compare_projects(path_a, path_b):
             print(line)
     
     print("-"*50)
-    print(f"掃描統計: A有 {len(data_a)} 檔案, B有 {len(data_b)} 檔案")
+    print(f"掃描統計: A有 {count_a} 檔案, B有 {count_b} 檔案")
 
 if __name__ == "__main__":
-    dir_a = input("請輸入資料夾 A 路徑: ").strip()
-    dir_b = input("請輸入資料夾 B 路徑: ").strip()
-    compare_projects(dir_a, dir_b)
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="比對兩個專案資料夾的差異")
+    parser.add_argument("dir_a", nargs="?", help="資料夾 A 路徑")
+    parser.add_argument("dir_b", nargs="?", help="資料夾 B 路徑")
+    parser.add_argument("--merkle", action="store_true", help="依內容摘要精確比對，略過完全相同的子目錄")
+    parser.add_argument("--verify", action="store_true", help="大小相同的檔案再逐區塊比對內容 (遇到差異立即停止)")
+    args = parser.parse_args()
+    
+    dir_a = args.dir_a or input("請輸入資料夾 A 路徑: ").strip()
+    dir_b = args.dir_b or input("請輸入資料夾 B 路徑: ").strip()
+    compare_projects(dir_a, dir_b, merkle=args.merkle, verify=args.verify)
\ No newline at end of file
@@ -1,36 +1,27 @@
 # -*- coding: utf-8 -*-
 import os
-import shutil
-import hashlib
 from pathlib import Path
 from datetime import datetime
 from tqdm import tqdm
-from collections import defaultdict
+from actions import ACTION_LABELS, apply_action, prompt_action
+from hash_cache import HashCache
+from journal import Journal, resume_interrupted
+from mover import MoveExecutor
+from dedup import print_stage_report, stream_duplicates
+from walker import prefetch, walk_files
+from file_index import FileIndex, merge_join
+from merkle import SIDECAR_NAME, build_tree, compare_trees
 
 # ----------------環境設定----------------
-IGNORE_LIST = {'.git', '__pycache__', '.DS_Store', 'node_modules', 'venv', '.idea'}
-
-def get_file_hash(file_path):
-    """計算檔案 MD5，增加緩衝區提升大檔案效率"""
-    hash_md5 = hashlib.md5()
-    try:
-        with open(file_path, "rb") as f:
-            for chunk in iter(lambda: f.read(65536), b""):
-                hash_md5.update(chunk)
-        return hash_md5.hexdigest()
-    except Exception:
-        return None
+IGNORE_LIST = {'.git', '__pycache__', '.DS_Store', 'node_modules', 'venv', '.idea', SIDECAR_NAME}
 
 def scan_dir(path):
-    """掃描目錄並回傳相對路徑映射表"""
+    """掃描目錄並回傳欄式檔案索引 (相對路徑、大小、時間皆存在緊湊陣列中)"""
     root = Path(path).expanduser()
-    files_data = {}
-    # 使用 tqdm 顯示掃描進度
-    all_files = [p for p in root.rglob('*') if p.is_file() and not any(part in IGNORE_LIST for part in p.parts)]
-    
-    for p in tqdm(all_files, desc=f"📂 掃描中 {root.name[:10]}...", leave=False):
-        rel_p = p.relative_to(root)
-        files_data[rel_p] = {"path": p, "size": p.stat().st_size}
+    files_data = FileIndex(root)
+    # 忽略的目錄在走訪時即剪枝；使用 tqdm 顯示掃描進度
+    for rec in tqdm(walk_files(root, IGNORE_LIST, skip_prefixes=()), desc=f"📂 掃描中 {root.name[:10]}...", leave=False):
+        files_data.append(rec)
     return files_data, root
 
 # ----------------功能模組----------------
@@ -39,67 +30,98 @@ def mode_compare_diff():
     """功能 1：比對兩個專案的結構差異"""
     path_a = input("\n👉 請輸入資料夾 A 路徑: ").strip()
     path_b = input("👉 請輸入資料夾 B 路徑: ").strip()
+    use_merkle = input("👉 依內容摘要 (Merkle) 精確比對？(y/N): ").strip().lower() == 'y'
+    
+    if use_merkle:
+        mode_compare_merkle(path_a, path_b)
+        return
     
     data_a, _ = scan_dir(path_a)
     data_b, _ = scan_dir(path_b)
     
-    all_paths = sorted(set(data_a.keys()) | set(data_b.keys()))
     print(f"\n{'狀態':<15} | {'相對路徑'}")
     print("-" * 60)
     
-    for rel_p in all_paths:
-        if rel_p in data_a and rel_p not in data_b:
+    # 兩份索引依路徑排序後合併比對，不需建立 dict
+    for rel_p, i, j in merge_join(data_a, data_b):
+        if j is None:
             print(f"🔴 僅在 A 存在  | {rel_p}")
-        elif rel_p not in data_a and rel_p in data_b:
+        elif i is None:
             print(f"🟢 僅在 B 存在  | {rel_p}")
         else:
-            if data_a[rel_p]['size'] != data_b[rel_p]['size']:
+            if data_a.sizes[i] != data_b.sizes[j]:
                 print(f"🟡 內容不同     | {rel_p} (大小差異)")
 
+def mode_compare_merkle(path_a, path_b):
+    """依 Merkle 目錄摘要比對：摘要相同的子目錄整棵略過，只展開真正有變動的部分"""
+    with HashCache() as cache:
+        tree_a = build_tree(path_a, IGNORE_LIST, cache=cache)
+        tree_b = build_tree(path_b, IGNORE_LIST, cache=cache)
+    
+    print(f"\n{'狀態':<15} | {'相對路徑'}")
+    print("-" * 60)
+    
+    labels = {'only_a': "🔴 僅在 A 存在 ", 'only_b': "🟢 僅在 B 存在 ", 'changed': "🟡 內容不同    "}
+    stats = {}
+    for status, rel_p, _, _ in compare_trees(tree_a, tree_b, stats):
+        print(f"{labels[status]} | {rel_p}")
+    print(f"🌳 略過 {stats['skipped_dirs']} 個相同子樹，展開 {stats['visited_dirs']} 個目錄；"
+          f"重新雜湊 A {tree_a['rehashed']} / B {tree_b['rehashed']} 個檔案")
+
 def mode_cleanup_duplicates():
     """功能 2：深度清理單一資料夾內的重複檔案 (依內容)"""
     path_input = input("\n👉 請輸入要清理的資料夾路徑: ").strip()
     scan_root = Path(path_input).expanduser()
+    resume_interrupted(scan_root)
+    action = prompt_action()
     
     # 建立回收區
     cleanup_folder = Path.home() / "Desktop" / f"Cleanup_{datetime.now().strftime('%m%d_%H%M')}"
     
-    # 1. 大小分群
-    files_data, _ = scan_dir(path_input)
-    size_groups = defaultdict(list)
-    for info in files_data.values():
-        size_groups[info['size']].append(info['path'])
-        
-    potential_dupes = [paths for sz, paths in size_groups.items() if len(paths) > 1 and sz > 0]
-    
-    if not potential_dupes:
-        print("✨ 沒發現任何重複檔案。")
-        return
+    # 1. 串流比對：背景走訪 → 大小分群 → 頭尾取樣 → 完整雜湊，發現重複即搬移
+    records = prefetch(walk_files(scan_root, IGNORE_LIST | {cleanup_folder.name}, skip_prefixes=()))
+    stats = {}
+    # 回收區在第一次搬移時才建立 (由執行器規劃目的地檔名)；每個處置執行前先寫入還原日誌
+    with HashCache() as cache, Journal.create(scan_root, 'ProjectMaster') as journal:
+        with MoveExecutor(cleanup_folder, journal=journal) as mover:
+            for f, keep in tqdm(stream_duplicates(records, cache=cache, stats=stats), desc="🧪 比對並處置重複檔案"):
+                try:
+                    apply_action(action, f, keep, mover)
+                except Exception as e:
+                    print(f"❌ 失敗: {f.name} - {e}")
+        journal.finish()
+        print_stage_report(stats)
+        print(f"♻️ 雜湊快取命中 {cache.hits} 筆，重新計算 {cache.misses} 筆")
 
-    # 2. 雜湊比對
-    seen_hashes = {}
-    to_move = []
-    
-    for path_list in tqdm(potential_dupes, desc="🧪 深度內容比對中"):
-        for f_path in path_list:
-            f_hash = get_file_hash(f_path)
-            if f_hash in seen_hashes:
-                to_move.append(f_path)
-            else:
-                seen_hashes[f_hash] = f_path
+    for src, e in mover.errors:
+        print(f"❌ 失敗: {os.path.basename(src)} - {e}")
+    moved = mover.completed
 
-    # 3. 執行搬移
-    if to_move:
-        cleanup_folder.mkdir(parents=True, exist_ok=True)
-        print(f"🚀 發現 {len(to_move)} 個重複檔案，準備搬移至桌面...")
-        for f in tqdm(to_move, desc="📦 搬移檔案中"):
-            dest = cleanup_folder / f.name
-            if dest.exists(): dest = cleanup_folder / f"{datetime.now().microsecond}_{f.name}"
-            shutil.move(str(f), str(dest))
-        print(f"✅ 清理完成！存放在: {cleanup_folder}")
+    # 2. 結果
+    if moved:
+        destination = f"，存放在: {cleanup_folder}" if action == 'move' else ""
+        print(f"✅ 清理完成！共處置 {moved} 個重複檔案 ({ACTION_LABELS[action]}){destination}")
+        print("⏪ 如需還原，請使用主選單的「還原清理」")
     else:
         print("✨ 內容皆不重複。")
 
+def mode_restore():
+    """功能 3：依還原日誌撤銷某次清理"""
+    journals = Journal.all()[-10:]
+    if not journals:
+        print("✨ 目前沒有任何清理日誌。")
+        return
+    for i, path in enumerate(journals, 1):
+        with Journal(path) as journal:
+            print(f"{i}. {path.name} | {journal.meta('root')} | {journal.meta('status')}")
+    choice = input(f"👉 請選擇要還原的清理 (1-{len(journals)}，預設最近一次): ").strip()
+    target = journals[int(choice) - 1] if choice.isdigit() and 1 <= int(choice) <= len(journals) else journals[-1]
+    with Journal(target) as journal:
+        undone, errors = journal.restore()
+    for src, e in errors:
+        print(f"❌ 還原失敗: {src} - {e}")
+    print(f"⏪ 已還原 {undone} 個檔案")
+
 # ----------------主選單----------------
 
 def main_menu():
@@ -107,15 +129,18 @@ def main_menu():
         print(f"\n{'='*20} 專案管理 & 清理大師 {'='*20}")
         print("1. 🔍 比對兩個專案 (查看結構差異)")
         print("2. 🧹 清理單一專案 (刪除內容重複檔案)")
+        print("3. ⏪ 還原清理 (依還原日誌)")
         print("0. 🚪 離開程式")
         print("="*55)
         
-        choice = input("請選擇功能 (0-2): ").strip()
+        choice = input("請選擇功能 (0-3): ").strip()
         
         if choice == '1':
             mode_compare_diff()
         elif choice == '2':
             mode_cleanup_duplicates()
+        elif choice == '3':
+            mode_restore()
         elif choice == '0':
             print("👋 再見！")
             break
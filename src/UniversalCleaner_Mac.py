@@ -1,21 +1,16 @@
 # -*- coding: utf-8 -*-
 import os
-import shutil
 import csv
-import hashlib
 from pathlib import Path
 from datetime import datetime
 from tqdm import tqdm
-
-def get_file_md5(file_path):
-    hash_md5 = hashlib.md5()
-    try:
-        with open(file_path, "rb") as f:
-            for chunk in iter(lambda: f.read(4096), b""):
-                hash_md5.update(chunk)
-        return hash_md5.hexdigest()
-    except:
-        return None
+from actions import ACTION_LABELS, apply_action, prompt_action
+from checkpoint import open_checkpoint
+from hasher import hash_files
+from hash_cache import HashCache
+from journal import Journal, resume_interrupted
+from mover import MoveExecutor
+from walker import prefetch, walk_files
 
 def run_universal_cleanup():
     print("=== macOS 萬用重複檔案清理工具 ===")
@@ -25,43 +20,45 @@ def run_universal_cleanup():
     if not os.path.exists(scan_root):
         print("❌ 路徑不存在。")
         return
+    resume_interrupted(scan_root)
+    checkpoint = open_checkpoint('UniversalCleaner_Mac', scan_root)
 
     ext_input = input("👉 請輸入要清理的副檔名 (例如 pdf,jpg,png，留空則掃描所有檔案): ").lower()
     target_exts = set([f".{e.strip()}" for e in ext_input.split(',') if e.strip()]) if ext_input else None
+    action = prompt_action()
 
     # 2. 設定回收區 (桌面)
     cleanup_folder = Path.home() / "Desktop" / f"Cleanup_Archive_{datetime.now().strftime('%Y%m%d_%H%M')}"
     cleanup_folder.mkdir(parents=True, exist_ok=True)
     log_file = cleanup_folder / "cleanup_report.csv"
 
-    # 3. 檢索檔案
-    print("🔍 正在檢索檔案...")
-    all_files = []
-    for p in Path(scan_root).rglob('*'):
-        if p.is_file() and not p.name.startswith('._'):
-            if target_exts is None or p.suffix.lower() in target_exts:
-                all_files.append(p)
+    # 3. 檢索檔案：背景走訪直接串流給雜湊引擎，不先建立完整檔案清單
+    print("🔍 正在檢索並分析檔案...")
+    all_files = prefetch(walk_files(scan_root, ignore_dirs={cleanup_folder.name}, exts=target_exts))
     
     seen_hashes = {}
     actions = []
     saved_size = 0
 
-    # 4. 比對與分析
-    for f_path in tqdm(all_files, desc="分析內容中"):
-        f_hash = get_file_md5(f_path)
-        if not f_hash: continue
+    # 4. 比對與分析 (算出的雜湊值同時附加寫入檢查點，中斷後重跑不必重新讀檔；
+    #    大小與修改時間未變的檔案沿用雜湊快取)
+    with HashCache() as cache, checkpoint:
+        for rec, f_hash in tqdm(hash_files(all_files, cache=checkpoint.hashes(cache)), desc="分析內容中", unit="file"):
+            if not f_hash: continue
 
-        if f_hash in seen_hashes:
-            f_size = f_path.stat().st_size
-            saved_size += f_size
-            actions.append({
-                'file': f_path,
-                'reason': f"內容與 {seen_hashes[f_hash]} 重複",
-                'dest': cleanup_folder / f_path.name,
-                'size_mb': round(f_size / (1024 * 1024), 2)
-            })
-        else:
-            seen_hashes[f_hash] = str(f_path)
+            f_path = Path(rec.path)
+            if f_hash in seen_hashes:
+                f_size = rec.size
+                saved_size += f_size
+                actions.append({
+                    'file': f_path,
+                    'reason': f"內容與 {seen_hashes[f_hash]} 重複",
+                    'keep': seen_hashes[f_hash],
+                    'size_mb': round(f_size / (1024 * 1024), 2)
+                })
+            else:
+                seen_hashes[f_hash] = str(f_path)
+    checkpoint.complete()
 
     # 5. 執行搬移
     if not actions:
@@ -70,29 +67,35 @@ def run_universal_cleanup():
 
     print(f"🚀 發現 {len(actions)} 個重複檔案，預計清出 {round(saved_size / (1024*1024), 2)} MB")
     
-    with open(log_file, 'w', encoding='utf-8-sig', newline='') as csvf:
-        writer = csv.DictWriter(csvf, fieldnames=['檔案名稱', '原始路徑', '原因', '大小(MB)'])
+    # 還原日誌：每個處置執行前先寫入，可事後還原 (python journal.py restore)
+    with Journal.create(scan_root, 'UniversalCleaner_Mac') as journal, open(log_file, 'w', encoding='utf-8-sig', newline='') as csvf:
+        writer = csv.DictWriter(csvf, fieldnames=['檔案名稱', '原始路徑', '原因', '處置', '大小(MB)'])
         writer.writeheader()
         
-        for act in actions:
-            try:
-                final_dest = act['dest']
-                if final_dest.exists():
-                    final_dest = cleanup_folder / f"{datetime.now().microsecond}_{act['file'].name}"
-                
-                shutil.move(str(act['file']), str(final_dest))
-                writer.writerow({
+        # 搬移執行器：目的地一次規劃、同裝置直接 rename，報表批次寫入
+        with MoveExecutor(cleanup_folder, writer, journal=journal) as mover:
+            for act in actions:
+                row = {
                     '檔案名稱': act['file'].name,
                     '原始路徑': act['file'],
                     '原因': act['reason'],
+                    '處置': ACTION_LABELS[action],
                     '大小(MB)': act['size_mb']
-                })
-            except Exception as e:
-                print(f"失敗: {act['file'].name} - {e}")
+                }
+                try:
+                    # 處置前先逐位元組確認內容相同；符號連結一律拒絕，已是同一個檔案時不做任何事
+                    apply_action(action, act['file'], act['keep'], mover, row)
+                except Exception as e:
+                    print(f"失敗: {act['file'].name} - {e}")
+
+        for src, e in mover.errors:
+            print(f"失敗: {os.path.basename(src)} - {e}")
+        journal.finish()
 
     print("-" * 50)
-    print(f"✅ 清理完成！已移至桌面 {cleanup_folder.name}")
+    print(f"✅ 清理完成！處置方式：{ACTION_LABELS[action]} (報表：桌面 {cleanup_folder.name})")
     print(f"💾 釋放空間：{round(saved_size / (1024*1024), 2)} MB")
+    print(f"⏪ 如需還原：python journal.py restore {journal.path.name}")
 
 if __name__ == "__main__":
     run_universal_cleanup()
\ No newline at end of file
@@ -1,23 +1,33 @@
 # -*- coding: utf-8 -*-
 import os
-import shutil
+import sys
 import csv
-import hashlib
+import argparse
+from contextlib import contextmanager
 from pathlib import Path
 from datetime import datetime
-from tqdm import tqdm
-from collections import defaultdict
-
-def get_file_md5(file_path):
-    hash_md5 = hashlib.md5()
-    try:
-        # 增加緩衝區至 64KB，提升大檔案讀取效率
-        with open(file_path, "rb") as f:
-            for chunk in iter(lambda: f.read(65536), b""):
-                hash_md5.update(chunk)
-        return hash_md5.hexdigest()
-    except Exception:
-        return None
+from actions import ACTION_LABELS, apply_action, prompt_action
+from checkpoint import open_checkpoint
+from hash_cache import HashCache
+from mover import MoveExecutor
+from journal import Journal, resume_interrupted
+from dedup import print_stage_report, stream_duplicates
+from walker import prefetch, stat_record, walk_files
+from watcher import BackgroundHasher, BackgroundWorker, DuplicateIndex, InotifyWatcher
+
+REPORT_FIELDS = ['檔案名稱', '原始路徑', '原因', '處置', '大小(MB)']
+WATCH_BATCH = 1000  # 事件持續湧入時，累積到此數量即先處理一批
+
+def handle_duplicate(f_path, keep, size, action, mover):
+    """處置重複檔案 (搬移或以連結取代)，報表由 mover 批次寫入；回傳 False 表示無需處置 (早已是同一個檔案)"""
+    row = {
+        '檔案名稱': f_path.name,
+        '原始路徑': f_path,
+        '原因': f"內容與 {keep} 重複",
+        '處置': ACTION_LABELS[action],
+        '大小(MB)': round(size / (1024 * 1024), 2)
+    }
+    return apply_action(action, f_path, keep, mover, row, size) is not None
 
 def run_universal_cleanup():
     print("=== macOS 萬用重複檔案清理工具 (大檔案優化版) ===")
@@ -28,88 +38,223 @@ def run_universal_cleanup():
     if not scan_root.exists():
         print("❌ 路徑不存在。")
         return
+    resume_interrupted(scan_root)
+    checkpoint = open_checkpoint('UniversalCleaner_Turbo', scan_root)
 
     ext_input = input("👉 請輸入要清理的副檔名 (例如 pdf,jpg，留空則全掃): ").lower()
     target_exts = set([f".{e.strip()}" for e in ext_input.split(',') if e.strip()]) if ext_input else None
+    action = prompt_action()
 
     # 2. 設定回收區 (桌面)
     cleanup_folder = Path.home() / "Desktop" / f"Cleanup_Archive_{datetime.now().strftime('%Y%m%d_%H%M')}"
     cleanup_folder.mkdir(parents=True, exist_ok=True)
     log_file = cleanup_folder / "cleanup_report.csv"
 
-    # 3. 第一階段：依檔案大小初步分群 (避免無意義的雜湊運算)
-    print("🔍 正在檢索檔案並分析大小...")
-    size_groups = defaultdict(list)
-    
-    # 獲取所有檔案列表
-    raw_files = [p for p in scan_root.rglob('*') if p.is_file() and not p.name.startswith('._')]
-    
-    for p in raw_files:
-        if target_exts is None or p.suffix.lower() in target_exts:
-            size_groups[p.stat().st_size].append(p)
-
-    # 4. 第二階段：僅針對「大小相同」的檔案進行 MD5 比對
-    seen_hashes = {}
-    actions = []
-    saved_size = 0
-    
-    # 過濾出有潛在重複可能（大小相同）的群組
-    potential_dupes = [paths for size, paths in size_groups.items() if len(paths) > 1 and size > 0]
-    
-    if not potential_dupes:
-        print("✨ 沒發現任何大小相同的檔案，掃描結束。")
-        return
+    # 3. 串流處理：走訪 → 大小分群 → 頭尾取樣 → 完整雜湊 → 搬移與記錄，各階段同時進行
+    #    走訪在背景執行緒進行，透過有上限的佇列交給比對流程，記憶體不隨檔案數暴增
+    print("🔍 正在檢索並比對檔案內容 (發現重複即立刻處理)...")
+    records = prefetch(walk_files(scan_root, ignore_dirs={cleanup_folder.name}, exts=target_exts))
+    stats = {}
 
-    print(f"⚙️ 正在比對 {len(potential_dupes)} 組疑似重複的檔案內容...")
-    
-    for path_list in tqdm(potential_dupes, desc="深度比對中"):
-        for f_path in path_list:
-            f_hash = get_file_md5(f_path)
-            if not f_hash: continue
-
-            if f_hash in seen_hashes:
-                f_size = f_path.stat().st_size
-                saved_size += f_size
-                actions.append({
-                    'file': f_path,
-                    'reason': f"內容與 {seen_hashes[f_hash]} 重複",
-                    'dest': cleanup_folder / f_path.name,
-                    'size_mb': round(f_size / (1024 * 1024), 2)
-                })
-            else:
-                seen_hashes[f_hash] = str(f_path)
-
-    # 5. 執行搬移與記錄
-    if not actions:
+    # 持久化快取：上次執行後未變動的檔案 (stat 相同) 直接沿用雜湊值
+    # 搬移執行器：目的地一次規劃、同裝置直接 rename、跨裝置並行複製，報表批次寫入
+    # 還原日誌：每個處置執行前先寫入，可事後還原，中斷時下次執行可接續
+    # 檢查點：本次算出的雜湊值逐筆附加寫入，中斷後重跑不必重新讀檔
+    with HashCache() as cache, checkpoint, Journal.create(scan_root, 'UniversalCleaner_Turbo') as journal, \
+            open(log_file, 'w', encoding='utf-8-sig', newline='') as csvf:
+        writer = csv.DictWriter(csvf, fieldnames=REPORT_FIELDS)
+        writer.writeheader()
+
+        next_report = 1000
+        with MoveExecutor(cleanup_folder, writer, journal=journal) as mover:
+            for rec, keep in stream_duplicates(records, cache=checkpoint.hashes(cache), stats=stats):
+                f_path = Path(rec.path)
+                try:
+                    handle_duplicate(f_path, keep, rec.size, action, mover)
+                except Exception as e:
+                    print(f"失敗: {f_path.name} - {e}")
+                    continue
+                if mover.completed >= next_report:
+                    next_report += 1000
+                    print(f"🚀 已處理 {mover.completed} 個重複檔案，清出 {round(mover.completed_bytes / (1024*1024), 2)} MB")
+
+        for src, e in mover.errors:
+            print(f"失敗: {os.path.basename(src)} - {e}")
+        moved, saved_size = mover.completed, mover.completed_bytes
+        journal.finish()
+        checkpoint.complete()
+
+        print_stage_report(stats)
+        print(f"♻️ 雜湊快取命中 {cache.hits} 筆，重新計算 {cache.misses} 筆")
+
+    if not moved:
         print("✨ 經過內容比對，未發現重複檔案！")
         return
 
-    print(f"🚀 發現 {len(actions)} 個重複檔案，預計清出 {round(saved_size / (1024*1024), 2)} MB")
-    
-    with open(log_file, 'w', encoding='utf-8-sig', newline='') as csvf:
-        writer = csv.DictWriter(csvf, fieldnames=['檔案名稱', '原始路徑', '原因', '大小(MB)'])
-        writer.writeheader()
-        
-        for act in actions:
-            try:
-                final_dest = act['dest']
-                if final_dest.exists():
-                    # 若檔名衝突，加上微秒區分
-                    final_dest = cleanup_folder / f"{datetime.now().microsecond}_{act['file'].name}"
-                
-                shutil.move(str(act['file']), str(final_dest))
-                writer.writerow({
-                    '檔案名稱': act['file'].name,
-                    '原始路徑': act['file'],
-                    '原因': act['reason'],
-                    '大小(MB)': act['size_mb']
-                })
-            except Exception as e:
-                print(f"失敗: {act['file'].name} - {e}")
-
     print("-" * 50)
-    print(f"✅ 清理完成！已移至：{cleanup_folder.name}")
+    print(f"✅ 清理完成！共 {moved} 個重複檔案，處置方式：{ACTION_LABELS[action]} (報表：{cleanup_folder.name})")
     print(f"💾 釋放空間：{round(saved_size / (1024*1024), 2)} MB")
+    print(f"⏪ 如需還原：python journal.py restore {journal.path.name}")
+
+def run_watch_mode(scan_root, target_exts=None):
+    """
+    常駐監看模式 (Linux inotify)：啟動時完整掃描一次建立索引，
+    之後只對新寫入 / 搬入的檔案雜湊比對，重複者數秒內即移至回收區；事件佇列溢位時才重新完整掃描。
+    只有出現同大小檔案時才需要雜湊；雜湊與處置前的逐位元組驗證都在背景執行緒進行，
+    事件迴圈只負責讀取事件與維護索引，不會被大檔案卡住。
+    """
+    scan_root = Path(scan_root).expanduser()
+    cleanup_folder = Path.home() / "Desktop" / f"Cleanup_Watch_{datetime.now().strftime('%Y%m%d_%H%M')}"
+    cleanup_folder.mkdir(parents=True, exist_ok=True)
+    log_file = cleanup_folder / "cleanup_report.csv"
+    ignore = {cleanup_folder.name}
+    index = DuplicateIndex()
+    inflight = {}  # path -> 送去雜湊的 FileRecord；結果回來時已被取代或移除者直接捨棄
+    moving = set()  # 已交給處置執行緒、尚未回報的重複檔，同一檔案不重複送出
+    totals = {'moved': 0, 'journal': None}
+    resume_interrupted(scan_root)
+
+    def wanted(path):
+        name = os.path.basename(path)
+        if name.startswith('._'):
+            return False
+        return target_exts is None or os.path.splitext(name)[1].lower() in target_exts
+
+    @contextmanager
+    def open_sink():
+        """在處置執行緒內開啟還原日誌與報表 (SQLite 連線不可跨執行緒使用)"""
+        with Journal.create(scan_root, 'UniversalCleaner_Watch') as journal, \
+                open(log_file, 'w', encoding='utf-8-sig', newline='') as csvf:
+            totals['journal'] = journal.path.name
+            writer = csv.DictWriter(csvf, fieldnames=REPORT_FIELDS)
+            writer.writeheader()
+            mover = MoveExecutor(cleanup_folder, writer, batch_size=1, journal=journal)
+            try:
+                yield mover, csvf
+            finally:
+                mover.close()
+                journal.finish()
+
+    def verify_and_move(sink, job):
+        """逐位元組驗證後搬移；回傳 (是否已處置, 跨裝置搬移等延後發生的錯誤)"""
+        mover, csvf = sink
+        rec, keep = job
+        # 監看模式固定搬移：以連結取代會觸發新的寫入事件，形成重複處理
+        moved = handle_duplicate(Path(rec.path), keep, rec.size, 'move', mover)
+        mover.drain()
+        csvf.flush()
+        errors = list(mover.errors)
+        mover.errors.clear()
+        return moved, errors
+
+    # 先建立監看再做初始掃描，掃描期間落地的檔案也不會漏掉
+    with InotifyWatcher(scan_root, ignore_dirs=ignore) as watcher, BackgroundHasher(HashCache) as hasher, \
+            BackgroundWorker(open_sink, verify_and_move) as applier:
+
+        def admit(records):
+            """登記大小，只把有同大小檔案的送去背景雜湊"""
+            batch = []
+            for rec in records:
+                if rec.size < 1:
+                    continue
+                for todo in index.admit(rec):
+                    inflight[todo.path] = todo
+                    batch.append(todo)
+            hasher.submit(batch)
+
+        def apply_results():
+            """收下雜湊結果並更新索引；發現重複時交給處置執行緒驗證與搬移，再回報已完成的處置"""
+            for rec, digest in hasher.results():
+                if inflight.get(rec.path) is not rec:
+                    continue
+                del inflight[rec.path]
+                if not digest:
+                    continue
+                keep = index.add(rec.path, rec.size, digest)
+                if keep is not None and rec.path not in moving:
+                    moving.add(rec.path)
+                    applier.submit((rec, keep))
+            for (rec, keep), outcome, e in applier.results():
+                moving.discard(rec.path)
+                if e is not None:
+                    print(f"失敗: {rec.path} - {e}")
+                    continue
+                moved, errors = outcome
+                for src, error in errors:
+                    print(f"失敗: {src} - {error}")
+                if moved and not errors:
+                    totals['moved'] += 1
+                    print(f"♻️ 重複檔案已移至回收區: {rec.path} (與 {keep} 相同)")
+
+        def full_scan():
+            index.clear()
+            inflight.clear()
+            print("🔍 完整掃描並建立索引中...")
+            batch = []
+            for rec in prefetch(walk_files(scan_root, ignore_dirs=ignore, exts=target_exts)):
+                batch.append(rec)
+                if len(batch) >= WATCH_BATCH:
+                    admit(batch)
+                    batch = []
+                    apply_results()
+            admit(batch)
+            print(f"👀 監看中：{scan_root} (已索引 {index.files} 個檔案，Ctrl+C 結束)")
+
+        changed = {}
+        try:
+            full_scan()
+            while True:
+                events = watcher.events(timeout=1.0)
+                overflow = False
+                for kind, path in events:
+                    if kind == 'overflow':
+                        overflow = True
+                    elif kind == 'changed':
+                        if wanted(path):
+                            changed[path] = None
+                    elif kind == 'removed':
+                        changed.pop(path, None)
+                        inflight.pop(path, None)
+                        index.remove(path)
+                    elif kind == 'removed_dir':
+                        prefix = os.path.join(path, '')
+                        for p in [p for p in inflight if p.startswith(prefix)]:
+                            del inflight[p]
+                        index.remove_tree(path)
+
+                if overflow:
+                    print("⚠️ 事件佇列溢位，重新完整掃描...")
+                    changed.clear()
+                    watcher.rewatch()
+                    full_scan()
+                    continue
+
+                # 事件暫歇 (或累積過多) 時才批次登記，同一檔案連續寫入只處理一次
+                if changed and (not events or len(changed) >= WATCH_BATCH):
+                    records = [rec for rec in map(stat_record, changed) if rec is not None]
+                    changed.clear()
+                    admit(records)
+                apply_results()
+        except KeyboardInterrupt:
+            pass
+    # 離開 with 時處置執行緒已完成進行中的搬移並關閉日誌
+    print(f"\n👋 結束監看，共移出 {totals['moved']} 個重複檔案，報表：{log_file}")
+    if totals['journal']:
+        print(f"⏪ 如需還原：python journal.py restore {totals['journal']}")
 
 if __name__ == "__main__":
-    run_universal_cleanup()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="萬用重複檔案清理工具")
+    parser.add_argument("path", nargs="?", help="監看模式要監看的資料夾")
+    parser.add_argument("--watch", action="store_true", help="常駐監看模式 (Linux inotify)，新的重複檔案落地即處理")
+    parser.add_argument("--ext", default="", help="只處理的副檔名 (例如 pdf,jpg)")
+    args = parser.parse_args()
+
+    if args.watch:
+        if not sys.platform.startswith('linux'):
+            print("❌ 監看模式僅支援 Linux。")
+            sys.exit(1)
+        watch_root = args.path or input("👉 請輸入要監看的資料夾路徑: ").strip().replace("\\", "")
+        exts = {f".{e.strip().lower()}" for e in args.ext.split(',') if e.strip()} or None
+        run_watch_mode(watch_root, exts)
+    else:
+        run_universal_cleanup()
\ No newline at end of file
@@ -0,0 +1,150 @@
+# -*- coding: utf-8 -*-
+"""
+actions.py
+功能：重複檔案的處置方式 (搬移 / 硬連結 / reflink / 符號連結)
+所有處置都會先逐位元組比對內容，確認完全相同才搬移，或以連結原子性地取代重複檔 (不需複製任何資料)。
+雜湊值可能來自快取，執行前的比對確保不會處置到內容已改變的檔案。
+符號連結 (重複檔或保留檔任一方) 一律不處置；兩者已是同一個檔案時不做任何事。
+"""
+
+import os
+import shutil
+import sys
+
+from hasher import files_identical
+
+FICLONE = 0x40049409  # Linux <linux/fs.h>：_IOW(0x94, 9, int)，btrfs / XFS / bcachefs 支援
+
+ACTION_LABELS = {
+    'move': "移至回收區",
+    'hardlink': "以硬連結取代",
+    'reflink': "以 reflink 取代",
+    'symlink': "以符號連結取代",
+}
+ACTION_CHOICES = {'1': 'move', '2': 'hardlink', '3': 'reflink', '4': 'symlink'}
+
+
+def prompt_action():
+    """互動式選擇處置方式，預設為搬移"""
+    menu = " ".join(f"[{key}] {ACTION_LABELS[name]}" for key, name in ACTION_CHOICES.items())
+    choice = input(f"👉 重複檔案處置方式 {menu} (預設 1): ").strip()
+    return ACTION_CHOICES.get(choice, 'move')
+
+
+def _temp_path(dup):
+    """與重複檔同目錄的暫存名稱，確保最後的 os.replace 在同一個檔案系統上完成"""
+    head, tail = os.path.split(os.fspath(dup))
+    return os.path.join(head, f".{tail}.dedup-{os.getpid()}")
+
+
+def _verify(dup, keep):
+    identical = files_identical(dup, keep)
+    if identical is None:
+        raise OSError(f"無法讀取，略過: {dup}")
+    if not identical:
+        raise ValueError(f"內容與 {keep} 不一致，略過: {dup}")
+
+
+def _replace_with(dup, make_link):
+    """先在同目錄建立連結，再以 os.replace 原子性取代，任何一步失敗都不會遺失原檔"""
+    tmp = _temp_path(dup)
+    try:
+        make_link(tmp)
+        os.replace(tmp, dup)
+    except BaseException:
+        if os.path.lexists(tmp):
+            os.unlink(tmp)
+        raise
+
+
+def hardlink_replace(dup, keep):
+    """以指向保留檔的硬連結取代重複檔 (須在同一個檔案系統)；回傳 False 表示兩者早已是同一個檔案"""
+    st_dup, st_keep = os.stat(dup), os.stat(keep)
+    if (st_dup.st_dev, st_dup.st_ino) == (st_keep.st_dev, st_keep.st_ino):
+        return False
+    _verify(dup, keep)
+    _replace_with(dup, lambda tmp: os.link(keep, tmp))
+    return True
+
+
+def _clone(src, dst):
+    """建立共用資料區塊的複本：Linux 使用 FICLONE ioctl，macOS (APFS) 使用 clonefile"""
+    if sys.platform == 'darwin':
+        import ctypes
+        libc = ctypes.CDLL(None, use_errno=True)
+        if libc.clonefile(os.fsencode(src), os.fsencode(dst), 0) != 0:
+            err = ctypes.get_errno()
+            raise OSError(err, os.strerror(err), dst)
+        return
+    import fcntl
+    with open(src, 'rb') as fsrc, open(dst, 'wb') as fdst:
+        fcntl.ioctl(fdst.fileno(), FICLONE, fsrc.fileno())
+
+
+def reflink_replace(dup, keep):
+    """
+    以 reflink (copy-on-write 複本) 取代重複檔：資料區塊與保留檔共用，空間立即釋放，
+    但兩者仍是獨立檔案，之後各自修改互不影響。保留重複檔原本的權限與時間。
+    """
+    _verify(dup, keep)
+
+    def make_link(tmp):
+        _clone(keep, tmp)
+        shutil.copystat(dup, tmp)
+
+    _replace_with(dup, make_link)
+    return True
+
+
+def symlink_replace(dup, keep):
+    """以指向保留檔 (絕對路徑) 的符號連結取代重複檔"""
+    _verify(dup, keep)
+    target = os.path.abspath(keep)
+    _replace_with(dup, lambda tmp: os.symlink(target, tmp))
+    return True
+
+
+def apply_action(action, dup, keep, mover, row=None, size=0):
+    """
+    依 action 處置重複檔。
+
+    Args:
+        mover: mover.MoveExecutor；搬移交由它批次執行，報表列 row 也經由它批次寫入，
+               若它帶有還原日誌 (mover.journal)，連結處置也會在執行前先寫入日誌
+        row / size: 處置完成後記錄的報表列與大小
+
+    Returns:
+        處置說明 (ACTION_LABELS)；兩者已是同一個檔案 (硬連結) 時回傳 None (未做任何事)
+    Raises:
+        OSError / ValueError：任一方為符號連結、內容驗證不符 (含無法讀取) 或連結處置失敗，原檔保持不變
+        (驗證通過後的搬移失敗不拋出例外，記錄在 mover.errors)
+    """
+    # 符號連結與其目標讀起來內容相同：以連結取代目標會形成連結迴圈、搬走目標會留下斷掉的連結，資料即遺失
+    for path in (dup, keep):
+        if os.path.islink(path):
+            raise ValueError(f"符號連結不處置，略過: {path}")
+    if os.path.samefile(dup, keep):
+        return None
+    if action == 'move':
+        _verify(dup, keep)
+        mover.submit(dup, row, size)
+        return ACTION_LABELS['move']
+    handlers = {'hardlink': hardlink_replace, 'reflink': reflink_replace, 'symlink': symlink_replace}
+    if action not in handlers:
+        raise ValueError(f"未知的處置方式: {action}")
+    journal = mover.journal
+    entry = journal.begin(action, dup, keep=keep) if journal is not None else None
+    try:
+        replaced = handlers[action](dup, keep)
+    except (OSError, ValueError) as e:
+        if entry is not None:
+            journal.failed(entry, e)
+        raise
+    if not replaced:
+        if entry is not None:
+            journal.discard(entry)
+        return None
+    if entry is not None:
+        journal.done(entry)
+    mover.record(row, size)
+    return ACTION_LABELS[action]
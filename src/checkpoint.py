@@ -0,0 +1,193 @@
+# -*- coding: utf-8 -*-
+"""
+checkpoint.py
+功能：長時間作業的可接續檢查點 (append-only JSONL)
+已完成的工作項目與算到一半的雜湊值逐筆附加寫入，不必每次重寫整份清單；
+中斷後重新執行時整份載入成 dict，每個項目以 O(1) 判斷是否已完成。
+"""
+
+import hashlib
+import json
+import os
+from pathlib import Path
+
+DEFAULT_CHECKPOINT_DIR = Path.home() / ".cache" / "file_cleaner" / "checkpoints"
+CHECKPOINT_VERSION = 1
+FLUSH_EVERY = 200  # 每累積此筆數寫出一次；強制中止時最多重做這麼多筆
+
+
+def checkpoint_path(tool, root, checkpoint_dir=DEFAULT_CHECKPOINT_DIR):
+    """每個工具 + 掃描根目錄對應一個檢查點檔"""
+    key = hashlib.sha1(os.path.abspath(os.path.expanduser(root)).encode('utf-8', 'surrogateescape')).hexdigest()
+    return Path(checkpoint_dir) / f"{tool}_{key[:16]}.jsonl"
+
+
+class Checkpoint:
+    """
+    可接續的檢查點。
+
+    每行一筆紀錄：
+    - ["d", key, value]：工作項目 key 已完成，value 為其結果 (可為 None)
+    - ["h", path, size, mtime_ns, algo, digest]：已算出的雜湊值
+    檔案只附加不改寫；載入時以後面的紀錄為準，中斷時寫到一半或損毀的行直接略過。
+    載入時若發現損毀的行 (或檔案結尾不是完整的一行)，先重寫整份檔案再接續附加，
+    新紀錄不會黏在殘行後面。
+    作業正常結束後呼叫 complete() 刪除檢查點，下次即從頭開始；需要長期保留時以 compact() 整理。
+    """
+
+    def __init__(self, path, resume=True, flush_every=FLUSH_EVERY):
+        self.path = Path(path)
+        self.flush_every = flush_every
+        self._done = {}
+        self._hashes = {}
+        self.damaged = 0
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        if resume and self._load():
+            self._rewrite()
+        self.resumed = len(self._done)
+        self._file = open(self.path, 'a' if resume else 'w', encoding='utf-8')
+        if self._file.tell() == 0:
+            self._file.write(json.dumps({'version': CHECKPOINT_VERSION}) + '\n')
+        self._unflushed = 0
+
+    @classmethod
+    def for_run(cls, tool, root, resume=True, checkpoint_dir=DEFAULT_CHECKPOINT_DIR):
+        return cls(checkpoint_path(tool, root, checkpoint_dir), resume)
+
+    def _load(self):
+        """逐行載入；回傳是否需要重寫檔案 (有損毀的行、結尾不完整或版本不符)"""
+        try:
+            with open(self.path, encoding='utf-8', errors='replace') as f:
+                header = f.readline()
+                try:
+                    version = json.loads(header).get('version')
+                except (ValueError, AttributeError):
+                    version = None
+                if version != CHECKPOINT_VERSION or not header.endswith('\n'):
+                    return True  # 不認得的格式：捨棄內容，從頭開始
+                for line in f:
+                    try:
+                        rec = json.loads(line)
+                        kind = rec[0]
+                    except (ValueError, TypeError, IndexError, KeyError):
+                        self.damaged += 1  # 中斷時寫到一半的最後一行，或損毀的行
+                        continue
+                    if kind == 'd' and len(rec) == 3:
+                        self._done[rec[1]] = rec[2]
+                    elif kind == 'h' and len(rec) == 6:
+                        self._hashes[rec[1]] = rec[2:]
+                    else:
+                        self.damaged += 1
+                        continue
+                    if not line.endswith('\n'):
+                        self.damaged += 1  # 最後一行剛好完整但缺換行：仍須重寫，避免下一筆黏在同一行
+        except FileNotFoundError:
+            return False
+        except OSError:
+            return True
+        return self.damaged > 0
+
+    def _rewrite(self):
+        """以目前的內容重寫整份檔案 (先寫暫存檔再置換)，每個項目只留最後一筆"""
+        tmp = self.path.with_name(self.path.name + '.tmp')
+        with open(tmp, 'w', encoding='utf-8') as f:
+            f.write(json.dumps({'version': CHECKPOINT_VERSION}) + '\n')
+            for key, value in self._done.items():
+                f.write(json.dumps(['d', key, value], ensure_ascii=False, separators=(',', ':')) + '\n')
+            for path, entry in self._hashes.items():
+                f.write(json.dumps(['h', path] + list(entry), ensure_ascii=False, separators=(',', ':')) + '\n')
+        os.replace(tmp, self.path)
+
+    def compact(self):
+        """整理檔案：重複寫入的項目只保留最後一筆"""
+        self.close()
+        self._rewrite()
+        self._file = open(self.path, 'a', encoding='utf-8')
+        self._unflushed = 0
+
+    def __contains__(self, key):
+        return key in self._done
+
+    def __len__(self):
+        return len(self._done)
+
+    def result(self, key, default=None):
+        """已完成項目記錄的結果"""
+        return self._done.get(key, default)
+
+    def items(self):
+        """所有已完成項目的 (key, 結果)"""
+        return self._done.items()
+
+    def _append(self, rec):
+        self._file.write(json.dumps(rec, ensure_ascii=False, separators=(',', ':')) + '\n')
+        self._unflushed += 1
+        if self._unflushed >= self.flush_every:
+            self.flush()
+
+    def mark(self, key, value=None):
+        """記錄一個已完成的工作項目"""
+        self._done[key] = value
+        self._append(['d', key, value])
+
+    def hashes(self, fallback=None):
+        """
+        回傳具備 hash_cache.HashCache 介面 (get / put) 的雜湊層，可直接傳給 hash_files / stream_duplicates。
+        先查檢查點中本次作業已算出的雜湊值，再查 fallback (HashCache)；新算出的值兩邊都寫入。
+        """
+        return _HashLayer(self, fallback)
+
+    def flush(self):
+        self._file.flush()
+        self._unflushed = 0
+
+    def close(self):
+        if not self._file.closed:
+            self._file.close()
+
+    def complete(self):
+        """作業正常結束：刪除檢查點"""
+        self.close()
+        try:
+            self.path.unlink()
+        except FileNotFoundError:
+            pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+class _HashLayer:
+    def __init__(self, checkpoint, fallback):
+        self.checkpoint = checkpoint
+        self.fallback = fallback
+
+    def get(self, st, algorithm):
+        path = getattr(st, 'path', None)
+        entry = self.checkpoint._hashes.get(path) if path is not None else None
+        if entry is not None and entry[0] == st.st_size and entry[1] == st.st_mtime_ns and entry[2] == algorithm:
+            return entry[3]
+        return self.fallback.get(st, algorithm) if self.fallback is not None else None
+
+    def put(self, st, algorithm, digest):
+        path = getattr(st, 'path', None)
+        if path is not None and digest:
+            entry = [st.st_size, st.st_mtime_ns, algorithm, digest]
+            self.checkpoint._hashes[path] = entry
+            self.checkpoint._append(['h', path] + entry)
+        if self.fallback is not None:
+            self.fallback.put(st, algorithm, digest)
+
+
+def open_checkpoint(tool, root):
+    """互動式開啟檢查點：有上次中斷的進度時詢問是否接續"""
+    checkpoint = Checkpoint.for_run(tool, root)
+    if len(checkpoint) or checkpoint._hashes:
+        answer = input(f"👉 偵測到上次中斷的進度 (已完成 {len(checkpoint)} 項、{len(checkpoint._hashes)} 筆雜湊)，是否接續？(Y/n): ")
+        if answer.strip().lower() == 'n':
+            checkpoint.close()
+            checkpoint = Checkpoint.for_run(tool, root, resume=False)
+    return checkpoint
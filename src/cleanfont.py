@@ -5,35 +5,31 @@ FontCleaner_Mac.py
 """
 
 import os
-import shutil
 import csv
-import hashlib
 from pathlib import Path
 from datetime import datetime
-from fontTools.ttLib import TTFont
 from tqdm import tqdm
+from hasher import hash_files
+from hash_cache import HashCache
+from journal import Journal, resume_interrupted
+from mover import MoveExecutor
+from sfnt_reader import parse_faces
+from walker import prefetch, walk_files
 
-def get_file_md5(file_path):
-    hash_md5 = hashlib.md5()
+def get_font_info(buf):
+    """
+    從已讀入的字體內容 (bytes 或 mmap) 取得字體全名與版本號。
+    .ttc 集合的全名為所有字型全名以 " / " 串接 (收錄相同字型組合的集合才會被視為同名)，版本取第一個字型。
+    """
     try:
-        with open(file_path, "rb") as f:
-            for chunk in iter(lambda: f.read(4096), b""):
-                hash_md5.update(chunk)
-        return hash_md5.hexdigest()
-    except:
-        return None
-
-def get_font_info(file_path):
-    """取得字體全名與版本號"""
-    try:
-        font = TTFont(str(file_path), fontNumber=0, lazy=True)
-        names = font['name']
+        # 只解析表目錄與 name 表，集合內每個字型都讀取，不建立 TTFont 物件
+        faces = parse_faces(buf)
         # ID 4: Full Name, ID 5: Version
-        full_name = names.getName(4, 3, 1, 1033) or names.getName(4, 1, 0, 0)
-        version = names.getName(5, 3, 1, 1033) or names.getName(5, 1, 0, 0)
-        font.close()
-        return str(full_name), str(version)
-    except:
+        full_names = [font.name(4, (3, 1, 1033), (1, 0, 0), errors="backslashreplace") for font in faces]
+        version = faces[0].name(5, (3, 1, 1033), (1, 0, 0), errors="backslashreplace")
+        full_name = " / ".join(name for name in full_names if name) or None
+        return full_name, version
+    except Exception:
         return None, None
 
 def run_cleanup():
@@ -44,6 +40,7 @@ def run_cleanup():
     if not os.path.exists(scan_root):
         print("❌ 路徑不存在，請重新執行。")
         return
+    resume_interrupted(scan_root)
 
     # 2. 設定回收區
     cleanup_folder = Path.home() / "Desktop" / f"Font_Cleanup_Archive_{datetime.now().strftime('%Y%m%d_%H%M')}"
@@ -51,7 +48,9 @@ def run_cleanup():
     log_file = cleanup_folder / "cleanup_log.csv"
 
     font_exts = {'.ttf', '.otf', '.ttc'}
-    all_files = [p for p in Path(scan_root).rglob('*') if p.suffix.lower() in font_exts and not p.name.startswith('._')]
+    # 背景走訪直接串流給雜湊引擎，不先建立完整檔案清單
+    all_files = prefetch(walk_files(scan_root, ignore_dirs={cleanup_folder.name}, exts=font_exts))
+    cache = HashCache()  # 大小與修改時間未變的檔案沿用上次的雜湊值
 
     # 用於比對的字典
     seen_md5 = {}        # md5 -> first_path
@@ -59,11 +58,12 @@ def run_cleanup():
     
     actions = []
 
-    print(f"🔍 正在分析 {len(all_files)} 個檔案...")
+    print("🔍 正在檢索並分析字體檔案...")
 
-    for f_path in tqdm(all_files, desc="處理中"):
-        f_hash = get_file_md5(f_path)
-        f_name, f_ver = get_font_info(f_path)
+    for rec, f_hash, info in tqdm(hash_files(all_files, cache=cache, parse=get_font_info), desc="處理中", unit="file"):
+        f_path = Path(rec.path)
+        # 每個檔案只讀取一次：同一份 mmap 緩衝區先算雜湊再解析名稱；無法讀取時 info 為例外物件
+        f_name, f_ver = (None, None) if isinstance(info, Exception) else info
 
         reason = ""
         target_action = "KEEP"
@@ -105,30 +105,29 @@ def run_cleanup():
                 'dest': cleanup_folder / f_path.name
             })
 
+    cache.close()
+
     # 3. 執行移動與記錄
     print(f"\n🚀 正在搬移 {len(actions)} 個多餘檔案至桌面回收區...")
     
-    with open(log_file, 'w', encoding='utf-8-sig', newline='') as csvf:
+    # 還原日誌：每次搬移前先寫入，可事後還原 (python journal.py restore)
+    with Journal.create(scan_root, 'cleanfont') as journal, open(log_file, 'w', encoding='utf-8-sig', newline='') as csvf:
         writer = csv.DictWriter(csvf, fieldnames=['原始路徑', '處置', '原因'])
         writer.writeheader()
         
-        for act in actions:
-            try:
-                # 執行搬移
-                if not act['dest'].exists():
-                    shutil.move(str(act['file']), str(act['dest']))
-                else:
-                    # 如果回收區已有同名檔案，加上時間戳避免覆蓋
-                    new_dest = act['dest'].with_name(f"{datetime.now().microsecond}_{act['dest'].name}")
-                    shutil.move(str(act['file']), str(new_dest))
-                
-                writer.writerow({'原始路徑': act['file'], '處置': '已移至回收區', '原因': act['reason']})
-            except Exception as e:
-                writer.writerow({'原始路徑': act['file'], '處置': '失敗', '原因': str(e)})
+        # 搬移執行器：同名檔案預先編號、同裝置直接 rename，報表批次寫入
+        with MoveExecutor(cleanup_folder, writer, journal=journal) as mover:
+            for act in actions:
+                mover.submit(act['file'], {'原始路徑': str(act['file']), '處置': '已移至回收區', '原因': act['reason']})
+
+        for src, e in mover.errors:
+            writer.writerow({'原始路徑': src, '處置': '失敗', '原因': str(e)})
+        journal.finish()
 
     print("-" * 50)
     print(f"✅ 清理完成！")
-    print(f"📦 已移出檔案：{len(actions)} 個")
+    print(f"📦 已移出檔案：{mover.completed} 個")
+    print(f"⏪ 如需還原：python journal.py restore {journal.path.name}")
     print(f"📂 詳情請見桌面資料夾：{cleanup_folder.name}")
 
 if __name__ == "__main__":
@@ -0,0 +1,115 @@
+# -*- coding: utf-8 -*-
+"""
+dedup.py
+功能：漸進式重複檔案比對流程 (大小 → 頭尾取樣 → 完整雜湊)
+每一階段只把「仍可能重複」的檔案交給下一階段，避免對大檔案做無意義的完整讀取。
+"""
+
+from collections import defaultdict, deque
+from concurrent.futures import ThreadPoolExecutor
+
+from hasher import DEFAULT_ALGORITHM, DEFAULT_SAMPLE_SIZE, DEFAULT_WORKERS, hash_file, hash_sample, resolved
+
+STAGE_LABELS = {
+    'size': "大小分群",
+    'sample': "頭尾取樣",
+    'full': "完整雜湊",
+}
+
+
+def print_stage_report(stats):
+    """輸出每個階段排除的候選數量"""
+    for stage, label in STAGE_LABELS.items():
+        if stage in stats:
+            s = stats[stage]
+            print(f"   ▸ {label}: 輸入 {s['input']} 個，排除 {s['eliminated']} 個")
+
+
+def stream_duplicates(records, sample_size=DEFAULT_SAMPLE_SIZE, algorithm=DEFAULT_ALGORITHM,
+                      cache=None, workers=DEFAULT_WORKERS, min_size=1, stats=None):
+    """
+    串流版的漸進式比對：邊走訪、邊雜湊、邊產出結果。
+
+    不等整個目錄樹走訪完畢，同大小的第二個檔案一出現就開始比對，
+    確認重複時立即產出 (duplicate, keep)。進行中的雜湊工作數量有上限，
+    各階段只保留每個「大小 / 取樣指紋」的第一個代表檔案。
+
+    Args:
+        records: walker.FileRecord 的 iterable (建議搭配 walker.prefetch 以重疊 I/O)
+        sample_size: 頭尾取樣大小，檔案小於 2 倍取樣大小時直接做完整雜湊
+        cache: 選用的 hash_cache.HashCache，只用於完整雜湊階段
+        min_size: 小於此大小的檔案不列入比對 (預設略過空檔案)
+        stats: 傳入 dict 時，結束後會填入各階段的輸入數量與排除數量 (供 print_stage_report 輸出)
+    """
+    max_inflight = max(1, workers) * 4
+    by_size = {}        # size -> 尚未比對的第一個檔案；None 表示該大小已進入比對
+    by_sample = {}      # (size, sample) -> 尚未完整雜湊的第一個檔案；None 表示已進入完整雜湊
+    keepers = {}        # (size, digest) -> 保留檔
+    grouped_keys = set()
+    counts = defaultdict(int)
+    pending = deque()
+
+    def submit_sample(rec):
+        counts['sample'] += 1
+        pending.append(('sample', rec, False, pool.submit(hash_sample, rec, sample_size, algorithm)))
+
+    def submit_full(rec):
+        counts['full'] += 1
+        digest = cache.get(rec, algorithm) if cache is not None else None
+        if digest:
+            pending.append(('full', rec, True, resolved(digest)))
+        else:
+            pending.append(('full', rec, False, pool.submit(hash_file, rec, algorithm)))
+
+    def promote(table, key, rec, submit):
+        """同一個 key 出現第二個檔案時，連同先前等待中的第一個一起送往下一階段"""
+        if key not in table:
+            table[key] = rec
+            return
+        first = table[key]
+        if first is not None:
+            table[key] = None
+            submit(first)
+        submit(rec)
+
+    def on_size(rec):
+        if rec.size > 2 * sample_size:
+            submit_sample(rec)
+        else:
+            counts['small'] += 1
+            submit_full(rec)
+
+    def on_result(kind, rec, hit, fut):
+        digest = fut.result()
+        if not digest:
+            return
+        key = (rec.size, digest)
+        if kind == 'sample':
+            promote(by_sample, key, rec, submit_full)
+            return
+        if cache is not None and not hit:
+            cache.put(rec, algorithm, digest)
+        keep = keepers.setdefault(key, rec)
+        if keep is not rec:
+            counts['dups'] += 1
+            grouped_keys.add(key)
+            yield rec, keep
+
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+        for rec in records:
+            counts['total'] += 1
+            if rec.size >= min_size:
+                promote(by_size, rec.size, rec, on_size)
+            # 依提交順序處理已完成的結果，保留檔永遠是較早掃描到的那一個
+            while pending and (pending[0][3].done() or len(pending) >= max_inflight):
+                yield from on_result(*pending.popleft())
+        while pending:
+            yield from on_result(*pending.popleft())
+
+    if stats is not None:
+        from_size = counts['sample'] + counts['small']
+        from_sample = counts['full'] - counts['small']
+        grouped = counts['dups'] + len(grouped_keys)
+        stats['size'] = {'input': counts['total'], 'eliminated': counts['total'] - from_size}
+        stats['sample'] = {'input': counts['sample'], 'eliminated': counts['sample'] - from_sample}
+        stats['full'] = {'input': counts['full'], 'eliminated': counts['full'] - grouped}
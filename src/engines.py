@@ -1,23 +1,118 @@
+from bisect import bisect_left, bisect_right
 from pathlib import Path
 import hashlib
-from fontTools.ttLib import TTFont
+from .sfnt_reader import read_faces
+
+# Unicode 區段索引 (名稱, 起點, 終點)：cmap 排序一次後，每個區段只需兩次二分搜尋即可算出覆蓋數
+UNICODE_BLOCKS = (
+    ('CJK', 0x4E00, 0x9FFF),     # CJK 統一漢字
+    ('Ext-A', 0x3400, 0x4DBF),   # CJK 擴充 A
+    ('Hangul', 0xAC00, 0xD7AF),  # 韓文音節
+    ('Kana', 0x3040, 0x30FF),    # 平假名 + 片假名
+)
+TC_CHARS = frozenset([0x4E00, 0x863F])  # 基礎中文字
+SC_CHARS = frozenset([0x4E0E, 0x8FDE])  # 簡體特有字
+BLOCK_FULL = 50.0  # 區段覆蓋率達此百分比才視為支援該文字
+HAN_MIN = 10.0  # CJK 統一漢字覆蓋率達此百分比 (約 2000 字) 才視為中文字體
+
+
+def block_coverage(codepoints):
+    """
+    計算各 Unicode 區段的覆蓋率。
+
+    Args:
+        codepoints: 字體支援的碼位 (任意可迭代物件)
+
+    Returns:
+        dict: {區段名稱: 覆蓋百分比}
+    """
+    cps = sorted(codepoints)
+    return {
+        name: round((bisect_right(cps, hi) - bisect_left(cps, lo)) * 100 / (hi - lo + 1), 1)
+        for name, lo, hi in UNICODE_BLOCKS
+    }
+
+
+def format_coverage(coverage):
+    """只列出有覆蓋的區段，例如 'CJK 98.2% | Kana 100.0%'"""
+    return " | ".join(f"{name} {pct}%" for name, pct in coverage.items() if pct > 0)
+
+
+def detect_language(coverage, codepoints):
+    """
+    依區段覆蓋率判定語系。
+
+    先看假名 / 諺文：日文與韓文字體同樣收錄大量漢字 (含繁簡取樣字)，必須先於繁簡判定；
+    其餘依漢字覆蓋率判定是否為中文字體，再以取樣字區分繁簡。
+
+    Args:
+        coverage: block_coverage() 的結果
+        codepoints: 字體支援的碼位集合 (cmap)
+    """
+    if coverage['Kana'] >= BLOCK_FULL:
+        return "日文"
+    if coverage['Hangul'] >= BLOCK_FULL:
+        return "韓文"
+    if coverage['CJK'] < HAN_MIN:
+        return "西文/其他"
+    is_tc = not TC_CHARS.isdisjoint(codepoints)
+    is_sc = not SC_CHARS.isdisjoint(codepoints)
+    if is_tc and is_sc:
+        return "中日韓 (繁簡全)"
+    return "簡體中文" if is_sc else "繁體中文"
+
+def _analyze_face(font, data, fpath, min_glyph_threshold, coverage_cache):
+    """分析單一字型，填入 data；同一 cmap 表 (.ttc 共用) 的覆蓋率只計算一次"""
+    # 名稱 (ID 4: Full Name)
+    data['Name'] = font.name(4, (3, 1, 1033), (3, 1, 1028)) or fpath.stem
+    
+    # 授權資訊 (ID 13: License Description)
+    lic_text = (font.name(13, (3, 1, 1033)) or font.name(14, (3, 1, 1033)) or "").lower()
+    
+    # 判斷授權風險
+    if any(k in lic_text for k in ['open font', 'sil', 'apache', 'ofl', 'free', 'public domain']):
+        data['License'] = "Open Source"
+    elif any(k in lic_text for k in ['commercial', 'licensed', 'all rights reserved', 'proprietary']):
+        data['License'] = "Commercial"
+        data['Risk_Tag'].append("💰 商用注意")
+    else:
+        data['License'] = "Unknown"
+        data['Risk_Tag'].append("❓ 授權不明")
+
+    # 字數與語系判定
+    cmap = font.cmap
+    if cmap:
+        data['Count'] = len(cmap)
+        if id(cmap) not in coverage_cache:
+            coverage_cache[id(cmap)] = block_coverage(cmap)
+        coverage = coverage_cache[id(cmap)]
+        data['Coverage'] = format_coverage(coverage)
+        data['Lang'] = detect_language(coverage, cmap)
+
+        # 判定缺字風險
+        if data['Count'] < min_glyph_threshold:
+            data['Risk_Tag'].append("⚠️ 字數過少")
+
 
 def analyze_and_filter(fpath: Path, min_glyph_threshold: int = 5000):
     """
     深度解析字體檔案並標記風險項目。
+    .ttc 集合中的每個字型各產生一筆紀錄 (檔案只開啟一次)。
     
     Args:
         fpath (Path): 字體檔案的 pathlib.Path 對象
         min_glyph_threshold (int): 判定為「字數過少」的門檻
         
     Returns:
-        dict: 包含字體名稱、風險標籤、語系、字數等資訊的字典
+        list[dict]: 每個字型一筆，包含字體名稱、風險標籤、語系、字數等資訊
     """
-    data = {
+    base = {
         'Name': '', 
+        'Face': 0,
         'Risk_Tag': [], 
         'Lang': 'Other', 
         'Count': 0, 
+        'Coverage': '',
         'License': 'Unknown', 
         'Size_MB': 0, 
         'Path': str(fpath)
@@ -25,57 +120,23 @@ def analyze_and_filter(fpath: Path, min_glyph_threshold: int = 5000):
     
     # 1. 計算基礎檔案資訊
     try:
-        data['Size_MB'] = round(fpath.stat().st_size / (1024 * 1024), 2)
+        base['Size_MB'] = round(fpath.stat().st_size / (1024 * 1024), 2)
     except Exception:
-        data['Risk_Tag'].append("⚠️ 無法讀取檔案大小")
+        base['Risk_Tag'].append("⚠️ 無法讀取檔案大小")
 
-    # 2. 解析字體內部資訊
+    # 2. 解析字體內部資訊 (只解析 name 與 cmap 表，不建立完整的 TTFont 物件)
+    rows = []
     try:
-        with TTFont(fpath, fontNumber=0, lazy=True) as font:
-            # 取得字體名稱與版權資訊
-            names = font['name']
-            
-            # 名稱 (ID 4: Full Name)
-            name_rec = names.getName(4, 3, 1, 1033) or names.getName(4, 3, 1, 1028)
-            data['Name'] = name_rec.toUnicode() if name_rec else fpath.stem
-            
-            # 授權資訊 (ID 13: License Description)
-            lic_rec = names.getName(13, 3, 1, 1033) or names.getName(14, 3, 1, 1033)
-            lic_text = lic_rec.toUnicode().lower() if lic_rec else ""
-            
-            # 判斷授權風險
-            if any(k in lic_text for k in ['open font', 'sil', 'apache', 'ofl', 'free', 'public domain']):
-                data['License'] = "Open Source"
-            elif any(k in lic_text for k in ['commercial', 'licensed', 'all rights reserved', 'proprietary']):
-                data['License'] = "Commercial"
-                data['Risk_Tag'].append("💰 商用注意")
-            else:
-                data['License'] = "Unknown"
-                data['Risk_Tag'].append("❓ 授權不明")
-
-            # 3. 字數與語系判定
-            cmap = font.getBestCmap()
-            if cmap:
-                chars = list(cmap.keys())
-                data['Count'] = len(chars)
-                
-                # 判定繁簡中文字 (基於 Unicode 區段)
-                is_tc = any(c in chars for c in [0x4E00, 0x863F]) # 基礎中文字
-                is_sc = any(c in chars for c in [0x4E0E, 0x8FDE]) # 簡體特有字
-                
-                if is_tc and is_sc: data['Lang'] = "中日韓 (繁簡全)"
-                elif is_tc: data['Lang'] = "繁體中文"
-                elif is_sc: data['Lang'] = "簡體中文"
-                else: data['Lang'] = "西文/其他"
-
-                # 判定缺字風險
-                if data['Count'] < min_glyph_threshold:
-                    data['Risk_Tag'].append("⚠️ 字數過少")
-
+        coverage_cache = {}
+        for face, font in enumerate(read_faces(fpath, cmap=True)):
+            data = dict(base, Face=face, Risk_Tag=list(base['Risk_Tag']))
+            _analyze_face(font, data, fpath, min_glyph_threshold, coverage_cache)
+            rows.append(data)
     except Exception as e:
-        data['Name'] = fpath.stem
-        data['Risk_Tag'].append(f"❌ 損毀或無法解析: {str(e)}")
+        data = dict(base, Name=fpath.stem, Risk_Tag=base['Risk_Tag'] + [f"❌ 損毀或無法解析: {str(e)}"])
+        rows = [data]
         
     # 格式化 Risk_Tag 為字串
-    data['Risk_Tag'] = " | ".join(data['Risk_Tag']) if data['Risk_Tag'] else "✅ 安全"
-    return data
+    for data in rows:
+        data['Risk_Tag'] = " | ".join(data['Risk_Tag']) if data['Risk_Tag'] else "✅ 安全"
+    return rows
@@ -1,18 +1,11 @@
-import hashlib
 import numpy as np
 from pathlib import Path
+from .hasher import hash_file
 
 # 注意：我們在函數內部或局部引入 AI 庫，避免沒裝環境的人報錯
 def get_md5(file_path: Path):
-    """計算檔案 MD5 (分塊讀取)"""
-    hash_md5 = hashlib.md5()
-    try:
-        with open(file_path, "rb") as f:
-            for chunk in iter(lambda: f.read(4096), b""):
-                hash_md5.update(chunk)
-        return hash_md5.hexdigest()
-    except Exception:
-        return None
+    """計算檔案 MD5 (委派給共用雜湊引擎)"""
+    return hash_file(file_path, algorithm="md5")
 
 def predict_image_category(model, img_path: Path, confidence_threshold: float):
     """AI 內容辨識 (MobileNetV2)"""
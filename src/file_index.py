@@ -0,0 +1,220 @@
+# -*- coding: utf-8 -*-
+"""
+file_index.py
+功能：百萬檔案等級掃描用的欄式 (columnar) 檔案索引
+路徑全部串接在同一個位元組緩衝區，只記錄位移；大小 / 時間 / inode / 雜湊值存在 array 中。
+每個檔案只佔數十個位元組，不再為每個檔案建立 Path 物件與 dict。
+"""
+
+import os
+from array import array
+
+import numpy as np
+
+from walker import FileRecord
+
+MERGE_BLOCK = 65536  # merge_join 每次轉成 Python 整數的列數，避免一次建立數百萬個 int 物件
+
+
+class FileIndex:
+    """
+    欄式檔案索引。
+
+    - 路徑以 UTF-8 (surrogateescape) 編碼後串接在 self._paths，第 i 筆為 _offsets[i]:_offsets[i+1]
+    - 若指定 root，只存相對路徑，節省共同前綴
+    - 依路徑排序、依大小 / 雜湊分群皆以 NumPy 排序向量化完成，不為每個檔案建立 bytes 物件或 dict-of-lists
+    """
+
+    def __init__(self, root=None, digest_size=64):
+        self.root = os.fspath(root) if root is not None else None
+        self._prefix_len = len(os.path.join(self.root, '')) if self.root is not None else 0
+        self._paths = bytearray()
+        self._offsets = array('Q', [0])
+        self.sizes = array('q')
+        self.mtimes = array('q')
+        self.inodes = array('Q')
+        self.devs = array('Q')
+        self.digest_size = digest_size
+        self._digests = bytearray()  # 每筆固定 digest_size bytes，全零表示尚未計算
+
+    @classmethod
+    def from_records(cls, records, root=None, digest_size=64):
+        index = cls(root, digest_size)
+        for rec in records:
+            index.append(rec)
+        return index
+
+    def __len__(self):
+        return len(self.sizes)
+
+    def append(self, rec):
+        """加入一筆 walker.FileRecord，回傳其索引值"""
+        rel = rec.path[self._prefix_len:] if self._prefix_len else rec.path
+        self._paths += rel.encode('utf-8', 'surrogateescape')
+        self._offsets.append(len(self._paths))
+        self.sizes.append(rec.size)
+        self.mtimes.append(rec.mtime_ns)
+        self.inodes.append(rec.inode)
+        self.devs.append(rec.dev)
+        self._digests += bytes(self.digest_size)
+        return len(self.sizes) - 1
+
+    def _rel_bytes(self, i):
+        return bytes(self._paths[self._offsets[i]:self._offsets[i + 1]])
+
+    def rel_path(self, i):
+        """第 i 筆的路徑 (有 root 時為相對路徑)"""
+        return self._rel_bytes(i).decode('utf-8', 'surrogateescape')
+
+    def sorted_order(self):
+        """
+        依路徑排序的索引值陣列 (UTF-8 位元組順序與字串的碼位順序一致)。
+
+        將每個路徑切成 8 bytes 一段的大端序 uint64 (不足補 0)，從最後一段往前逐段做 stable argsort
+        (LSD 基數排序)；路徑不含 NUL，補 0 的較短路徑自然排在其延伸路徑之前。
+        每一輪只佔用一欄 uint64，不建立補齊後的完整矩陣。
+        """
+        return _radix_order(*_path_columns(self._paths, self._offsets))
+
+    def path(self, i):
+        """第 i 筆的完整路徑"""
+        rel = self.rel_path(i)
+        return os.path.join(self.root, rel) if self.root is not None else rel
+
+    def record(self, i):
+        """還原成 FileRecord (只在真正需要處理該檔案時才建立物件)"""
+        return FileRecord(self.path(i), self.sizes[i], self.mtimes[i], self.inodes[i], self.devs[i])
+
+    def set_digest(self, i, hexdigest):
+        raw = bytes.fromhex(hexdigest)[:self.digest_size]
+        start = i * self.digest_size
+        self._digests[start:start + len(raw)] = raw
+
+    def digest(self, i):
+        start = i * self.digest_size
+        raw = bytes(self._digests[start:start + self.digest_size])
+        return raw.hex() if any(raw) else None
+
+    def memory_bytes(self):
+        """索引本身佔用的記憶體 (不含 Python 物件額外開銷)"""
+        columns = (self._offsets, self.sizes, self.mtimes, self.inodes, self.devs)
+        return len(self._paths) + len(self._digests) + sum(c.itemsize * len(c) for c in columns)
+
+    def size_groups(self, min_size=1):
+        """
+        以向量化排序找出大小相同 (且 >= min_size) 的檔案群組。
+
+        回傳索引陣列的 list，每組內維持原加入順序 (stable sort)。
+        """
+        if not len(self):
+            return []
+        sizes = np.frombuffer(self.sizes, dtype=np.int64)
+        return _equal_runs(sizes, np.flatnonzero(sizes >= min_size))
+
+    def digest_groups(self, candidates=None):
+        """在 candidates (預設全部) 中找出雜湊值相同的群組；未計算雜湊的檔案不列入"""
+        if not len(self):
+            return []
+        digests = np.frombuffer(self._digests, dtype=np.uint8).reshape(len(self), self.digest_size)
+        idx = np.arange(len(self)) if candidates is None else np.asarray(candidates, dtype=np.intp)
+        idx = idx[digests[idx].any(axis=1)]
+        # 將每個 digest 視為單一不透明值 (void)，即可與大小一樣做向量化排序
+        keys = np.ascontiguousarray(digests).view(np.dtype((np.void, self.digest_size))).ravel()
+        return _equal_runs(keys, idx)
+
+
+def _equal_runs(values, idx):
+    """對 values[idx] 做 stable 排序，回傳長度 > 1 的相等區段 (原索引值)"""
+    if not len(idx):
+        return []
+    order = idx[np.argsort(values[idx], kind='stable')]
+    sorted_vals = values[order]
+    boundaries = np.flatnonzero(sorted_vals[1:] != sorted_vals[:-1]) + 1
+    return [run for run in np.split(order, boundaries) if len(run) > 1]
+
+
+def _path_columns(*buffers):
+    """
+    將一或多份 (路徑緩衝區, 位移) 串成單一 uint8 緩衝區，回傳 (buf, starts, lengths)。
+
+    多份索引依序接在一起，第 k 份的索引值接在前面各份的筆數之後。
+    """
+    joined, starts, lengths = bytearray(), [], []
+    for paths, offsets in zip(buffers[::2], buffers[1::2]):
+        offsets = np.frombuffer(offsets, dtype=np.uint64).astype(np.int64)
+        starts.append(offsets[:-1] + len(joined))
+        lengths.append(np.diff(offsets))
+        joined += paths
+    joined += bytes(8)  # 讀取超出結尾的位元組時不越界
+    return np.frombuffer(joined, dtype=np.uint8), np.concatenate(starts), np.concatenate(lengths)
+
+
+def _word(buf, starts, lengths, word):
+    """每個路徑的第 word 段 8 bytes，組成大端序 uint64 (超出路徑長度的位元組補 0)"""
+    key = np.zeros(len(starts), dtype=np.uint64)
+    for b in range(8):
+        pos = word * 8 + b
+        byte = buf[np.minimum(starts + pos, len(buf) - 1)]
+        byte[lengths <= pos] = 0
+        key |= byte.astype(np.uint64) << np.uint64(56 - 8 * b)
+    return key
+
+
+def _word_count(lengths):
+    return (int(lengths.max()) + 7) // 8 if len(lengths) else 0
+
+
+def _radix_order(buf, starts, lengths):
+    """
+    依路徑位元組排序的索引值陣列 (UTF-8 位元組順序與字串的碼位順序一致)。
+
+    從最後一段往前逐段做 stable argsort (LSD 基數排序)；路徑不含 NUL，
+    補 0 的較短路徑自然排在其延伸路徑之前。每一輪只佔用一欄 uint64，不建立補齊後的完整矩陣。
+    """
+    order = np.arange(len(starts))
+    for word in range(_word_count(lengths) - 1, -1, -1):
+        key = _word(buf, starts, lengths, word)
+        order = order[np.argsort(key[order], kind='stable')]
+    return order
+
+
+def _same_as_next(buf, starts, lengths, order):
+    """排序後第 p 筆與第 p+1 筆路徑是否相同 (長度與每一段皆相等)，長度為 n - 1 的布林陣列"""
+    starts, lengths = starts[order], lengths[order]
+    same = lengths[1:] == lengths[:-1]
+    for word in range(_word_count(lengths)):
+        key = _word(buf, starts, lengths, word)
+        same &= key[1:] == key[:-1]
+    return same
+
+
+def merge_join(index_a, index_b):
+    """
+    依相對路徑合併兩份索引，逐筆產出 (rel_path, i, j)。
+
+    只存在於 A 時 j 為 None，只存在於 B 時 i 為 None；輸出依路徑排序。
+    兩份路徑一起做基數排序，相同路徑必然相鄰 (stable：A 在前)，配對與否以向量化比對判定；
+    索引值每 MERGE_BLOCK 列才轉成 Python 整數，不一次展開整份排序結果。
+    """
+    n_a = len(index_a)
+    buf, starts, lengths = _path_columns(index_a._paths, index_a._offsets, index_b._paths, index_b._offsets)
+    if not len(starts):
+        return
+    order = _radix_order(buf, starts, lengths)
+    same = _same_as_next(buf, starts, lengths, order)
+
+    # 每組相同路徑只輸出一列 (配對中的 B 併入 A 那一列)
+    keep = np.ones(len(order), dtype=bool)
+    keep[1:] &= ~same
+    paired = np.append(same, False)[keep]
+    rows = order[keep]
+    rows_i = np.where(rows < n_a, rows, -1)
+    rows_j = np.where(paired, order[np.flatnonzero(keep) + paired] - n_a, np.where(rows >= n_a, rows - n_a, -1))
+    del buf, starts, lengths, order, same, keep, paired, rows  # 逐列產出期間只保留兩欄索引值
+
+    for block in range(0, len(rows_i), MERGE_BLOCK):
+        for i, j in zip(rows_i[block:block + MERGE_BLOCK].tolist(), rows_j[block:block + MERGE_BLOCK].tolist()):
+            if i >= 0:
+                yield index_a.rel_path(i), i, (j if j >= 0 else None)
+            else:
+                yield index_b.rel_path(j), None, j
@@ -0,0 +1,123 @@
+# -*- coding: utf-8 -*-
+"""
+hash_cache.py
+功能：跨次執行共用的檔案雜湊快取 (SQLite)
+以 (device, inode, size, mtime_ns) 辨識檔案，stat 相同即直接沿用上次的雜湊值。
+"""
+
+import sqlite3
+import time
+from pathlib import Path
+
+DEFAULT_CACHE_PATH = Path.home() / ".cache" / "file_cleaner" / "hash_cache.sqlite3"
+DEFAULT_MAX_ENTRIES = 1_000_000  # 約數百 MB 以內，超過時淘汰最久未使用的紀錄
+COMMIT_EVERY = 5000
+
+
+class HashCache:
+    """
+    持久化雜湊快取。
+
+    - 命中條件：device、inode、演算法相同，且 size 與 mtime_ns 皆未改變
+    - 檔案已變動：舊紀錄視為過期並立即刪除
+    - 容量上限：關閉時依 last_used 淘汰最舊的紀錄
+    SQLite 連線不可跨執行緒共用，所有讀寫都應在呼叫端的主執行緒進行。
+    """
+
+    def __init__(self, db_path=DEFAULT_CACHE_PATH, max_entries=DEFAULT_MAX_ENTRIES):
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._run_stamp = int(time.time())
+        self._pending = 0
+        self._touched = []
+
+        self.conn = sqlite3.connect(str(self.db_path))
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS hashes (
+                dev INTEGER NOT NULL,
+                ino INTEGER NOT NULL,
+                algo TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                mtime_ns INTEGER NOT NULL,
+                digest TEXT NOT NULL,
+                last_used INTEGER NOT NULL,
+                PRIMARY KEY (dev, ino, algo)
+            ) WITHOUT ROWID
+        """)
+        self.conn.execute("CREATE INDEX IF NOT EXISTS idx_last_used ON hashes (last_used)")
+
+    def get(self, st, algorithm):
+        """依 stat 結果查詢雜湊值，未命中或已過期時回傳 None"""
+        row = self.conn.execute(
+            "SELECT size, mtime_ns, digest FROM hashes WHERE dev=? AND ino=? AND algo=?",
+            (st.st_dev, st.st_ino, algorithm)
+        ).fetchone()
+        if row is None:
+            self.misses += 1
+            return None
+        if row[0] != st.st_size or row[1] != st.st_mtime_ns:
+            # 同一個 inode 但內容已變動 (或 inode 被重複使用)，清掉舊紀錄
+            self.conn.execute(
+                "DELETE FROM hashes WHERE dev=? AND ino=? AND algo=?",
+                (st.st_dev, st.st_ino, algorithm)
+            )
+            self._bump()
+            self.misses += 1
+            return None
+        self.hits += 1
+        self._touched.append((self._run_stamp, st.st_dev, st.st_ino, algorithm))
+        if len(self._touched) >= COMMIT_EVERY:
+            self._flush_touched()
+        return row[2]
+
+    def put(self, st, algorithm, digest):
+        """寫入 (或覆寫) 一筆雜湊紀錄"""
+        if not digest:
+            return
+        self.conn.execute(
+            "INSERT OR REPLACE INTO hashes VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (st.st_dev, st.st_ino, algorithm, st.st_size, st.st_mtime_ns, digest, self._run_stamp)
+        )
+        self._bump()
+
+    def _bump(self):
+        self._pending += 1
+        if self._pending >= COMMIT_EVERY:
+            self.conn.commit()
+            self._pending = 0
+
+    def _flush_touched(self):
+        if self._touched:
+            self.conn.executemany(
+                "UPDATE hashes SET last_used=? WHERE dev=? AND ino=? AND algo=?", self._touched
+            )
+            self._touched = []
+
+    def evict(self):
+        """超過容量上限時，刪除最久未使用的紀錄"""
+        total = self.conn.execute("SELECT COUNT(*) FROM hashes").fetchone()[0]
+        overflow = total - self.max_entries
+        if overflow > 0:
+            self.conn.execute("""
+                DELETE FROM hashes WHERE (dev, ino, algo) IN (
+                    SELECT dev, ino, algo FROM hashes ORDER BY last_used LIMIT ?
+                )
+            """, (overflow,))
+        return max(overflow, 0)
+
+    def close(self):
+        self._flush_touched()
+        self.evict()
+        self.conn.commit()
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
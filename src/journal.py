@@ -0,0 +1,320 @@
+# -*- coding: utf-8 -*-
+"""
+journal.py
+功能：清理作業的預寫式 (write-ahead) 還原日誌 (SQLite)
+每個處置在「執行之前」先寫入日誌，因此任何時間中斷都能得知哪些檔案正在處理；
+restore 依相反順序、分批並行地還原整次清理，中斷的清理也可以從日誌接續完成。
+
+用法：
+    python journal.py list              列出所有清理日誌
+    python journal.py restore [日誌檔]   還原某次清理 (預設為最近一次)
+"""
+
+import argparse
+import errno
+import os
+import shutil
+import sqlite3
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+DEFAULT_JOURNAL_DIR = Path.home() / ".cache" / "file_cleaner" / "journals"
+RESTORE_WORKERS = 8
+
+PENDING, DONE, FAILED, UNDONE = 0, 1, 2, 3
+STATE_LABELS = {PENDING: "處理中", DONE: "已完成", FAILED: "失敗", UNDONE: "已還原"}
+
+
+class Journal:
+    """
+    單次清理作業的日誌。
+
+    - begin() 在處置前寫入並立即 commit (WAL 模式下不需 fsync，代價很低)
+    - done() / failed() 只更新狀態，隨下一次 begin() 一起 commit；
+      若因中斷而遺失，resume / restore 時會依檔案系統的實際狀態判斷是否已完成
+    SQLite 連線不可跨執行緒共用，所有寫入都應在呼叫端的主執行緒進行。
+    """
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self.conn = sqlite3.connect(str(self.path))
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)")
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS entries (
+                id INTEGER PRIMARY KEY,
+                action TEXT NOT NULL,
+                src TEXT NOT NULL,
+                dest TEXT,
+                keep TEXT,
+                mode INTEGER,
+                mtime_ns INTEGER,
+                state INTEGER NOT NULL DEFAULT 0,
+                error TEXT
+            )
+        """)
+        self.conn.commit()
+
+    @classmethod
+    def create(cls, root, tool, journal_dir=DEFAULT_JOURNAL_DIR):
+        """為一次新的清理作業建立日誌"""
+        journal_dir = Path(journal_dir)
+        journal_dir.mkdir(parents=True, exist_ok=True)
+        stamp = time.strftime('%Y%m%d_%H%M%S')
+        path = journal_dir / f"{stamp}_{tool}.sqlite3"
+        n = 1
+        while path.exists():
+            path = journal_dir / f"{stamp}_{tool}_{n}.sqlite3"
+            n += 1
+        journal = cls(path)
+        journal._set_meta(root=os.path.abspath(os.fspath(root)), tool=tool, started=stamp, status='running')
+        return journal
+
+    @classmethod
+    def all(cls, journal_dir=DEFAULT_JOURNAL_DIR):
+        """依時間排序列出所有日誌檔 (舊 → 新)"""
+        return sorted(Path(journal_dir).glob("*.sqlite3"))
+
+    @classmethod
+    def unfinished(cls, root, journal_dir=DEFAULT_JOURNAL_DIR):
+        """找出同一個根目錄下中斷 (未正常結束) 的清理日誌"""
+        root = os.path.abspath(os.fspath(root))
+        found = []
+        for path in cls.all(journal_dir):
+            journal = cls(path)
+            if journal.meta('root') == root and journal.meta('status') == 'running':
+                found.append(journal)
+            else:
+                journal.close()
+        return found
+
+    def _set_meta(self, **values):
+        self.conn.executemany("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", values.items())
+        self.conn.commit()
+
+    def meta(self, key):
+        row = self.conn.execute("SELECT value FROM meta WHERE key=?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def begin(self, action, src, dest=None, keep=None):
+        """處置前寫入日誌並 commit，回傳 entry id"""
+        mode = mtime_ns = None
+        if action != 'move':
+            # 以連結取代會改變原檔的身分，先記下權限與時間以便還原
+            st = os.lstat(src)
+            mode, mtime_ns = st.st_mode, st.st_mtime_ns
+        cur = self.conn.execute(
+            "INSERT INTO entries (action, src, dest, keep, mode, mtime_ns) VALUES (?, ?, ?, ?, ?, ?)",
+            (action, os.fspath(src), dest and os.fspath(dest), keep and os.fspath(keep), mode, mtime_ns)
+        )
+        self.conn.commit()
+        return cur.lastrowid
+
+    def done(self, entry_id):
+        self.conn.execute("UPDATE entries SET state=? WHERE id=?", (DONE, entry_id))
+
+    def discard(self, entry_id):
+        """處置實際上沒有做任何事 (例如兩者早已是同一個檔案)，移除該筆紀錄"""
+        self.conn.execute("DELETE FROM entries WHERE id=?", (entry_id,))
+
+    def failed(self, entry_id, error):
+        self.conn.execute("UPDATE entries SET state=?, error=? WHERE id=?", (FAILED, str(error), entry_id))
+
+    def finish(self):
+        """清理正常結束"""
+        self._set_meta(status='complete', finished=time.strftime('%Y%m%d_%H%M%S'))
+
+    def counts(self):
+        rows = self.conn.execute("SELECT state, COUNT(*) FROM entries GROUP BY state").fetchall()
+        return dict(rows)
+
+    def close(self):
+        self.conn.commit()
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    # ---------------- 接續 / 還原 ----------------
+
+    def _entries(self, states):
+        marks = ",".join("?" * len(states))
+        return self.conn.execute(
+            f"SELECT id, action, src, dest, keep, mode, mtime_ns FROM entries WHERE state IN ({marks}) ORDER BY id",
+            tuple(states)
+        ).fetchall()
+
+    def resume(self):
+        """
+        接續中斷的清理：處理中的項目依檔案系統狀態判斷是否已完成，
+        未完成的搬移補做完成；以連結取代的項目因為是原子性取代，未完成即代表原檔未變，交由重新掃描處理。
+        回傳 (補做完成數, 失敗數)。
+        """
+        redone = failed = 0
+        for entry_id, action, src, dest, keep, _, _ in self._entries((PENDING,)):
+            if _applied(action, src, dest, keep):
+                self.done(entry_id)
+                continue
+            if action != 'move' or not os.path.lexists(src):
+                self.failed(entry_id, "中斷時尚未執行")
+                failed += 1
+                continue
+            try:
+                _move(src, dest)
+                self.done(entry_id)
+                redone += 1
+            except OSError as e:
+                self.failed(entry_id, e)
+                failed += 1
+        self.conn.commit()
+        return redone, failed
+
+    def restore(self, workers=RESTORE_WORKERS):
+        """
+        依相反順序還原所有已完成 (或中斷時處理中且實際已完成) 的處置。
+
+        互不相關的項目分批並行；同一路徑出現在多個項目時，後面的項目先還原。
+        是否已生效在還原該批次時才判斷：同一個檔案被搬移兩次時，前一次的目的地要等後一次還原後才會出現。
+        已完成的搬移若原位置又出現檔案，不覆寫並列入錯誤。
+        回傳 (還原數, [(src, error), ...])。
+        """
+        entries = list(reversed(self._entries((DONE, PENDING))))
+        done_ids = {row[0] for row in self.conn.execute("SELECT id FROM entries WHERE state=?", (DONE,))}
+
+        def restorable(entry):
+            entry_id, action, src, dest, keep, _, _ = entry
+            if action == 'move' and entry_id in done_ids:
+                return os.path.lexists(dest)
+            return _applied(action, src, dest, keep)
+
+        # 依路徑衝突切成數個批次：批次內互不相干、可並行，批次之間維持相反順序
+        waves, wave, touched = [], [], set()
+        for entry in entries:
+            paths = {p for p in (entry[2], entry[3]) if p}
+            if paths & touched:
+                waves.append(wave)
+                wave, touched = [], set()
+            wave.append(entry)
+            touched |= paths
+        if wave:
+            waves.append(wave)
+
+        undone, errors = 0, []
+        with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+            for wave in waves:
+                for entry, fut in [(e, pool.submit(_undo, *e[1:])) for e in wave if restorable(e)]:
+                    try:
+                        fut.result()
+                    except OSError as e:
+                        errors.append((entry[2], e))
+                        continue
+                    self.conn.execute("UPDATE entries SET state=? WHERE id=?", (UNDONE, entry[0]))
+                    undone += 1
+        self._set_meta(status='restored')
+        return undone, errors
+
+
+def _move(src, dest):
+    try:
+        os.rename(src, dest)
+    except OSError as e:
+        if e.errno != errno.EXDEV:
+            raise
+        shutil.move(src, dest)
+
+
+def _applied(action, src, dest, keep):
+    """依檔案系統實際狀態判斷處置是否已生效"""
+    if action == 'move':
+        return os.path.lexists(dest) and not os.path.lexists(src)
+    if action == 'hardlink':
+        try:
+            return os.path.samefile(src, keep)
+        except OSError:
+            return False
+    if action == 'symlink':
+        return os.path.islink(src)
+    # reflink 取代後內容與原檔完全相同，無從分辨也不需分辨
+    return action == 'reflink'
+
+
+def _undo(action, src, dest, keep, mode, mtime_ns):
+    if action == 'move':
+        if os.path.lexists(src):
+            raise FileExistsError(f"原位置已有檔案: {src}")
+        os.makedirs(os.path.dirname(src), exist_ok=True)
+        _move(dest, src)
+        return
+    if action == 'reflink':
+        return  # 已是獨立檔案且內容相同
+    # 硬連結 / 符號連結：以保留檔內容重建獨立的檔案，並還原原本的權限與時間
+    tmp = os.path.join(os.path.dirname(src), f".{os.path.basename(src)}.restore-{os.getpid()}")
+    try:
+        shutil.copyfile(keep, tmp)
+        if mode is not None:
+            os.chmod(tmp, mode & 0o7777)
+        if mtime_ns is not None:
+            os.utime(tmp, ns=(mtime_ns, mtime_ns))
+        os.replace(tmp, src)
+    except BaseException:
+        if os.path.lexists(tmp):
+            os.unlink(tmp)
+        raise
+
+
+def resume_interrupted(root):
+    """互動式檢查同一根目錄下是否有中斷的清理，詢問後接續完成"""
+    for journal in Journal.unfinished(root):
+        with journal:
+            pending = journal.counts().get(PENDING, 0)
+            answer = input(f"⚠️ 偵測到中斷的清理 ({journal.path.name}，{pending} 筆處理中)，是否先接續完成？(Y/n): ")
+            if answer.strip().lower() == 'n':
+                continue
+            redone, failed = journal.resume()
+            journal.finish()
+            print(f"🔁 已接續完成 {redone} 筆，{failed} 筆未執行 (將由本次掃描重新處理)")
+
+
+def _print_journals():
+    for path in Journal.all():
+        with Journal(path) as journal:
+            counts = journal.counts()
+            summary = "，".join(f"{STATE_LABELS[s]} {n}" for s, n in sorted(counts.items()))
+            print(f"{path.name} | {journal.meta('status')} | {journal.meta('root')} | {summary or '無紀錄'}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="清理作業還原日誌")
+    sub = parser.add_subparsers(dest="command", required=True)
+    sub.add_parser("list", help="列出所有清理日誌")
+    restore_cmd = sub.add_parser("restore", help="還原某次清理 (預設為最近一次)")
+    restore_cmd.add_argument("journal", nargs="?", help="日誌檔路徑或檔名")
+    restore_cmd.add_argument("--workers", type=int, default=RESTORE_WORKERS)
+    args = parser.parse_args()
+
+    if args.command == "list":
+        _print_journals()
+    else:
+        journals = Journal.all()
+        if args.journal:
+            target = Path(args.journal)
+            if not target.exists():
+                target = DEFAULT_JOURNAL_DIR / args.journal
+        elif journals:
+            target = journals[-1]
+        else:
+            target = None
+        if target is None or not target.exists():
+            print("❌ 找不到清理日誌。")
+        else:
+            with Journal(target) as journal:
+                print(f"⏪ 正在還原 {target.name} ({journal.meta('root')})...")
+                undone, errors = journal.restore(args.workers)
+                for src, e in errors:
+                    print(f"失敗: {src} - {e}")
+                print(f"✅ 已還原 {undone} 筆，失敗 {len(errors)} 筆")
@@ -0,0 +1,182 @@
+# -*- coding: utf-8 -*-
+"""
+merkle.py
+功能：為專案目錄建立 Merkle 樹狀摘要，並以側車 (sidecar) 索引檔保存
+每個目錄的摘要由其子檔案與子目錄的摘要組成；兩份專案比對時，摘要相同的子樹整棵略過。
+"""
+
+import json
+import os
+from pathlib import Path
+
+from hasher import DEFAULT_ALGORITHM, hash_files, new_hasher
+from walker import FileRecord
+
+SIDECAR_NAME = ".merkle_index.json"
+SIDECAR_VERSION = 1
+
+
+def _join(rel, name):
+    """索引內一律使用 '/' 分隔的相對路徑，確保跨平台可共用"""
+    return f"{rel}/{name}" if rel else name
+
+
+def load_sidecar(root):
+    """讀取側車索引，不存在或格式不符時回傳 None"""
+    sidecar = Path(root) / SIDECAR_NAME
+    try:
+        with open(sidecar, 'r', encoding='utf-8') as f:
+            tree = json.load(f)
+        return tree if tree.get('version') == SIDECAR_VERSION else None
+    except (OSError, ValueError):
+        return None
+
+
+def save_sidecar(root, tree):
+    sidecar = Path(root) / SIDECAR_NAME
+    tmp = sidecar.with_name(sidecar.name + ".tmp")
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump(tree, f, ensure_ascii=False, separators=(',', ':'))
+    os.replace(tmp, sidecar)
+
+
+def build_tree(root, ignore_dirs=(), algorithm=DEFAULT_ALGORITHM, cache=None, save=True):
+    """
+    建立 (或增量更新) root 的 Merkle 樹。
+
+    - 側車索引中 size 與 mtime_ns 未變的檔案直接沿用舊摘要，只有變動的檔案才重新雜湊
+    - 側車以相對路徑為 key，隨專案一起複製 (rsync -a / cp -p) 後仍可沿用
+    - cache: 選用的 hash_cache.HashCache，側車未命中時再查詢
+
+    Returns:
+        tree dict：{'version', 'algorithm', 'dirs': {rel_dir: {'digest', 'files', 'subdirs'}}, 'rehashed'}
+        其中 files 為 {name: [size, mtime_ns, digest]}，rehashed 為本次實際重新雜湊的檔案數
+    """
+    root = Path(root).expanduser()
+    ignore_dirs = set(ignore_dirs) | {SIDECAR_NAME, SIDECAR_NAME + ".tmp"}
+    old = load_sidecar(root)
+    old_dirs = old['dirs'] if old and old.get('algorithm') == algorithm else {}
+
+    dirs = {}
+    unreadable = set()   # 無法完整列出或 stat 的目錄
+    to_hash = []   # (files dict, name, FileRecord)
+    stack = ['']
+    while stack:
+        rel = stack.pop()
+        node = {'digest': None, 'files': {}, 'subdirs': []}
+        dirs[rel] = node
+        prev_files = old_dirs.get(rel, {}).get('files', {})
+        try:
+            it = os.scandir(root / rel if rel else root)
+        except OSError:
+            unreadable.add(rel)
+            continue
+        with it:
+            for entry in it:
+                name = entry.name
+                if name in ignore_dirs:
+                    continue
+                try:
+                    if entry.is_dir(follow_symlinks=False):
+                        node['subdirs'].append(name)
+                        stack.append(_join(rel, name))
+                        continue
+                    if not entry.is_file():
+                        continue
+                    st = entry.stat()
+                except OSError:
+                    unreadable.add(rel)
+                    continue
+                prev = prev_files.get(name)
+                if prev and prev[0] == st.st_size and prev[1] == st.st_mtime_ns and prev[2]:
+                    node['files'][name] = prev
+                else:
+                    node['files'][name] = [st.st_size, st.st_mtime_ns, None]
+                    rec = FileRecord(entry.path, st.st_size, st.st_mtime_ns, st.st_ino or entry.inode(), st.st_dev)
+                    to_hash.append((node['files'], name, rec))
+
+    # 只對新增或變動的檔案並行雜湊
+    records = (rec for _, _, rec in to_hash)
+    for (files, name, _), (_, digest) in zip(to_hash, hash_files(records, algorithm=algorithm, cache=cache)):
+        files[name][2] = digest
+
+    # 由最深的目錄往上計算摘要；含有無法讀取的檔案或目錄的子樹不計算摘要 (digest 為 None)，
+    # 比對時一律展開，兩邊同樣無法讀取也不會被當成相同
+    for rel in sorted(dirs, key=lambda r: r.count('/') + (1 if r else 0), reverse=True):
+        node = dirs[rel]
+        if rel in unreadable or any(f[2] is None for f in node['files'].values()):
+            continue
+        h = new_hasher(algorithm)
+        for name in sorted(node['files']):
+            h.update(f"F\0{name}\0{node['files'][name][2]}\n".encode('utf-8', 'surrogateescape'))
+        for name in sorted(node['subdirs']):
+            sub_digest = dirs.get(_join(rel, name), {}).get('digest')
+            if sub_digest is None:
+                break
+            h.update(f"D\0{name}\0{sub_digest}\n".encode('utf-8', 'surrogateescape'))
+        else:
+            node['digest'] = h.hexdigest()
+
+    tree = {'version': SIDECAR_VERSION, 'algorithm': algorithm, 'dirs': dirs}
+    if save:
+        try:
+            save_sidecar(root, tree)
+        except OSError:
+            pass  # 唯讀媒體上無法寫入側車，不影響本次比對
+    tree['rehashed'] = len(to_hash)
+    return tree
+
+
+def _iter_subtree_files(tree, rel):
+    """列出某個子樹底下的所有檔案 (相對路徑, size)"""
+    stack = [rel]
+    while stack:
+        current = stack.pop()
+        node = tree['dirs'].get(current)
+        if node is None:
+            continue
+        for name, (size, _, _) in sorted(node['files'].items()):
+            yield _join(current, name), size
+        stack.extend(_join(current, d) for d in sorted(node['subdirs'], reverse=True))
+
+
+def compare_trees(tree_a, tree_b, stats=None):
+    """
+    比對兩棵 Merkle 樹，逐筆產出 (status, rel_path, size_a, size_b)。
+
+    status 為 'only_a' / 'only_b' / 'changed'；摘要相同的子目錄整棵略過不展開
+    (摘要為 None 表示子樹內有無法讀取的項目，必定展開)。
+    stats 傳入 dict 時會記錄略過的目錄數 ('skipped_dirs') 與實際展開的目錄數 ('visited_dirs')。
+    """
+    if stats is not None:
+        stats.setdefault('skipped_dirs', 0)
+        stats.setdefault('visited_dirs', 0)
+    stack = ['']
+    while stack:
+        rel = stack.pop()
+        node_a, node_b = tree_a['dirs'][rel], tree_b['dirs'][rel]
+        if node_a['digest'] is not None and node_a['digest'] == node_b['digest']:
+            if stats is not None:
+                stats['skipped_dirs'] += 1
+            continue
+        if stats is not None:
+            stats['visited_dirs'] += 1
+
+        files_a, files_b = node_a['files'], node_b['files']
+        for name in sorted(set(files_a) | set(files_b)):
+            path = _join(rel, name)
+            if name not in files_b:
+                yield 'only_a', path, files_a[name][0], None
+            elif name not in files_a:
+                yield 'only_b', path, None, files_b[name][0]
+            elif files_a[name][2] != files_b[name][2] or files_a[name][2] is None:
+                yield 'changed', path, files_a[name][0], files_b[name][0]
+
+        subs_a, subs_b = set(node_a['subdirs']), set(node_b['subdirs'])
+        for name in sorted(subs_a - subs_b):
+            for path, size in _iter_subtree_files(tree_a, _join(rel, name)):
+                yield 'only_a', path, size, None
+        for name in sorted(subs_b - subs_a):
+            for path, size in _iter_subtree_files(tree_b, _join(rel, name)):
+                yield 'only_b', path, None, size
+        stack.extend(_join(rel, name) for name in sorted(subs_a & subs_b, reverse=True))
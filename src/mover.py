@@ -0,0 +1,164 @@
+# -*- coding: utf-8 -*-
+"""
+mover.py
+功能：批次搬移執行器
+目的地名稱一次規劃完成 (只在第一次使用某目錄時列出一次既有檔名)，同一裝置上直接 os.rename，
+跨裝置才交給有上限的執行緒池複製；報表 (CSV) 以批次寫入，不再每個檔案 exists() + datetime.now()。
+"""
+
+import errno
+import os
+import shutil
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+DEFAULT_MOVE_WORKERS = 4   # 跨裝置複製受磁碟頻寬限制，少量執行緒即可
+DEFAULT_BATCH_SIZE = 500   # 報表每累積此筆數寫入一次
+
+
+class NamePlanner:
+    """
+    為單一目的地目錄規劃不衝突的檔名。
+
+    第一個 foo.pdf 保持原名，之後依序為 foo_1.pdf、foo_2.pdf …；
+    既有檔名只在建立時列出一次，之後的判斷全在記憶體中完成，結果只取決於提交順序。
+    """
+
+    def __init__(self, folder):
+        self.folder = os.fspath(folder)
+        os.makedirs(self.folder, exist_ok=True)
+        self._taken = set(os.listdir(self.folder))
+        self._next = {}  # 原檔名 -> 下一個嘗試的序號
+
+    def plan(self, name):
+        if name not in self._taken:
+            self._taken.add(name)
+            return os.path.join(self.folder, name)
+        stem, ext = os.path.splitext(name)
+        n = self._next.get(name, 1)
+        while f"{stem}_{n}{ext}" in self._taken:
+            n += 1
+        self._next[name] = n + 1
+        candidate = f"{stem}_{n}{ext}"
+        self._taken.add(candidate)
+        return os.path.join(self.folder, candidate)
+
+
+def _move_across(src, dest):
+    """跨裝置搬移 (複製後刪除原檔)"""
+    shutil.move(src, dest)
+    return dest
+
+
+class MoveExecutor:
+    """
+    搬移執行器。
+
+    - submit() 立即規劃目的地並回傳；同一裝置以 os.rename 當場完成，跨裝置則排入執行緒池
+    - 搬移成功後才寫入對應的報表列 (批次寫入 writer)；失敗記錄在 self.errors
+    - completed / completed_bytes 為實際完成的處置數量與大小 (含 record() 記錄的非搬移處置)
+    - 提供 journal (journal.Journal) 時，每次搬移前先寫入還原日誌，完成後標記狀態
+    - 必須呼叫 close() (或使用 with) 等待所有搬移完成並寫出剩餘報表
+    """
+
+    def __init__(self, dest_folder=None, writer=None, workers=DEFAULT_MOVE_WORKERS, batch_size=DEFAULT_BATCH_SIZE,
+                 journal=None):
+        self.dest_folder = dest_folder
+        self.writer = writer
+        self.journal = journal
+        self.workers = max(1, workers)
+        self.batch_size = batch_size
+        self.completed = 0
+        self.completed_bytes = 0
+        self.errors = []   # (src, exception)
+        self._planners = {}
+        self._rows = []
+        self._pending = deque()
+        self._pool = None
+
+    def plan(self, name, dest_dir=None):
+        """為 name 規劃目的地完整路徑 (同名時自動編號)"""
+        folder = os.fspath(dest_dir if dest_dir is not None else self.dest_folder)
+        planner = self._planners.get(folder)
+        if planner is None:
+            planner = self._planners[folder] = NamePlanner(folder)
+        return planner.plan(name)
+
+    def submit(self, src, row=None, size=0, dest_dir=None, dest=None):
+        """
+        搬移 src；回傳規劃好的目的地路徑。
+
+        Args:
+            row: 搬移成功後要寫入報表的 dict
+            size: 計入 completed_bytes 的大小
+            dest_dir: 目的地目錄 (預設為建構時的 dest_folder)
+            dest: 已由 plan() 取得的目的地 (需要在報表中記錄目的地時先呼叫 plan)
+        """
+        src = os.fspath(src)
+        if dest is None:
+            dest = self.plan(os.path.basename(src), dest_dir)
+        entry = self.journal.begin('move', src, dest) if self.journal is not None else None
+        try:
+            os.rename(src, dest)
+        except OSError as e:
+            if e.errno != errno.EXDEV:
+                self._failed(src, entry, e)
+                return dest
+            if self._pool is None:
+                self._pool = ThreadPoolExecutor(max_workers=self.workers)
+            self._pending.append((src, entry, row, size, self._pool.submit(_move_across, src, dest)))
+            while self._pending and (self._pending[0][4].done() or len(self._pending) >= self.workers * 4):
+                self._finish(*self._pending.popleft())
+            return dest
+        self._done(entry, row, size)
+        return dest
+
+    def record(self, row=None, size=0):
+        """記錄一筆已完成的處置 (搬移完成時自動呼叫；以連結取代等其他處置也可共用同一份批次報表)"""
+        self.completed += 1
+        self.completed_bytes += size
+        if row is not None:
+            self._rows.append(row)
+            if len(self._rows) >= self.batch_size:
+                self.flush()
+
+    def _done(self, entry, row, size):
+        if entry is not None:
+            self.journal.done(entry)
+        self.record(row, size)
+
+    def _failed(self, src, entry, error):
+        if entry is not None:
+            self.journal.failed(entry, error)
+        self.errors.append((src, error))
+
+    def _finish(self, src, entry, row, size, fut):
+        try:
+            fut.result()
+        except Exception as e:
+            self._failed(src, entry, e)
+            return
+        self._done(entry, row, size)
+
+    def flush(self):
+        if self._rows and self.writer is not None:
+            self.writer.writerows(self._rows)
+        self._rows.clear()
+
+    def drain(self):
+        """等待進行中的跨裝置搬移完成並寫出報表 (執行器可繼續使用)"""
+        while self._pending:
+            self._finish(*self._pending.popleft())
+        self.flush()
+
+    def close(self):
+        self.drain()
+        if self._pool is not None:
+            self._pool.shutdown()
+            self._pool = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
@@ -1,13 +1,47 @@
 # src/organizer.py
 from datetime import datetime
 import csv
+from multiprocessing import Pool, cpu_count
 from pathlib import Path
 from .engines import analyze_and_filter
+from .walker import walk_files
 
-def run_font_audit(scan_root, report_folder, min_glyph_threshold, dry_run=True):
+FIELDNAMES = ['Name', 'Face', 'Risk_Tag', 'Lang', 'Count', 'Coverage', 'License', 'Size_MB', 'Path']
+TASKS_PER_CHILD = 500  # 每個工作程序處理此數量後重啟，避免 fontTools 快取累積佔用記憶體
+MAX_CHUNK = 32
+
+
+def _audit_one(args):
+    """工作程序入口：回傳該檔案每個字型的結果列；任何例外都轉為錯誤列，單一損毀字體不會讓整個工作程序中斷"""
+    fpath, min_glyph_threshold = args
+    try:
+        return analyze_and_filter(Path(fpath), min_glyph_threshold)
+    except BaseException as e:  # 包含 RecursionError / MemoryError 等非預期狀況
+        if isinstance(e, KeyboardInterrupt):
+            raise
+        return [{'Name': Path(fpath).stem, 'Face': 0, 'Risk_Tag': f"❌ 稽核失敗: {e!r}", 'Lang': 'Other',
+                 'Count': 0, 'Coverage': '', 'License': 'Unknown', 'Size_MB': 0, 'Path': str(fpath)}]
+
+
+def audit_fonts(files, min_glyph_threshold, workers=None):
+    """
+    以程序池平行稽核字體，依輸入順序逐檔產出結果列清單 (imap 保序，邊算邊寫入報表)。
+    檔案很少時直接在主程序執行，省下建立程序池的成本。
+    """
+    workers = workers or cpu_count()
+    tasks = [(str(p), min_glyph_threshold) for p in files]
+    if workers <= 1 or len(tasks) < workers * 2:
+        yield from map(_audit_one, tasks)
+        return
+    chunksize = max(1, min(MAX_CHUNK, len(tasks) // (workers * 8)))
+    with Pool(workers, maxtasksperchild=TASKS_PER_CHILD) as pool:
+        yield from pool.imap(_audit_one, tasks, chunksize=chunksize)
+
+
+def run_font_audit(scan_root, report_folder, min_glyph_threshold, dry_run=True, workers=None):
     src, dest = Path(scan_root), Path(report_folder)
-    files = [f for f in src.rglob('*') if f.suffix.lower() in {'.ttf', '.otf', '.ttc'}]
-    
+    files = [Path(r.path) for r in walk_files(src, exts={'.ttf', '.otf', '.ttc'}, skip_prefixes=())]
+
     if dry_run:
         print(f"🧪 [預覽模式] 發現 {len(files)} 個檔案")
         return
@@ -16,8 +50,10 @@ def run_font_audit(scan_root, report_folder, min_glyph_threshold, dry_run=True):
     csv_path = dest / f"Font_Risk_Report_{datetime.now().strftime('%m%d_%H%M')}.csv"
 
     with open(csv_path, 'w', newline='', encoding='utf-8-sig') as f:
-        fieldnames = ['Name', 'Risk_Tag', 'Lang', 'Count', 'License', 'Size_MB', 'Path']
-        writer = csv.DictWriter(f, fieldnames=fieldnames)
+        writer = csv.DictWriter(f, fieldnames=FIELDNAMES)
         writer.writeheader()
-        for fpath in files:
-            writer.writerow(analyze_and_filter(fpath, min_glyph_threshold))
+        for i, rows in enumerate(audit_fonts(files, min_glyph_threshold, workers), 1):
+            writer.writerows(rows)
+            if i % 1000 == 0:
+                f.flush()
+                print(f"⏳ 已稽核 {i}/{len(files)}")
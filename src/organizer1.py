@@ -1,7 +1,8 @@
-import shutil
-from datetime import datetime
 from pathlib import Path
-from .engines import get_md5, predict_image_category
+from .engines1 import predict_image_category
+from .hasher import hash_files
+from .mover import MoveExecutor
+from .walker import walk_files
 
 def run_image_ai_organizer(src_path, target_base, model, confidence=0.4, dry_run=True):
     src_dir = Path(src_path)
@@ -9,12 +10,13 @@ def run_image_ai_organizer(src_path, target_base, model, confidence=0.4, dry_run
     
     # 掃描檔案
     extensions = ('.jpg', '.jpeg', '.png', '.bmp')
-    all_files = [f for f in src_dir.rglob('*') if f.suffix.lower() in extensions]
+    all_files = [Path(r.path) for r in walk_files(src_dir, exts=set(extensions), skip_prefixes=())]
     
     seen_md5s = {}
+    mover = MoveExecutor()
     
-    for f_path in all_files:
-        f_hash = get_md5(f_path)
+    # 雜湊由共用引擎以執行緒池並行計算，AI 辨識仍依序進行
+    for f_path, f_hash in hash_files(all_files):
         
         # 1. 去重判斷
         if f_hash and f_hash in seen_md5s:
@@ -27,16 +29,16 @@ def run_image_ai_organizer(src_path, target_base, model, confidence=0.4, dry_run
         dest_path = target_base / category / f_path.name
         
         # 執行搬移 (封裝原本的 dry_run 與衝突處理邏輯)
-        execute_move(f_path, dest_path, dry_run)
+        execute_move(f_path, dest_path, dry_run, mover)
+    
+    mover.close()
+    for src, e in mover.errors:
+        print(f"搬移失敗: {src} - {e}")
 
-def execute_move(src: Path, dst: Path, dry_run: bool):
-    """執行搬移，包含衝突處理"""
+def execute_move(src: Path, dst: Path, dry_run: bool, mover: MoveExecutor):
+    """執行搬移：同名衝突由執行器預先編號 (name_1.jpg …)，跨裝置複製在背景並行"""
     if dry_run:
         print(f"[預覽] {src.name} -> {dst}")
         return
     
-    dst.parent.mkdir(parents=True, exist_ok=True)
-    if dst.exists():
-        dst = dst.with_name(f"{dst.stem}_{datetime.now().strftime('%H%M%S')}{dst.suffix}")
-    
-    shutil.move(str(src), str(dst))
+    mover.submit(src, dest=mover.plan(dst.name, dst.parent))
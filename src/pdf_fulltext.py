@@ -0,0 +1,141 @@
+# -*- coding: utf-8 -*-
+"""
+pdf_fulltext.py
+功能：PDF 全文倒排索引 (SQLite FTS5)
+每一頁的文字存入 FTS5 表，關鍵字查詢只需查倒排索引，十萬份 PDF 也能在毫秒內回應。
+中日文沒有空白分詞，寫入與查詢時都把 CJK 字元逐字切開，查詢詞轉為「相鄰字元」片語比對。
+"""
+
+import os
+import re
+import sqlite3
+from pathlib import Path
+
+DEFAULT_FULLTEXT_DB = Path.home() / ".cache" / "file_cleaner" / "pdf_fulltext.sqlite3"
+COMMIT_EVERY = 200  # 每寫入此數量的文件 commit 一次
+PAGE_BITS = 20      # page_text 的 rowid = (文件 id << PAGE_BITS) | 頁碼，刪除整份文件只需 rowid 範圍查詢
+
+_CJK = "\u3040-\u30ff\u3400-\u4dbf\u4e00-\u9fff\uf900-\ufaff"  # 假名、CJK 擴充 A、CJK 統一漢字、相容漢字
+_CJK_CHAR = re.compile(f"([{_CJK}])")
+_CJK_WIDE = _CJK + "\u3000-\u303f\uff00-\uffef"  # 顯示時另含全形標點
+_CJK_GAP = re.compile(f"(?<=[{_CJK_WIDE}]) (?=[{_CJK_WIDE}\\[])|(?<=[{_CJK_WIDE}\\]]) (?=[{_CJK_WIDE}])")
+
+
+def segment(text):
+    """CJK 字元前後補上空白，讓 FTS5 的 unicode61 分詞器把每個字當成一個詞"""
+    return _CJK_CHAR.sub(r" \1 ", text or "")
+
+
+def build_query(terms):
+    """把使用者輸入的關鍵字轉成 FTS5 查詢：每個關鍵字為一個片語，多個關鍵字須同時出現"""
+    phrases = []
+    for term in terms.split():
+        words = " ".join(segment(term).split())
+        if words:
+            phrases.append('"' + words.replace('"', '""') + '"')
+    return " ".join(phrases)
+
+
+class FullTextIndex:
+    """
+    全文索引資料庫。
+
+    - docs：每個 PDF 一筆 (路徑、大小、修改時間、頁數、解析引擎)，用於增量更新
+    - page_text：FTS5 虛擬表，每頁一筆；rowid 由文件 id 與頁碼組成，不必另外存放文件 id
+    SQLite 連線不可跨執行緒共用，所有讀寫都應在呼叫端的主執行緒進行。
+    """
+
+    def __init__(self, db_path=DEFAULT_FULLTEXT_DB):
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self.conn = sqlite3.connect(str(self.db_path))
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS docs (
+                id INTEGER PRIMARY KEY,
+                path TEXT NOT NULL UNIQUE,
+                size INTEGER NOT NULL,
+                mtime_ns INTEGER NOT NULL,
+                pages INTEGER NOT NULL,
+                engine TEXT
+            )
+        """)
+        self.conn.execute(
+            "CREATE VIRTUAL TABLE IF NOT EXISTS page_text USING fts5(body)"
+        )
+        self._pending = 0
+
+    def stale(self, records):
+        """回傳需要 (重新) 建立索引的檔案：新檔案或大小 / 修改時間已改變者"""
+        known = {path: (size, mtime) for path, size, mtime in
+                 self.conn.execute("SELECT path, size, mtime_ns FROM docs")}
+        return [rec for rec in records if known.get(rec.path) != (rec.size, rec.st_mtime_ns)]
+
+    def _delete(self, doc_id):
+        self.conn.execute("DELETE FROM page_text WHERE rowid BETWEEN ? AND ?",
+                          (doc_id << PAGE_BITS, ((doc_id + 1) << PAGE_BITS) - 1))
+        self.conn.execute("DELETE FROM docs WHERE id=?", (doc_id,))
+
+    def add(self, rec, pages, engine):
+        """寫入 (或取代) 一份文件的所有頁面"""
+        row = self.conn.execute("SELECT id FROM docs WHERE path=?", (rec.path,)).fetchone()
+        if row is not None:
+            self._delete(row[0])
+        cur = self.conn.execute(
+            "INSERT INTO docs (path, size, mtime_ns, pages, engine) VALUES (?, ?, ?, ?, ?)",
+            (rec.path, rec.size, rec.st_mtime_ns, len(pages), engine)
+        )
+        base = cur.lastrowid << PAGE_BITS
+        self.conn.executemany(
+            "INSERT INTO page_text (rowid, body) VALUES (?, ?)",
+            ((base | n, segment(text)) for n, text in enumerate(pages[:(1 << PAGE_BITS) - 1], 1)
+             if text and text.strip())
+        )
+        self._pending += 1
+        if self._pending >= COMMIT_EVERY:
+            self.conn.commit()
+            self._pending = 0
+
+    def prune(self, root, seen_paths):
+        """刪除 root 底下已不存在的文件；回傳刪除數量"""
+        # 以「root + 路徑分隔符號」做逐字前綴比對：不用 LIKE，避免 _ / % 被當成萬用字元、
+        # 忽略大小寫，以及 /data/pdfs 誤刪 /data/pdfs_archive 底下的文件
+        prefix = os.path.join(str(Path(root)), "")
+        removed = 0
+        for doc_id, path in self.conn.execute("SELECT id, path FROM docs WHERE substr(path, 1, ?) = ?",
+                                              (len(prefix), prefix)).fetchall():
+            if path not in seen_paths:
+                self._delete(doc_id)
+                removed += 1
+        return removed
+
+    def search(self, terms, limit=20):
+        """
+        關鍵字查詢 (依 bm25 相關度排序)。
+        回傳 [(路徑, 頁碼, 摘要片段), ...]，片段中的命中詞以 [ ] 標示。
+        """
+        query = build_query(terms)
+        if not query:
+            return []
+        rows = self.conn.execute("""
+            SELECT docs.path, page_text.rowid & ?, snippet(page_text, 0, '[', ']', '…', 16)
+            FROM page_text JOIN docs ON docs.id = (page_text.rowid >> ?)
+            WHERE page_text MATCH ?
+            ORDER BY bm25(page_text)
+            LIMIT ?
+        """, ((1 << PAGE_BITS) - 1, PAGE_BITS, query, limit)).fetchall()
+        return [(path, page, _CJK_GAP.sub("", " ".join(snip.split()))) for path, page, snip in rows]
+
+    def count(self):
+        return self.conn.execute("SELECT COUNT(*), COALESCE(SUM(pages), 0) FROM docs").fetchone()
+
+    def close(self):
+        self.conn.commit()
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
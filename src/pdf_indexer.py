@@ -0,0 +1,499 @@
+# -*- coding: utf-8 -*-
+"""
+pdf_indexer.py
+功能：統一的 PDF 索引引擎 (整合 treepdf / treepdf2 / treepdf3 / treepdf-fix)
+四份工具只差在使用 PyPDF2、pypdf 或 PyMuPDF (fitz) 讀取 PDF，這裡改為可抽換的解析引擎：
+自動選用已安裝中最快的引擎，單一檔案解析失敗時再依序改用其他引擎重試。
+
+用法：
+    python pdf_indexer.py                      開啟圖形介面選擇資料夾
+    python pdf_indexer.py <資料夾> -o out.csv   無介面模式 (批次伺服器 / cron)，結果邊解析邊寫入
+    python pdf_indexer.py <資料夾> --fulltext   擷取每一頁全文，建立 / 增量更新全文索引 (SQLite FTS5)
+    python pdf_indexer.py --search "關鍵字"      查詢全文索引
+    python pdf_indexer.py --benchmark <資料夾>  比較各引擎的每秒頁數
+"""
+
+import abc
+import argparse
+import csv
+import importlib
+import json
+import logging
+import sys
+import time
+from datetime import datetime
+from multiprocessing import Pool, cpu_count
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from walker import walk_files
+
+SUMMARY_CHARS = 50
+TARGET_CHUNK_BYTES = 16 * 1024 * 1024  # 每批交給工作行程的 PDF 總量約為此大小
+MAX_CHUNK = 64
+META_FIELDS = ["檔案名稱", "頁數", "內容摘要", "修改日期", "解析引擎", "完整路徑"]
+OUTPUT_FORMATS = ("csv", "jsonl")
+
+
+class PDFBackend(abc.ABC):
+    """解析引擎介面：子類別須設定 name / module 並實作 read() 與 read_pages()"""
+    name = None
+    module = None
+
+    def __init__(self):
+        self.lib = importlib.import_module(self.module)
+
+    @abc.abstractmethod
+    def read(self, file_path: Path):
+        """回傳 (頁數, 第一頁文字)"""
+
+    @abc.abstractmethod
+    def read_pages(self, file_path: Path) -> List[str]:
+        """回傳每一頁文字的 list"""
+
+
+class FitzBackend(PDFBackend):
+    """PyMuPDF：C 實作，速度最快，對損毀檔案的修復能力也最好"""
+    name = "fitz"
+    module = "fitz"
+
+    def read(self, file_path):
+        with self.lib.open(file_path) as doc:
+            if doc.is_encrypted and not doc.authenticate(""):
+                raise PermissionError("PDF 已加密")
+            pages = len(doc)
+            return pages, doc[0].get_text() if pages else ""
+
+    def read_pages(self, file_path):
+        with self.lib.open(file_path) as doc:
+            if doc.is_encrypted and not doc.authenticate(""):
+                raise PermissionError("PDF 已加密")
+            return [page.get_text() for page in doc]
+
+
+class PypdfBackend(PDFBackend):
+    """pypdf：純 Python，非嚴格模式下能容忍多數格式錯誤"""
+    name = "pypdf"
+    module = "pypdf"
+
+    def read(self, file_path):
+        with open(file_path, "rb") as f:
+            reader = self.lib.PdfReader(f, strict=False)
+            pages = len(reader.pages)
+            return pages, reader.pages[0].extract_text() if pages else ""
+
+    def read_pages(self, file_path):
+        with open(file_path, "rb") as f:
+            reader = self.lib.PdfReader(f, strict=False)
+            return [page.extract_text() or "" for page in reader.pages]
+
+
+class PyPDF2Backend(PypdfBackend):
+    """PyPDF2：pypdf 的前身，介面相同，作為最後的備援"""
+    name = "PyPDF2"
+    module = "PyPDF2"
+
+
+# 由快到慢；自動模式選用第一個已安裝的引擎，失敗時依序改用後面的引擎
+BACKENDS = {cls.name: cls for cls in (FitzBackend, PypdfBackend, PyPDF2Backend)}
+
+_loaded = {}  # 每個行程各自載入一次
+
+
+def available_backends() -> List[str]:
+    """已安裝的引擎名稱 (依速度排序)"""
+    names = []
+    for name in BACKENDS:
+        try:
+            load_backend(name)
+        except ImportError:
+            continue
+        names.append(name)
+    return names
+
+
+def load_backend(name: str) -> PDFBackend:
+    backend = _loaded.get(name)
+    if backend is None:
+        if name not in BACKENDS:
+            raise ValueError(f"未知的解析引擎: {name}")
+        backend = _loaded[name] = BACKENDS[name]()
+    return backend
+
+
+def backend_chain(preferred: str = "auto") -> List[str]:
+    """決定嘗試順序：指定的引擎優先，其餘已安裝的引擎依速度排在後面作為備援"""
+    chain = available_backends()
+    if not chain:
+        raise ImportError("找不到任何 PDF 解析套件，請安裝 pymupdf、pypdf 或 PyPDF2")
+    if preferred != "auto":
+        if preferred not in chain:
+            raise ImportError(f"解析引擎 {preferred} 未安裝")
+        chain.remove(preferred)
+        chain.insert(0, preferred)
+    return chain
+
+
+def get_file_metadata(args: tuple) -> Dict:
+    """單一檔案元數據提取：依 chain 順序嘗試各引擎，第一個成功者為準"""
+    file_path, dry_run, chain = args
+    meta = {
+        "檔案名稱": file_path.name,
+        "頁數": 0,
+        "內容摘要": "等待掃描",
+        "修改日期": "未知",
+        "解析引擎": "",
+        "完整路徑": str(file_path.absolute())
+    }
+    try:
+        stats = file_path.stat()
+    except OSError:
+        meta["內容摘要"] = "檔案不存在"
+        return meta
+    meta["修改日期"] = datetime.fromtimestamp(stats.st_mtime).strftime('%Y-%m-%d %H:%M:%S')
+
+    if dry_run:
+        meta["內容摘要"] = "[Dry Run] 模擬完成"
+        return meta
+
+    errors = []
+    for name in chain:
+        try:
+            # 引擎回傳格式不符 (例如文字不是字串) 也視為該引擎失敗，改用下一個
+            pages, text = load_backend(name).read(file_path)
+            text = " ".join((text or "").split())[:SUMMARY_CHARS]
+        except Exception as e:
+            errors.append(f"{name}: {str(e)[:30]}")
+            continue
+        meta["頁數"] = pages
+        meta["解析引擎"] = name
+        meta["內容摘要"] = text if text else "影像 PDF (無可視文字)"
+        if errors:
+            logging.warning(f"{file_path.name} 改用 {name} 解析 ({'; '.join(errors)})")
+        return meta
+
+    logging.error(f"處理失敗 {file_path.name}: {'; '.join(errors)}")
+    meta["內容摘要"] = f"錯誤: {errors[-1] if errors else '未知'}"
+    return meta
+
+
+def find_pdfs(source_path: Path) -> List:
+    """列出 source_path 下所有 PDF (walker.FileRecord，含走訪時取得的大小)"""
+    return list(walk_files(source_path, exts={'.pdf'}))
+
+
+# ---------------- 工作行程 ----------------
+
+_worker_chain = None
+_worker_dry_run = False
+
+
+def _init_worker(chain, dry_run):
+    """工作行程初始化：引擎只在這裡載入一次，之後每個任務只需傳送檔案路徑"""
+    global _worker_chain, _worker_dry_run
+    _worker_chain, _worker_dry_run = chain, dry_run
+    for name in chain:
+        load_backend(name)
+
+
+def _index_file(path: str) -> Dict:
+    return get_file_metadata((Path(path), _worker_dry_run, _worker_chain))
+
+
+def _extract_file(path: str):
+    """全文模式：依引擎順序擷取每一頁文字，回傳 (路徑, 頁面文字 list, 引擎, 錯誤訊息)"""
+    errors = []
+    for name in _worker_chain:
+        try:
+            return path, load_backend(name).read_pages(path), name, None
+        except Exception as e:
+            errors.append(f"{name}: {str(e)[:30]}")
+    return path, [], "", "; ".join(errors)
+
+
+def adaptive_chunksize(sizes: List[int], workers: int) -> int:
+    """
+    依檔案大小決定每批的檔案數：小檔案多時一批多帶幾個，減少行程間往返；
+    大檔案則一批一個，避免單一工作行程拖住整體進度。同時保留每個行程至少 4 批以平均負載。
+    """
+    if not sizes:
+        return 1
+    average = max(1, sum(sizes) // len(sizes))
+    by_bytes = TARGET_CHUNK_BYTES // average
+    by_balance = len(sizes) // (workers * 4)
+    return int(max(1, min(MAX_CHUNK, by_bytes, by_balance)))
+
+
+def setup_logging():
+    # 工業級日誌
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s [%(levelname)s] %(message)s',
+        handlers=[logging.StreamHandler(sys.stdout), logging.FileHandler("process.log", encoding="utf-8")]
+    )
+
+
+class PDFIndexer:
+    """以行程池平行解析 PDF，依輸入順序逐筆產出 meta dict (呼叫端應邊取邊寫入，不需全部留在記憶體)"""
+
+    def __init__(self, backend: str = "auto", workers: Optional[int] = None, dry_run: bool = False):
+        self.chain = backend_chain(backend)
+        self.workers = workers or cpu_count()
+        self.dry_run = dry_run
+        self.chunksize = 1
+
+    def index(self, records: List):
+        """records 為 walker.FileRecord list (find_pdfs 的結果)"""
+        self.chunksize = adaptive_chunksize([rec.size for rec in records], self.workers)
+        return self._run(_index_file, [rec.path for rec in records])
+
+    def extract_text(self, records: List):
+        """全文模式：各檔案的所有頁面在工作行程中平行擷取，依輸入順序產出 (路徑, 頁面文字, 引擎, 錯誤)"""
+        # 全文擷取比只讀第一頁重得多，每批檔案數減半以維持負載平均
+        self.chunksize = max(1, adaptive_chunksize([rec.size for rec in records], self.workers) // 2)
+        return self._run(_extract_file, [rec.path for rec in records])
+
+    def _run(self, func, paths):
+        with Pool(processes=self.workers, initializer=_init_worker, initargs=(self.chain, self.dry_run)) as pool:
+            yield from pool.imap(func, paths, chunksize=self.chunksize)
+
+
+class PDFAutomationTool:
+    """圖形介面版本：選擇資料夾 → 平行解析 → 另存 CSV"""
+
+    def __init__(self, dry_run: bool = False, backend: str = "auto"):
+        self.dry_run = dry_run
+        self.backend = backend
+        self.logger = logging.getLogger("PDFTool")
+
+    def run(self):
+        from tkinter import filedialog, messagebox, Tk
+        from tqdm import tqdm
+
+        setup_logging()
+        root = Tk()
+        root.withdraw()
+        root.attributes("-topmost", True)
+
+        source_dir = filedialog.askdirectory(title="選擇 PDF 資料夾")
+        if not source_dir:
+            self.logger.info("使用者取消操作")
+            return
+
+        pdf_files = find_pdfs(Path(source_dir))
+        if not pdf_files:
+            messagebox.showwarning("提示", "未找到 PDF 檔案！")
+            return
+
+        # 先決定儲存位置，解析結果邊產出邊寫入，不在記憶體中累積整份報表
+        save_path = filedialog.asksaveasfilename(
+            defaultextension=".csv",
+            filetypes=[("CSV", "*.csv")],
+            initialfile=f"PDF報告_{datetime.now().strftime('%m%d')}.csv"
+        )
+        if not save_path:
+            self.logger.info("使用者取消操作")
+            return
+
+        indexer = PDFIndexer(self.backend, dry_run=self.dry_run)
+        results = indexer.index(pdf_files)
+        self.logger.info(f"模式: {'[模擬]' if self.dry_run else '[正式]'} | 檔案數: {len(pdf_files)} | "
+                         f"核心數: {indexer.workers} | 每批: {indexer.chunksize} | 引擎: {' → '.join(indexer.chain)}")
+
+        with ResultSink(save_path) as sink:
+            for meta in tqdm(results, total=len(pdf_files), desc="處理進度"):
+                if meta["內容摘要"] != "檔案不存在":
+                    sink.write(meta)
+        self.logger.info(f"完成！儲存至: {save_path} | 有效筆數: {sink.count}")
+        messagebox.showinfo("完成", f"處理 {sink.count} 筆資料")
+
+
+class ResultSink:
+    """
+    逐筆寫入結果的輸出端 (CSV 或 JSON Lines)，不在記憶體中累積整份結果。
+    每 flush_every 筆寫出一次，中途中斷時已寫入的部分仍可使用。
+    """
+
+    def __init__(self, path, fmt: str = "csv", flush_every: int = 100):
+        if fmt not in OUTPUT_FORMATS:
+            raise ValueError(f"不支援的輸出格式: {fmt}")
+        self.path = Path(path)
+        self.fmt = fmt
+        self.flush_every = flush_every
+        self.count = 0
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        if fmt == "csv":
+            # utf-8-sig 解決 Excel 亂碼問題
+            self._file = open(self.path, "w", encoding="utf-8-sig", newline="")
+            self._writer = csv.DictWriter(self._file, fieldnames=META_FIELDS)
+            self._writer.writeheader()
+        else:
+            self._file = open(self.path, "w", encoding="utf-8")
+
+    def write(self, meta: Dict):
+        if self.fmt == "csv":
+            self._writer.writerow(meta)
+        else:
+            self._file.write(json.dumps(meta, ensure_ascii=False) + "\n")
+        self.count += 1
+        if self.count % self.flush_every == 0:
+            self._file.flush()
+
+    def close(self):
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+def run_headless(source, output=None, workers=None, backend="auto", fmt="csv", dry_run=False) -> int:
+    """無介面模式：解析 source 下所有 PDF，結果依序串流寫入 output；回傳寫入筆數"""
+    from tqdm import tqdm
+
+    logger = logging.getLogger("PDFTool")
+    source_path = Path(source).expanduser()
+    if not source_path.is_dir():
+        raise NotADirectoryError(f"找不到資料夾: {source_path}")
+    output = Path(output) if output else Path(f"PDF報告_{datetime.now().strftime('%m%d')}.{fmt}")
+
+    pdf_files = find_pdfs(source_path)
+    indexer = PDFIndexer(backend, workers, dry_run)
+    results = indexer.index(pdf_files)
+    logger.info(f"模式: {'[模擬]' if dry_run else '[正式]'} | 檔案數: {len(pdf_files)} | "
+                f"核心數: {indexer.workers} | 每批: {indexer.chunksize} | 引擎: {' → '.join(indexer.chain)} | "
+                f"輸出: {output}")
+
+    # 非互動終端 (cron) 不顯示進度條，避免日誌被大量控制字元塞滿
+    with ResultSink(output, fmt) as sink:
+        for meta in tqdm(results, total=len(pdf_files), desc="處理進度", disable=not sys.stderr.isatty()):
+            if meta["內容摘要"] != "檔案不存在":
+                sink.write(meta)
+    logger.info(f"完成！儲存至: {output} | 有效筆數: {sink.count}")
+    return sink.count
+
+
+def run_fulltext(source, db_path=None, workers=None, backend="auto", full_rescan=False) -> int:
+    """
+    全文模式：只重新擷取新增或變動的 PDF，寫入全文索引並移除已刪除的檔案；回傳重新索引的檔案數。
+    full_rescan 時不論全文索引中的紀錄，重新擷取所有 PDF。
+    """
+    from tqdm import tqdm
+    from pdf_fulltext import DEFAULT_FULLTEXT_DB, FullTextIndex
+
+    logger = logging.getLogger("PDFTool")
+    source_path = Path(source).expanduser().resolve()
+    if not source_path.is_dir():
+        raise NotADirectoryError(f"找不到資料夾: {source_path}")
+
+    pdf_files = find_pdfs(source_path)
+    with FullTextIndex(db_path or DEFAULT_FULLTEXT_DB) as index:
+        removed = index.prune(source_path, {rec.path for rec in pdf_files})
+        todo = pdf_files if full_rescan else index.stale(pdf_files)
+        indexer = PDFIndexer(backend, workers)
+        results = indexer.extract_text(todo)
+        logger.info(f"全文索引: {index.db_path} | 檔案數: {len(pdf_files)} | 需更新: {len(todo)} | "
+                    f"已移除: {removed} | 核心數: {indexer.workers} | 每批: {indexer.chunksize}")
+
+        failed = 0
+        for rec, (path, pages, engine, error) in zip(todo, tqdm(results, total=len(todo), desc="擷取全文",
+                                                               disable=not sys.stderr.isatty())):
+            if error:
+                # 仍記錄為 0 頁，檔案未變動前不再重試
+                failed += 1
+                logger.error(f"處理失敗 {Path(path).name}: {error}")
+            index.add(rec, pages, engine)
+        docs, pages = index.count()
+    logger.info(f"完成！全文索引共 {docs} 份文件、{pages} 頁 | 本次失敗: {failed}")
+    return len(todo) - failed
+
+
+def print_search(terms, db_path=None, limit=20):
+    from pdf_fulltext import DEFAULT_FULLTEXT_DB, FullTextIndex
+
+    db_path = Path(db_path or DEFAULT_FULLTEXT_DB)
+    if not db_path.exists():
+        print(f"❌ 找不到全文索引: {db_path}，請先以 --fulltext 建立。")
+        return
+    with FullTextIndex(db_path) as index:
+        start = time.perf_counter()
+        hits = index.search(terms, limit)
+        elapsed = (time.perf_counter() - start) * 1000
+    for path, page, snippet in hits:
+        print(f"📄 {path} (第 {page} 頁)\n    {snippet}")
+    print(f"🔎 {len(hits)} 筆結果，耗時 {elapsed:.1f} ms")
+
+
+def benchmark(pdf_files: List, backends: Optional[List[str]] = None):
+    """
+    在同一批檔案上逐一測試各引擎 (單一行程，結果可直接比較)。
+    回傳 {引擎: {'pages', 'files', 'failed', 'seconds', 'pages_per_sec'}}。
+    """
+    report = {}
+    for name in backends or available_backends():
+        backend = load_backend(name)
+        pages = failed = 0
+        start = time.perf_counter()
+        for f in pdf_files:
+            try:
+                pages += backend.read(f.path)[0]
+            except Exception:
+                failed += 1
+        seconds = time.perf_counter() - start
+        report[name] = {
+            'pages': pages,
+            'files': len(pdf_files),
+            'failed': failed,
+            'seconds': seconds,
+            'pages_per_sec': pages / seconds if seconds else 0.0,
+        }
+    return report
+
+
+def print_benchmark(report):
+    print(f"\n{'引擎':<8} | {'檔案':>6} | {'失敗':>4} | {'頁數':>8} | {'秒':>8} | {'頁/秒':>10}")
+    print("-" * 60)
+    for name, r in sorted(report.items(), key=lambda kv: -kv[1]['pages_per_sec']):
+        print(f"{name:<8} | {r['files']:>6} | {r['failed']:>4} | {r['pages']:>8} | "
+              f"{r['seconds']:>8.2f} | {r['pages_per_sec']:>10.1f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="PDF 索引工具")
+    parser.add_argument("source", nargs="?", help="要索引的資料夾 (提供時以無介面模式執行)")
+    parser.add_argument("-o", "--output", help="輸出檔路徑 (預設為目前目錄下的 PDF報告_<日期>.<格式>)")
+    parser.add_argument("-w", "--workers", type=int, default=None, help="平行解析的行程數 (預設為 CPU 核心數)")
+    parser.add_argument("--backend", default="auto", choices=["auto"] + list(BACKENDS), help="優先使用的解析引擎")
+    parser.add_argument("--format", default="csv", choices=OUTPUT_FORMATS, help="輸出格式")
+    parser.add_argument("--dry-run", action="store_true", help="只列出檔案與修改日期，不解析內容")
+    parser.add_argument("--full", action="store_true", help="全文模式下重新擷取所有 PDF，不沿用全文索引中的紀錄")
+    parser.add_argument("--fulltext", action="store_true", help="擷取每一頁全文並更新全文索引，而不輸出報表")
+    parser.add_argument("--search", metavar="TERMS", help="查詢全文索引 (多個關鍵字以空白分隔，須同時出現)")
+    parser.add_argument("--db", help="全文索引資料庫路徑 (預設 ~/.cache/file_cleaner/pdf_fulltext.sqlite3)")
+    parser.add_argument("--limit", type=int, default=20, help="查詢結果筆數上限")
+    parser.add_argument("--benchmark", metavar="DIR", help="比較各解析引擎在此資料夾 PDF 上的每秒頁數")
+    args = parser.parse_args()
+
+    if args.search:
+        print_search(args.search, args.db, args.limit)
+    elif args.benchmark:
+        files = find_pdfs(Path(args.benchmark).expanduser())
+        if not files:
+            print("❌ 找不到 PDF 檔案。")
+            sys.exit(1)
+        print(f"⏱️ 以 {len(files)} 個 PDF 測試: {', '.join(available_backends())}")
+        print_benchmark(benchmark(files))
+    elif args.source:
+        setup_logging()
+        try:
+            if args.fulltext:
+                run_fulltext(args.source, args.db, args.workers, args.backend, args.full)
+            else:
+                run_headless(args.source, args.output, args.workers, args.backend, args.format, args.dry_run)
+        except (OSError, ImportError) as e:
+            logging.error(str(e))
+            sys.exit(1)
+    else:
+        PDFAutomationTool(dry_run=False, backend=args.backend).run()
@@ -11,7 +11,11 @@ Original file is located at
 # @markdown 本工具會自動掃描指定目錄，提取 PDF 摘要並生成 CSV/HTML 報告。
 
 import os
+import sys
 import json
+import time
+import signal
+import multiprocessing as mp
 import pandas as pd
 from pathlib import Path
 from google.colab import drive
@@ -36,16 +40,86 @@ output_name = "pdf_master_index.csv" # @param {type:"string"}
 dry_run = False # @param {type:"boolean"}
 # @markdown > **Dry Run 模式**：開啟時僅會列出檔案而不進行 PDF 解析與檔案寫入。
 auto_checkpoint = 20 # @param {type:"slider", min:10, max:100, step:10}
+# @markdown ### 🚀 平行處理
+pdf_workers = 0 # @param {type:"slider", min:0, max:16, step:1}
+# @markdown > **pdf_workers**：同時解析 PDF 的行程數，0 代表使用全部 CPU 核心。
+file_timeout = 60 # @param {type:"integer"}
+# @markdown > **file_timeout**：單一 PDF 的解析時間上限 (秒)，超過即標記為逾時並跳過。
+# @markdown ### 🧰 共用模組
+tools_dir = "/content/drive/MyDrive/code-AI-team/src" # @param {type:"string"}
+# @markdown > **tools_dir**：本專案 src 資料夾在 Drive 上的位置 (進度檔使用共用的 checkpoint 模組)。
+
+def _empty_info(path):
+    return {
+        "filename": path.name,
+        "status": "Ready",
+        "summary": "",
+        "pages": 0,
+        "folder": str(path.parent).replace('/content/drive/MyDrive', 'MyDrive'),
+        "path": str(path),
+        "file_size_bytes": 0, # 新增欄位：檔案大小 (位元組)
+        "file_size_mb": 0.0, # 新增欄位：檔案大小 (MB)
+        "file_created_date": "", # 新增欄位：檔案創建日期
+        "file_modified_date": "" # 新增欄位：檔案修改日期
+    }
+
+def _on_timeout(signum, frame):
+    raise TimeoutError()
+
+WATCHDOG_POLL = 5  # 主行程檢查是否有檔案卡住的間隔 (秒)
+TIMEOUT_PREFIX = "⏱️"
+
+def _init_worker(started):
+    """工作行程初始化：記下回報「開始處理」的共享 dict，並設定逾時訊號"""
+    global _started
+    _started = started
+    signal.signal(signal.SIGALRM, _on_timeout)
+
+def extract_pdf_info(path_str):
+    """在工作行程中解析單一 PDF (模組層級函式，才能交給 multiprocessing 傳遞)"""
+    # 經由 Manager 同步寫入開始時間：呼叫返回時主行程已看得到，不受工作行程之後卡住影響
+    _started[path_str] = time.time()
+    path = Path(path_str)
+    info = _empty_info(path)
+    # 逾時計時器：解析卡住時中斷該檔案，工作行程可繼續處理下一個
+    signal.setitimer(signal.ITIMER_REAL, file_timeout)
+    try:
+        # 取得檔案大小
+        file_size_bytes = os.path.getsize(path)
+        info["file_size_bytes"] = file_size_bytes
+        info["file_size_mb"] = round(file_size_bytes / (1024 * 1024), 2) # 轉換為 MB 並保留兩位小數
+
+        # 取得檔案創建和修改日期
+        creation_timestamp = os.path.getctime(path)
+        modification_timestamp = os.path.getmtime(path)
+        info["file_created_date"] = datetime.datetime.fromtimestamp(creation_timestamp).strftime('%Y-%m-%d %H:%M:%S')
+        info["file_modified_date"] = datetime.datetime.fromtimestamp(modification_timestamp).strftime('%Y-%m-%d %H:%M:%S')
+
+        with fitz.open(path) as doc:
+            info["status"] = "✅ 正常" if not doc.is_encrypted else "🔒 加密"
+            info["pages"] = len(doc)
+            if not doc.is_encrypted and len(doc) > 0:
+                text = doc[0].get_text().strip()
+                info["summary"] = " ".join(text.split())[:200]
+    except TimeoutError:
+        info["status"] = f"{TIMEOUT_PREFIX} 逾時 (>{file_timeout}s)"
+    except Exception as e:
+        info["status"] = f"❌ 錯誤: {type(e).__name__}"
+    finally:
+        signal.setitimer(signal.ITIMER_REAL, 0)
+    return info
 
 class ColabAutomation:
     def __init__(self, source_root, export_folder, output_name):
         self.source = Path(source_root)
         self.export = Path(export_folder)
         self.output_csv = self.export / output_name
-        self.checkpoint = self.export / "indexing_progress.json"
+        self.checkpoint_path = self.export / "indexing_checkpoint.jsonl"
+        # 舊版進度檔：整份 JSON 清單，以及每行一筆紀錄的 JSON Lines
+        self.legacy_checkpoints = [self.export / "indexing_progress.json", self.export / "indexing_progress.jsonl"]
         self.html_report = self.export / "dashboard.html"
+        self.checkpoint = None
         self.results = []
-        self.processed_paths = set()
 
     def initialize_env(self):
         """掛載 Drive 並確保輸出目錄存在"""
@@ -55,15 +129,44 @@ class ColabAutomation:
         print(f"✅ 環境初始化完成。輸出路徑：{self.export}")
 
     def load_checkpoint(self):
-        """載入持久化進度防止重複執行"""
-        if self.checkpoint.exists():
+        """載入持久化進度防止重複執行 (共用 checkpoint 模組：逐筆附加，中斷留下的殘行自動略過並整理)"""
+        # tools_dir 位於 Drive 上，必須在 initialize_env() 掛載之後才能匯入
+        if not Path(tools_dir, "checkpoint.py").exists():
+            raise FileNotFoundError(f"找不到共用模組 checkpoint.py，請確認 tools_dir 設定：{tools_dir}")
+        if tools_dir not in sys.path:
+            sys.path.append(tools_dir)
+        from checkpoint import Checkpoint
+        self.checkpoint = Checkpoint(self.checkpoint_path, flush_every=auto_checkpoint)
+        self._migrate_legacy_checkpoints()
+        self.results = [info for _, info in self.checkpoint.items()]
+        if self.checkpoint.damaged:
+            print(f"⚠️ 進度檔有 {self.checkpoint.damaged} 筆不完整的紀錄，已略過並重新整理。")
+        if self.results:
+            print(f"🔄 偵測到雲端進度：已跳過 {len(self.results)} 個檔案。")
+
+    def _migrate_legacy_checkpoints(self):
+        """舊版進度檔 (整份 JSON / 每行一筆的 JSON Lines) 轉入共用檢查點格式"""
+        for legacy in self.legacy_checkpoints:
+            if not legacy.exists():
+                continue
             try:
-                with open(self.checkpoint, 'r', encoding='utf-8') as f:
-                    self.results = json.load(f)
-                    self.processed_paths = {item['path'] for item in self.results}
-                print(f"🔄 偵測到雲端進度：已跳過 {len(self.processed_paths)} 個檔案。")
-            except Exception as e:
-                print(f"⚠️ 進度檔損壞，將從頭開始。")
+                with open(legacy, 'r', encoding='utf-8') as f:
+                    if legacy.suffix == ".json":
+                        items = json.load(f)
+                    else:
+                        items = []
+                        for line in f:
+                            try:
+                                items.append(json.loads(line))
+                            except ValueError:
+                                continue  # 中斷時寫到一半的紀錄，該檔案會重新處理
+            except Exception:
+                print(f"⚠️ 舊版進度檔 {legacy.name} 損壞，其中的檔案將重新處理。")
+                continue
+            for info in items:
+                self.checkpoint.mark(info['path'], info)
+            self.checkpoint.flush()
+            legacy.unlink()
 
     def preview(self):
         """實作 Dry Run 邏輯"""
@@ -80,64 +183,81 @@ class ColabAutomation:
         self.load_checkpoint()
 
         # 取得待處理清單
-        all_pdfs = [p for p in self.source.rglob("*.pdf") if str(p) not in self.processed_paths]
+        all_pdfs = [p for p in self.source.rglob("*.pdf") if str(p) not in self.checkpoint]
 
         if not all_pdfs:
             print("✅ 所有 PDF 已在索引中，無需更新。")
+            self.checkpoint.close()
             return
 
-        pbar = tqdm(all_pdfs, desc="🚀 正在深度分析 PDF", unit="file")
-
-        for i, path in enumerate(pbar):
-            pbar.set_postfix_str(f"處理中: {path.name[:15]}")
+        workers = pdf_workers or os.cpu_count() or 1
+        pending = [str(p) for p in all_pdfs]
 
-            info = {
-                "filename": path.name,
-                "status": "Ready",
-                "summary": "",
-                "pages": 0,
-                "folder": str(path.parent).replace('/content/drive/MyDrive', 'MyDrive'),
-                "path": str(path),
-                "file_size_bytes": 0, # 新增欄位：檔案大小 (位元組)
-                "file_size_mb": 0.0, # 新增欄位：檔案大小 (MB)
-                "file_created_date": "", # 新增欄位：檔案創建日期
-                "file_modified_date": "" # 新增欄位：檔案修改日期
-            }
-
-            try:
-                # 取得檔案大小
-                file_size_bytes = os.path.getsize(path)
-                info["file_size_bytes"] = file_size_bytes
-                info["file_size_mb"] = round(file_size_bytes / (1024 * 1024), 2) # 轉換為 MB 並保留兩位小數
-
-                # 取得檔案創建和修改日期
-                creation_timestamp = os.path.getctime(path)
-                modification_timestamp = os.path.getmtime(path)
-                info["file_created_date"] = datetime.datetime.fromtimestamp(creation_timestamp).strftime('%Y-%m-%d %H:%M:%S')
-                info["file_modified_date"] = datetime.datetime.fromtimestamp(modification_timestamp).strftime('%Y-%m-%d %H:%M:%S')
-
-                with fitz.open(path) as doc:
-                    info["status"] = "✅ 正常" if not doc.is_encrypted else "🔒 加密"
-                    info["pages"] = len(doc)
-                    if not doc.is_encrypted and len(doc) > 0:
-                        text = doc[0].get_text().strip()
-                        info["summary"] = " ".join(text.split())[:200]
-            except Exception as e:
-                info["status"] = f"❌ 錯誤: {type(e).__name__}"
-
-            self.results.append(info)
-
-            # 每隔指定次數儲存進度，防範 IO 異常
-            if (i + 1) % auto_checkpoint == 0:
-                self._save_checkpoint()
+        with tqdm(total=len(all_pdfs), desc="🚀 正在深度分析 PDF", unit="file") as pbar:
+            while pending:
+                pending = self._run_pool(pending, workers, pbar)
 
         self._save_final_reports()
 
-    def _save_checkpoint(self):
-        with open(self.checkpoint, 'w', encoding='utf-8') as f:
-            json.dump(self.results, f, ensure_ascii=False, indent=2)
+    def _record(self, info):
+        """
+        收下一筆結果並串流寫入進度檔 (每累積 auto_checkpoint 筆寫出一次，防範 IO 異常)。
+        逾時的檔案只列入本次報表、不寫入進度檔，下次執行會重試。
+        """
+        self.results.append(info)
+        if not info["status"].startswith(TIMEOUT_PREFIX):
+            self.checkpoint.mark(info["path"], info)
+
+    def _run_pool(self, pending, workers, pbar):
+        """
+        以行程池平行解析 pending，結果依完成順序串流寫入進度檔。
+
+        單一檔案的逾時由工作行程內的計時器處理；若解析卡在 C 函式庫中無法被中斷，
+        主行程依每個檔案回報的開始時間找出超過時限仍未完成的檔案，只將這些檔案標記為逾時，
+        終止整個池子後回傳其餘尚未完成的檔案交由新的行程池繼續。
+        每次只派送一個檔案 (chunksize=1)，完成與否逐檔追蹤，不會把同一批中已完成的檔案誤判為卡住。
+        """
+        manager = mp.Manager()
+        started = manager.dict()
+        done = set()
+        stuck = []
+        stall_limit = file_timeout + 30
+        pool = mp.Pool(workers, initializer=_init_worker, initargs=(started,), maxtasksperchild=100)
+        try:
+            results = pool.imap_unordered(extract_pdf_info, pending)
+            while len(done) < len(pending):
+                try:
+                    info = results.next(timeout=WATCHDOG_POLL)
+                except mp.TimeoutError:
+                    now = time.time()
+                    stuck = [p for p, t in started.items() if p not in done and now - t > stall_limit]
+                    if stuck:
+                        break
+                    continue
+                done.add(info["path"])
+                started.pop(info["path"], None)
+                self._record(info)
+                pbar.set_postfix_str(f"完成: {info['filename'][:15]}")
+                pbar.update(1)
+            else:
+                return []
+        finally:
+            pool.terminate()
+            pool.join()
+            manager.shutdown()
+
+        # 行程池停滯：只有開始處理超過時限仍無結果的檔案標記為逾時，其餘重新派送
+        print(f"\n⚠️ 有 {len(stuck)} 個 PDF 解析停滯，已標記為逾時並重啟工作行程。")
+        for path_str in stuck:
+            info = _empty_info(Path(path_str))
+            info["status"] = f"{TIMEOUT_PREFIX} 逾時 (>{file_timeout}s)"
+            self._record(info)
+            pbar.update(1)
+        stuck = set(stuck)
+        return [p for p in pending if p not in done and p not in stuck]
 
     def _save_final_reports(self):
+        self.checkpoint.flush() # 先寫入剩餘的新紀錄，報表產生失敗也不會遺失進度
         df = pd.DataFrame(self.results)
         # 匯出 CSV (Excel 友善編碼)
         df.to_csv(self.output_csv, index=False, encoding="utf-8-sig")
@@ -148,7 +268,8 @@ class ColabAutomation:
             f.write(f"<h2>PDF 索引報告</h2>{html_style}")
             f.write(df.to_html(index=False))
 
-        self._save_checkpoint() # 最後存一次確保完整
+        self.checkpoint.compact() # 最後整理一次進度檔：每個路徑只保留一筆
+        self.checkpoint.close()
         print(f"\n✨ 任務完成！報告儲存於: {self.export}")
 
 # --- 啟動邏輯 ---
@@ -0,0 +1,316 @@
+# -*- coding: utf-8 -*-
+"""
+sfnt_reader.py
+功能：輕量字體表頭讀取器
+以 mmap 開啟字體，只解析表目錄、name 表與 (需要時) cmap 格式 4 / 12，
+不建立 TTFont 物件；遇到 WOFF、罕見 cmap 格式或結構異常時自動退回 fontTools。
+TrueType Collection (.ttc) 只開啟一次檔案即可逐一讀取每個字型，多個字型共用的表格只解析一次。
+"""
+
+import array
+import io
+import mmap
+import struct
+import sys
+from contextlib import contextmanager
+
+SFNT_VERSIONS = {b"\x00\x01\x00\x00", b"OTTO", b"true"}
+# 與 fontTools getBestCmap 相同的子表優先順序 (平台 ID, 編碼 ID)
+CMAP_PREFERENCES = ((3, 10), (0, 6), (0, 4), (3, 1), (0, 3), (0, 2), (0, 1), (0, 0))
+# 名稱紀錄預設查找順序 (平台 ID, 編碼 ID, 語言 ID)：Windows 英文 → Mac Roman → Windows 繁中
+NAME_PREFERENCES = ((3, 1, 1033), (1, 0, 0), (3, 1, 1028))
+
+
+class SfntError(Exception):
+    """快速解析無法處理的字體 (由 read_font 轉交 fontTools)"""
+
+
+def _u16_array(data):
+    arr = array.array("H")
+    arr.frombytes(data)
+    if sys.byteorder != "big":
+        arr.byteswap()
+    return arr
+
+
+def _decode_name(platform_id, enc_id, lang_id, raw, errors="strict"):
+    """沿用 fontTools 的 NameRecord 解碼規則 (含各種錯誤編碼的修補)"""
+    from fontTools.ttLib.tables._n_a_m_e import NameRecord
+    record = NameRecord()
+    record.nameID, record.platformID, record.platEncID, record.langID = 0, platform_id, enc_id, lang_id
+    record.string = raw
+    return record.toUnicode(errors=errors)
+
+
+class FontHeader:
+    """
+    單一字型的表頭資訊。
+
+    - names：{(name ID, 平台 ID, 編碼 ID, 語言 ID): 原始位元組}，查詢時才解碼
+    - cmap：字型支援的 Unicode 碼位集合 (未要求解析時為 None)
+    """
+
+    def __init__(self, names, cmap=None, decoder=_decode_name):
+        self.names = names
+        self.cmap = cmap
+        self._decoder = decoder
+
+    def name(self, name_id, *preferences, errors="strict"):
+        """依偏好順序回傳第一個存在的名稱字串，都沒有時回傳 None"""
+        for platform_id, enc_id, lang_id in preferences or NAME_PREFERENCES:
+            raw = self.names.get((name_id, platform_id, enc_id, lang_id))
+            if raw is not None:
+                return self._decoder(platform_id, enc_id, lang_id, raw, errors)
+        return None
+
+
+class SfntReader:
+    """
+    直接在位元組緩衝區 (bytes 或 mmap) 上解析 sfnt 結構。
+    TrueType Collection (.ttc) 只讀取表頭中的字型位移，各字型的表目錄於需要時才解析；
+    集合內的字型常指向同一份 name / cmap 表，解析結果依表格位移快取，同一位置只解析一次。
+    """
+
+    def __init__(self, buf):
+        self.buf = buf
+        self._parsed = {}  # (表格標籤, 位移, 長度) -> 解析結果
+        tag = bytes(buf[:4])
+        if tag == b"ttcf":
+            if len(buf) < 12:
+                raise SfntError("TTC 表頭不完整")
+            count = struct.unpack_from(">I", buf, 8)[0]
+            self._check(12, count * 4)
+            self.face_offsets = list(struct.unpack_from(f">{count}I", buf, 12))
+        elif tag in SFNT_VERSIONS:
+            self.face_offsets = [0]
+        else:
+            raise SfntError(f"不支援的字體格式: {tag!r}")
+
+    @property
+    def num_faces(self):
+        return len(self.face_offsets)
+
+    def _check(self, offset, length):
+        if offset < 0 or length < 0 or offset + length > len(self.buf):
+            raise SfntError("表格位移超出檔案範圍")
+
+    def directory(self, face=0):
+        """回傳 {表格標籤: (位移, 長度)}"""
+        base = self.face_offsets[face]
+        self._check(base, 12)
+        if bytes(self.buf[base:base + 4]) not in SFNT_VERSIONS:
+            raise SfntError("字型表頭版本不正確")
+        num_tables = struct.unpack_from(">H", self.buf, base + 4)[0]
+        self._check(base + 12, num_tables * 16)
+        tables = {}
+        for i in range(num_tables):
+            tag, _checksum, offset, length = struct.unpack_from(">4sIII", self.buf, base + 12 + i * 16)
+            self._check(offset, length)
+            tables[tag.decode("latin-1")] = (offset, length)
+        return tables
+
+    def read_names(self, offset, length):
+        """解析 name 表，回傳 {(name ID, 平台, 編碼, 語言): 原始位元組}"""
+        if length < 6:
+            raise SfntError("name 表過短")
+        _fmt, count, string_offset = struct.unpack_from(">3H", self.buf, offset)
+        if 6 + count * 12 > length:
+            raise SfntError("name 表紀錄數超出範圍")
+        storage = offset + string_offset
+        names = {}
+        for i in range(count):
+            platform_id, enc_id, lang_id, name_id, size, pos = struct.unpack_from(">6H", self.buf, offset + 6 + i * 12)
+            start = storage + pos
+            if start + size > offset + length:
+                continue  # 越界紀錄直接略過，與 fontTools 一樣不影響其他名稱
+            names.setdefault((name_id, platform_id, enc_id, lang_id), bytes(self.buf[start:start + size]))
+        return names
+
+    def read_cmap(self, offset, length):
+        """依 getBestCmap 的順序挑選子表並回傳碼位集合；沒有 Unicode 子表時回傳空集合"""
+        if length < 4:
+            raise SfntError("cmap 表過短")
+        count = struct.unpack_from(">H", self.buf, offset + 2)[0]
+        if 4 + count * 8 > length:
+            raise SfntError("cmap 子表數超出範圍")
+        subtables = {}
+        for i in range(count):
+            platform_id, enc_id, sub_offset = struct.unpack_from(">HHI", self.buf, offset + 4 + i * 8)
+            subtables.setdefault((platform_id, enc_id), offset + sub_offset)
+        for key in CMAP_PREFERENCES:
+            if key in subtables:
+                return self._read_subtable(subtables[key], offset + length)
+        return frozenset()
+
+    def _read_subtable(self, start, table_end):
+        self._check(start, 2)
+        fmt = struct.unpack_from(">H", self.buf, start)[0]
+        if fmt == 4:
+            self._check(start, 14)
+            sub_length, _lang, seg_x2 = struct.unpack_from(">3H", self.buf, start + 2)
+            end = min(start + sub_length, table_end)
+            if seg_x2 % 2 or start + 14 + seg_x2 * 4 + 2 > end:
+                raise SfntError("cmap 格式 4 結構異常")
+            return self._format4(_u16_array(self.buf[start + 14:end - (end - start) % 2]), seg_x2 // 2)
+        if fmt == 12:
+            self._check(start, 16)
+            sub_length, _lang, n_groups = struct.unpack_from(">IIII", self.buf, start)[1:]
+            if start + 16 + n_groups * 12 > min(start + sub_length, table_end):
+                raise SfntError("cmap 格式 12 結構異常")
+            groups = array.array("I")
+            groups.frombytes(self.buf[start + 16:start + 16 + n_groups * 12])
+            if sys.byteorder != "big":
+                groups.byteswap()
+            return self._format12(groups)
+        raise SfntError(f"不支援的 cmap 格式 {fmt}")
+
+    @staticmethod
+    def _format4(data, seg_count):
+        """格式 4：與 fontTools 相同，略過最後的 0xFFFF 區段與對應到缺字字形 (glyph 0) 的碼位"""
+        end_code = data[:seg_count]
+        start_code = data[seg_count + 1:seg_count * 2 + 1]
+        id_delta = data[seg_count * 2 + 1:seg_count * 3 + 1]
+        id_range = data[seg_count * 3 + 1:seg_count * 4 + 1]
+        glyph_ids = data[seg_count * 4 + 1:]
+        codes = set()
+        for i in range(seg_count - 1):
+            start, end, delta, range_offset = start_code[i], end_code[i], id_delta[i], id_range[i]
+            if start > end:
+                continue
+            if range_offset == 0:
+                # 整段連續對應，只有 code + delta 剛好為 0 的那一個碼位落在缺字字形
+                missing = (-delta) & 0xFFFF
+                keep = start <= missing <= end and missing in codes
+                codes.update(range(start, end + 1))
+                if start <= missing <= end and not keep:
+                    codes.discard(missing)
+                continue
+            base = range_offset // 2 - start + i - seg_count
+            if base + start < 0 or base + end >= len(glyph_ids):
+                raise SfntError("cmap 格式 4 字形索引超出範圍")
+            for code in range(start, end + 1):
+                gid = glyph_ids[base + code]
+                if gid and (gid + delta) & 0xFFFF:
+                    codes.add(code)
+        return frozenset(codes)
+
+    @staticmethod
+    def _format12(groups):
+        """格式 12：與 fontTools 相同，截斷超過 U+10FFFF 的範圍並略過重疊群組"""
+        codes = set()
+        last_end = 0
+        for start, end, gid in zip(*[iter(groups)] * 3):
+            end = min(end, 0x10FFFF)
+            if start > end or start < last_end:
+                continue
+            last_end = end
+            codes.update(range(start + (gid == 0), end + 1))
+        return frozenset(codes)
+
+    def _shared(self, tag, parse, offset, length):
+        key = (tag, offset, length)
+        if key not in self._parsed:
+            self._parsed[key] = parse(offset, length)
+        return self._parsed[key]
+
+    def face(self, index=0, cmap=False):
+        """解析單一字型的 name (與 cmap) 表"""
+        tables = self.directory(index)
+        if "name" not in tables:
+            raise SfntError("缺少 name 表")
+        names = self._shared("name", self.read_names, *tables["name"])
+        codes = None
+        if cmap:
+            codes = self._shared("cmap", self.read_cmap, *tables["cmap"]) if "cmap" in tables else frozenset()
+        return FontHeader(names, codes)
+
+    def faces(self, cmap=False):
+        """依序解析集合內的所有字型 (一般字體檔只有一個)"""
+        return [self.face(i, cmap) for i in range(self.num_faces)]
+
+
+@contextmanager
+def open_font(path):
+    """以唯讀 mmap 開啟字體檔 (空檔案無法 mmap，直接讀入位元組)"""
+    with open(path, "rb") as f:
+        try:
+            buf = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            buf = f.read()
+        try:
+            yield buf
+        finally:
+            if isinstance(buf, mmap.mmap):
+                buf.close()
+
+
+def _header_from_ttfont(font, cmap=False):
+    names = {}
+    for rec in font["name"].names:
+        names.setdefault((rec.nameID, rec.platformID, rec.platEncID, rec.langID), rec.string)
+    codes = None
+    if cmap:
+        best = font.getBestCmap() if "cmap" in font else None
+        codes = frozenset(best or ())
+    return FontHeader(names, codes)
+
+
+def _fonttools_header(buf, face=0, cmap=False):
+    """退回 fontTools 解析 (直接讀取已載入的緩衝區，不再開檔)，轉成與快速路徑相同的 FontHeader"""
+    from fontTools.ttLib import TTFont
+    with TTFont(io.BytesIO(bytes(buf)), fontNumber=face, lazy=True) as font:
+        return _header_from_ttfont(font, cmap)
+
+
+def _fonttools_faces(buf, cmap=False):
+    """退回 fontTools 解析整個檔案的所有字型"""
+    from fontTools.ttLib import TTCollection
+    if bytes(buf[:4]) != b"ttcf":
+        return [_fonttools_header(buf, 0, cmap)]
+    with TTCollection(io.BytesIO(bytes(buf)), lazy=True) as collection:
+        return [_header_from_ttfont(font, cmap) for font in collection]
+
+
+def parse_faces(buf, cmap=False):
+    """
+    從已載入的緩衝區 (bytes 或 mmap) 解析所有字型；
+    可直接作為 hasher.hash_files 的 parse，讓雜湊與解析共用同一次讀取。
+
+    Returns:
+        list[FontHeader]: 依字型編號排列
+    """
+    try:
+        return SfntReader(buf).faces(cmap=cmap)
+    except (SfntError, struct.error, IndexError):
+        return _fonttools_faces(buf, cmap)
+
+
+def read_font(path, cmap=False, face=0):
+    """
+    讀取字體的名稱 (與 cmap 碼位)。
+
+    Args:
+        path: 字體檔路徑
+        cmap (bool): 是否一併解析 cmap
+        face (int): .ttc 中的字型編號
+
+    Returns:
+        FontHeader
+    """
+    with open_font(path) as buf:
+        try:
+            return SfntReader(buf).face(face, cmap=cmap)
+        except (SfntError, struct.error, IndexError):
+            return _fonttools_header(buf, face, cmap)
+
+
+def read_faces(path, cmap=False):
+    """
+    讀取字體檔內的所有字型 (.ttc 集合中的每個字型各一筆，一般字體檔只有一筆)。
+    檔案只開啟並 mmap 一次。
+
+    Returns:
+        list[FontHeader]: 依字型編號排列
+    """
+    with open_font(path) as buf:
+        return parse_faces(buf, cmap)
@@ -0,0 +1,143 @@
+# -*- coding: utf-8 -*-
+"""
+walker.py
+功能：以 os.scandir 單次走訪目錄樹，取代 rglob('*') + is_file() + stat() 的三重系統呼叫
+忽略的目錄在「進入之前」就剪枝，不會走訪 node_modules 之類的龐大子樹。
+"""
+
+import os
+import queue
+import stat
+import threading
+from collections import namedtuple
+
+DEFAULT_SKIP_PREFIXES = ('._',)  # macOS 在外接硬碟產生的 AppleDouble 檔
+DEFAULT_PREFETCH = 10000
+_END = object()
+
+
+class FileRecord(namedtuple('FileRecord', ['path', 'size', 'mtime_ns', 'inode', 'dev'])):
+    """
+    精簡的檔案紀錄 (路徑字串 + DirEntry 快取的 stat 資訊)。
+
+    可直接當作路徑使用 (open / os.stat / Path 皆可)，
+    也具備 st_size 等屬性，可直接交給 hash_cache 當作 stat 結果查詢。
+    """
+    __slots__ = ()
+
+    def __fspath__(self):
+        return self.path
+
+    def __str__(self):
+        return self.path
+
+    @property
+    def name(self):
+        return os.path.basename(self.path)
+
+    @property
+    def st_size(self):
+        return self.size
+
+    @property
+    def st_mtime_ns(self):
+        return self.mtime_ns
+
+    @property
+    def st_ino(self):
+        return self.inode
+
+    @property
+    def st_dev(self):
+        return self.dev
+
+
+def stat_record(path):
+    """對單一路徑建立 FileRecord (例如檔案事件通知時)，不存在、不是一般檔案或是符號連結時回傳 None"""
+    try:
+        st = os.lstat(path)
+    except OSError:
+        return None
+    if not stat.S_ISREG(st.st_mode):
+        return None
+    return FileRecord(os.fspath(path), st.st_size, st.st_mtime_ns, st.st_ino, st.st_dev)
+
+
+def walk_files(root, ignore_dirs=(), exts=None, skip_prefixes=DEFAULT_SKIP_PREFIXES):
+    """
+    走訪 root 底下所有一般檔案 (不含符號連結)，逐筆產出 FileRecord。
+
+    Args:
+        root: 起始目錄
+        ignore_dirs: 要略過的目錄 / 檔案名稱 (例如 {'.git', 'node_modules'})
+        exts: 只保留的副檔名集合 (小寫、含點，例如 {'.pdf'})；None 表示全部
+        skip_prefixes: 檔名以這些前綴開頭時略過
+    """
+    ignore_dirs = set(ignore_dirs or ())
+    stack = [os.fspath(os.path.expanduser(root))]
+    while stack:
+        current = stack.pop()
+        try:
+            it = os.scandir(current)
+        except OSError:
+            continue  # 權限不足或目錄已被移除
+        subdirs = []
+        dir_dev = None
+        with it:
+            for entry in it:
+                name = entry.name
+                if name in ignore_dirs:
+                    continue
+                try:
+                    # 與 rglob 相同：不追蹤目錄的符號連結，避免循環
+                    if entry.is_dir(follow_symlinks=False):
+                        subdirs.append(entry.path)
+                        continue
+                    # 不追蹤檔案的符號連結：連結與其目標內容相同，會被誤判為重複而互相取代
+                    if not entry.is_file(follow_symlinks=False):
+                        continue
+                    if skip_prefixes and name.startswith(skip_prefixes):
+                        continue
+                    if exts is not None and os.path.splitext(name)[1].lower() not in exts:
+                        continue
+                    st = entry.stat(follow_symlinks=False)
+                    dev = st.st_dev
+                    if not dev:
+                        # Windows 的 DirEntry.stat() 不含 device / inode，每個目錄補查一次
+                        if dir_dev is None:
+                            dir_dev = os.stat(current).st_dev
+                        dev = dir_dev
+                    inode = st.st_ino or entry.inode()
+                except OSError:
+                    continue
+                yield FileRecord(entry.path, st.st_size, st.st_mtime_ns, inode, dev)
+        # 反向推入，讓子目錄依 scandir 列出的順序深度優先處理
+        stack.extend(reversed(subdirs))
+
+
+def prefetch(iterable, maxsize=DEFAULT_PREFETCH):
+    """
+    在背景執行緒中預先走訪，透過有上限的佇列交給呼叫端。
+
+    走訪 (I/O) 與後續的雜湊 / 寫報表可同時進行，而佇列上限讓記憶體維持固定。
+    背景執行緒發生的例外會在呼叫端重新拋出。
+    """
+    q = queue.Queue(maxsize=maxsize)
+
+    def produce():
+        try:
+            for item in iterable:
+                q.put(item)
+        except BaseException as e:
+            q.put(e)
+        finally:
+            q.put(_END)
+
+    threading.Thread(target=produce, daemon=True).start()
+    while True:
+        item = q.get()
+        if item is _END:
+            return
+        if isinstance(item, BaseException):
+            raise item
+        yield item
@@ -0,0 +1,393 @@
+# -*- coding: utf-8 -*-
+"""
+watcher.py
+功能：Linux inotify 監看 (ctypes 直接呼叫 libc，不需額外套件) 與即時重複檔案索引
+常駐監看目錄樹，新寫入或搬入的檔案在數秒內即可完成雜湊與比對，不必定期整棵重掃。
+"""
+
+import ctypes
+import ctypes.util
+import os
+import queue
+import select
+import struct
+import sys
+import threading
+
+from hasher import hash_files
+
+# <sys/inotify.h>
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ONLYDIR = 0x01000000
+IN_ISDIR = 0x40000000
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+
+# 只監看「寫入完成」與「搬入」：IN_CREATE 對檔案而言內容可能尚未寫完，只用於偵測新目錄
+WATCH_MASK = IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE | IN_ONLYDIR
+READ_SIZE = 64 * 1024
+_EVENT = struct.Struct('iIII')  # wd, mask, cookie, len
+
+
+class InotifyWatcher:
+    """
+    遞迴監看 root 底下的所有目錄。
+
+    events() 產出 (kind, path)：
+    - 'changed'：檔案寫入完成或被搬入 (新目錄搬入時，其中既有的檔案也會逐一產出)
+    - 'removed'：檔案被刪除或搬出
+    - 'removed_dir'：目錄被刪除或搬出 (代表其下所有檔案)
+    - 'overflow'：核心事件佇列溢位，呼叫端應完整重掃 (path 為 None)
+    """
+
+    def __init__(self, root, ignore_dirs=()):
+        if not sys.platform.startswith('linux'):
+            raise OSError("inotify 監看模式僅支援 Linux")
+        self.root = os.fspath(os.path.expanduser(root))
+        self.ignore_dirs = set(ignore_dirs or ())
+        self._libc = ctypes.CDLL(ctypes.util.find_library('c') or 'libc.so.6', use_errno=True)
+        self.fd = self._libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 失敗")
+        self._paths = {}  # wd -> 目錄路徑
+        self.add_tree(self.root)
+
+    def _add_watch(self, path):
+        wd = self._libc.inotify_add_watch(self.fd, os.fsencode(path), WATCH_MASK)
+        if wd < 0:
+            err = ctypes.get_errno()
+            if err == 28:  # ENOSPC：超過 fs.inotify.max_user_watches
+                raise OSError(err, "inotify 監看數量已達上限，請調高 fs.inotify.max_user_watches")
+            return  # 權限不足或目錄已消失
+        self._paths[wd] = path
+
+    def add_tree(self, top):
+        """監看 top 及其下所有子目錄 (不追蹤目錄的符號連結)"""
+        stack = [top]
+        while stack:
+            current = stack.pop()
+            self._add_watch(current)
+            try:
+                with os.scandir(current) as it:
+                    for entry in it:
+                        if entry.name not in self.ignore_dirs and entry.is_dir(follow_symlinks=False):
+                            stack.append(entry.path)
+            except OSError:
+                continue
+
+    def _drop_tree(self, top):
+        """目錄被搬出時移除其下所有監看"""
+        prefix = os.path.join(top, '')
+        for wd, path in list(self._paths.items()):
+            if path == top or path.startswith(prefix):
+                self._libc.inotify_rm_watch(self.fd, wd)
+                del self._paths[wd]
+
+    def rewatch(self):
+        """溢位後重新建立所有監看"""
+        for wd in list(self._paths):
+            self._libc.inotify_rm_watch(self.fd, wd)
+        self._paths.clear()
+        self.add_tree(self.root)
+
+    def _files_under(self, top):
+        stack = [top]
+        while stack:
+            current = stack.pop()
+            try:
+                with os.scandir(current) as it:
+                    for entry in it:
+                        if entry.name in self.ignore_dirs:
+                            continue
+                        if entry.is_dir(follow_symlinks=False):
+                            stack.append(entry.path)
+                        elif entry.is_file(follow_symlinks=False):
+                            yield entry.path
+            except OSError:
+                continue
+
+    def events(self, timeout=1.0):
+        """等待最多 timeout 秒，回傳這段期間累積的事件 list"""
+        ready, _, _ = select.select([self.fd], [], [], timeout)
+        if not ready:
+            return []
+        try:
+            buf = os.read(self.fd, READ_SIZE)
+        except BlockingIOError:
+            return []
+
+        out = []
+        offset = 0
+        while offset + _EVENT.size <= len(buf):
+            wd, mask, _cookie, length = _EVENT.unpack_from(buf, offset)
+            name = os.fsdecode(buf[offset + _EVENT.size:offset + _EVENT.size + length].rstrip(b'\0'))
+            offset += _EVENT.size + length
+
+            if mask & IN_Q_OVERFLOW:
+                out.append(('overflow', None))
+                continue
+            if mask & IN_IGNORED:
+                self._paths.pop(wd, None)
+                continue
+            parent = self._paths.get(wd)
+            if parent is None or not name or name in self.ignore_dirs:
+                continue
+            path = os.path.join(parent, name)
+
+            if mask & IN_ISDIR:
+                if mask & (IN_CREATE | IN_MOVED_TO):
+                    # 新目錄：先建立監看再列出既有檔案，避免中間寫入的檔案被漏掉
+                    self.add_tree(path)
+                    out.extend(('changed', p) for p in self._files_under(path))
+                elif mask & (IN_DELETE | IN_MOVED_FROM):
+                    self._drop_tree(path)
+                    out.append(('removed_dir', path))
+            elif mask & (IN_CLOSE_WRITE | IN_MOVED_TO):
+                out.append(('changed', path))
+            elif mask & (IN_DELETE | IN_MOVED_FROM):
+                out.append(('removed', path))
+        return out
+
+    def close(self):
+        if self.fd >= 0:
+            os.close(self.fd)
+            self.fd = -1
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+class DuplicateIndex:
+    """
+    即時重複檔案索引：(size, digest) -> 保留檔，另以大小索引過濾不可能重複的檔案。
+
+    先加入者為保留檔；保留檔被刪除或內容改變時自該索引移除，下一個相同內容的檔案成為新的保留檔。
+    檔案先經 admit() 登記大小：某個大小只有一個檔案時不必雜湊，同大小的第二個檔案出現時才一起雜湊。
+    """
+
+    def __init__(self):
+        self._keepers = {}   # (size, digest) -> path
+        self._key_of = {}    # path -> (size, digest)
+        self._size_of = {}   # path -> size (所有已登記的檔案，含尚未雜湊者)
+        self._sizes = {}     # size -> 該大小已登記的檔案數
+        self._waiting = {}   # size -> 該大小唯一、尚未雜湊的檔案 (FileRecord)
+
+    def __len__(self):
+        return len(self._keepers)
+
+    @property
+    def files(self):
+        """已登記的檔案數"""
+        return len(self._size_of)
+
+    def admit(self, rec):
+        """
+        登記檔案 (walker.FileRecord) 的大小，回傳需要雜湊的 FileRecord list。
+
+        該大小目前只有這個檔案時回傳空 list (先記為等待中)；同大小的第二個檔案出現時，
+        連同等待中的檔案一起回傳，先登記者在前，之後加入時即成為保留檔。
+        """
+        self.remove(rec.path)
+        self._size_of[rec.path] = rec.size
+        count = self._sizes.get(rec.size, 0)
+        self._sizes[rec.size] = count + 1
+        if count == 0:
+            self._waiting[rec.size] = rec
+            return []
+        first = self._waiting.pop(rec.size, None)
+        return [first, rec] if first is not None else [rec]
+
+    def add(self, path, size, digest):
+        """加入已雜湊的檔案；若與既有保留檔重複，回傳該保留檔路徑，否則回傳 None"""
+        self._drop_key(path)
+        key = (size, digest)
+        keep = self._keepers.setdefault(key, path)
+        if keep != path:
+            return keep
+        self._key_of[path] = key
+        return None
+
+    def _drop_key(self, path):
+        key = self._key_of.pop(path, None)
+        if key is not None:
+            self._keepers.pop(key, None)
+
+    def remove(self, path):
+        """移除檔案：保留檔讓出位置，等待中的檔案不再等待；未登記時不做任何事"""
+        self._drop_key(path)
+        size = self._size_of.pop(path, None)
+        if size is None:
+            return
+        if self._sizes[size] > 1:
+            self._sizes[size] -= 1
+        else:
+            del self._sizes[size]
+        waiting = self._waiting.get(size)
+        if waiting is not None and waiting.path == path:
+            del self._waiting[size]
+
+    def remove_tree(self, path):
+        """移除目錄底下的所有檔案"""
+        prefix = os.path.join(path, '')
+        for p in [p for p in self._size_of if p.startswith(prefix)]:
+            self.remove(p)
+
+    def clear(self):
+        self._keepers.clear()
+        self._key_of.clear()
+        self._size_of.clear()
+        self._sizes.clear()
+        self._waiting.clear()
+
+
+class BackgroundHasher:
+    """
+    在背景執行緒中雜湊檔案，監看迴圈不會被大檔案的雜湊卡住，仍能即時讀取事件。
+
+    submit() 將一批 FileRecord 放入有上限的工作佇列 (佇列滿時等待)，
+    results() 取出目前已完成的 (FileRecord, digest)，依提交順序產出。
+    open_cache 為回傳 hash_cache.HashCache 的可呼叫物件：SQLite 連線不可跨執行緒使用，因此在背景執行緒內開啟。
+    背景執行緒發生的例外會在呼叫端的 results() 重新拋出。
+    """
+
+    def __init__(self, open_cache=None, maxsize=4):
+        self._jobs = queue.Queue(maxsize=maxsize)
+        self._results = queue.Queue()
+        self._stop = threading.Event()
+        self._open_cache = open_cache
+        self._error = None
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        try:
+            cache = self._open_cache() if self._open_cache is not None else None
+        except BaseException as e:
+            self._error = e
+            return
+        try:
+            while not self._stop.is_set():
+                batch = self._jobs.get()
+                if batch is None:
+                    break
+                for item in hash_files(batch, cache=cache):
+                    self._results.put(item)
+                    if self._stop.is_set():
+                        break
+        except BaseException as e:
+            self._error = e
+        finally:
+            if cache is not None:
+                cache.close()
+
+    def submit(self, records):
+        records = list(records)
+        while records:
+            try:
+                self._jobs.put(records, timeout=1.0)
+                return
+            except queue.Full:
+                if not self._thread.is_alive():
+                    raise self._error or RuntimeError("背景雜湊執行緒已結束")
+
+    def results(self):
+        while True:
+            try:
+                yield self._results.get_nowait()
+            except queue.Empty:
+                break
+        if self._error is not None:
+            raise self._error
+
+    def close(self):
+        """停止背景執行緒：捨棄尚未開始的工作，等待進行中的雜湊結束並關閉快取"""
+        self._stop.set()
+        while True:
+            try:
+                self._jobs.get_nowait()
+            except queue.Empty:
+                break
+        self._jobs.put(None)
+        self._thread.join()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+class BackgroundWorker:
+    """
+    在背景執行緒中依序執行任務 (例如重複檔案的逐位元組驗證與搬移)，監看迴圈只需讀取事件。
+
+    open_state 為回傳 context manager 的可呼叫物件，在背景執行緒內進入：還原日誌 (SQLite) 等
+    不可跨執行緒使用的資源在此建立，結束時也在背景執行緒內關閉。
+    每個任務以 handle(state, job) 執行；submit() 不會等待，results() 依提交順序取出已完成的
+    (job, 回傳值, 例外)。單一任務失敗只記錄在該筆結果中，不影響後續任務；
+    open_state 本身失敗時，例外會在呼叫端的 submit() / results() 重新拋出。
+    """
+
+    def __init__(self, open_state, handle):
+        self._jobs = queue.Queue()
+        self._results = queue.Queue()
+        self._stop = threading.Event()
+        self._open_state = open_state
+        self._handle = handle
+        self._error = None
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        try:
+            with self._open_state() as state:
+                while not self._stop.is_set():
+                    job = self._jobs.get()
+                    if job is None:
+                        break
+                    try:
+                        self._results.put((job, self._handle(state, job), None))
+                    except Exception as e:
+                        self._results.put((job, None, e))
+        except BaseException as e:
+            self._error = e
+
+    def submit(self, job):
+        if self._error is not None or not self._thread.is_alive():
+            raise self._error or RuntimeError("背景工作執行緒已結束")
+        self._jobs.put(job)
+
+    def results(self):
+        while True:
+            try:
+                yield self._results.get_nowait()
+            except queue.Empty:
+                break
+        if self._error is not None:
+            raise self._error
+
+    def close(self):
+        """停止背景執行緒：捨棄尚未開始的任務，等待進行中的任務結束並關閉 open_state"""
+        self._stop.set()
+        while True:
+            try:
+                self._jobs.get_nowait()
+            except queue.Empty:
+                break
+        self._jobs.put(None)
+        self._thread.join()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
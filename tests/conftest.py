@@ -0,0 +1,8 @@
+# -*- coding: utf-8 -*-
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# 工具模組都是 src/ 底下的平面模組；organizer / engines 使用相對匯入，以 src 套件 (from src.engines ...) 匯入
+sys.path.append(os.path.join(ROOT, 'src'))
+sys.path.append(ROOT)
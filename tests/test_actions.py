@@ -0,0 +1,121 @@
+# -*- coding: utf-8 -*-
+import os
+
+import pytest
+
+from actions import apply_action
+from journal import DONE, FAILED, Journal
+from mover import MoveExecutor
+from walker import walk_files
+
+
+@pytest.fixture
+def files(tmp_path):
+    keep = tmp_path / "keep.txt"
+    dup = tmp_path / "dup.txt"
+    keep.write_bytes(b"content")
+    dup.write_bytes(b"content")
+    return keep, dup
+
+
+def test_move_verifies_then_moves(tmp_path, files):
+    keep, dup = files
+    with MoveExecutor(tmp_path / "archive") as mover:
+        assert apply_action('move', dup, keep, mover, size=7) == "移至回收區"
+    assert not dup.exists()
+    assert (tmp_path / "archive" / "dup.txt").read_bytes() == b"content"
+    assert (mover.completed, mover.completed_bytes) == (1, 7)
+
+
+def test_move_refuses_changed_content(tmp_path, files):
+    keep, dup = files
+    dup.write_bytes(b"changed")
+    with MoveExecutor(tmp_path / "archive") as mover:
+        with pytest.raises(ValueError):
+            apply_action('move', dup, keep, mover)
+    assert dup.read_bytes() == b"changed"
+    assert mover.completed == 0
+
+
+def test_move_refuses_unreadable_duplicate(tmp_path, files):
+    keep, dup = files
+    with MoveExecutor(tmp_path / "archive") as mover:
+        with pytest.raises(OSError):
+            apply_action('move', tmp_path / "missing.txt", keep, mover)
+    assert mover.completed == 0
+
+
+def test_hardlink_replaces_duplicate(tmp_path, files):
+    keep, dup = files
+    mover = MoveExecutor()
+    assert apply_action('hardlink', dup, keep, mover) == "以硬連結取代"
+    assert os.path.samefile(dup, keep)
+    assert mover.completed == 1
+    # 已是同一個檔案：不做任何事
+    assert apply_action('hardlink', dup, keep, mover) is None
+    assert mover.completed == 1
+
+
+def test_symlink_replaces_duplicate(tmp_path, files):
+    keep, dup = files
+    assert apply_action('symlink', dup, keep, MoveExecutor()) == "以符號連結取代"
+    assert os.path.islink(dup)
+    assert os.readlink(dup) == str(keep)
+
+
+def test_link_refuses_changed_content(tmp_path, files):
+    keep, dup = files
+    dup.write_bytes(b"changed")
+    with pytest.raises(ValueError):
+        apply_action('hardlink', dup, keep, MoveExecutor())
+    assert not os.path.samefile(dup, keep)
+    assert dup.read_bytes() == b"changed"
+    assert [p.name for p in tmp_path.iterdir() if p.name.startswith('.')] == []
+
+
+def test_link_actions_are_journaled(tmp_path, files):
+    keep, dup = files
+    other = tmp_path / "other.txt"
+    other.write_bytes(b"different")
+    with Journal.create(tmp_path, 'test', journal_dir=tmp_path / "journals") as journal:
+        mover = MoveExecutor(journal=journal)
+        apply_action('hardlink', dup, keep, mover)
+        with pytest.raises(ValueError):
+            apply_action('hardlink', other, keep, mover)
+        assert apply_action('hardlink', dup, keep, mover) is None
+        assert journal.counts() == {DONE: 1, FAILED: 1}
+
+
+def test_unknown_action(files):
+    keep, dup = files
+    with pytest.raises(ValueError):
+        apply_action('delete', dup, keep, MoveExecutor())
+    assert dup.exists()
+
+
+@pytest.mark.parametrize("action", ['move', 'hardlink', 'reflink', 'symlink'])
+@pytest.mark.parametrize("link_is_dup", [False, True])
+def test_symlink_to_own_duplicate_is_refused(tmp_path, action, link_is_dup):
+    # a_link -> z_real：讀起來內容相同、stat 也是同一個 inode，但處置任一方都會毀損資料
+    real = tmp_path / "z_real"
+    link = tmp_path / "a_link"
+    real.write_bytes(b"precious")
+    link.symlink_to(real)
+    dup, keep = (link, real) if link_is_dup else (real, link)
+
+    with MoveExecutor(tmp_path / "archive") as mover:
+        with pytest.raises(ValueError):
+            apply_action(action, dup, keep, mover)
+
+    assert not real.is_symlink()
+    assert real.read_bytes() == b"precious"
+    assert os.readlink(link) == str(real)
+    assert mover.completed == 0
+
+
+def test_walker_skips_symlinked_files(tmp_path):
+    real = tmp_path / "z_real"
+    real.write_bytes(b"precious")
+    (tmp_path / "a_link").symlink_to(real)
+
+    assert [rec.path for rec in walk_files(tmp_path, skip_prefixes=())] == [str(real)]
@@ -0,0 +1,107 @@
+# -*- coding: utf-8 -*-
+import json
+
+from checkpoint import CHECKPOINT_VERSION, Checkpoint
+
+HEADER = json.dumps({'version': CHECKPOINT_VERSION}) + '\n'
+
+
+def write_lines(path, *lines):
+    path.write_text(HEADER + ''.join(lines), encoding='utf-8')
+
+
+def line(*rec):
+    return json.dumps(list(rec)) + '\n'
+
+
+def reopen(path):
+    with Checkpoint(path) as checkpoint:
+        return dict(checkpoint.items()), checkpoint.damaged
+
+
+def test_round_trip(tmp_path):
+    path = tmp_path / "cp.jsonl"
+    with Checkpoint(path) as checkpoint:
+        checkpoint.mark("a", 1)
+        checkpoint.mark("b", [1, "x"])
+        checkpoint.mark("a", 2)
+    done, damaged = reopen(path)
+    assert done == {"a": 2, "b": [1, "x"]}
+    assert damaged == 0
+
+
+def test_truncated_last_line_is_skipped_and_rewritten(tmp_path):
+    path = tmp_path / "cp.jsonl"
+    write_lines(path, line('d', 'a', 1), line('d', 'b', 2), '["d","c",')
+
+    with Checkpoint(path) as checkpoint:
+        assert dict(checkpoint.items()) == {"a": 1, "b": 2}
+        assert checkpoint.damaged == 1
+        checkpoint.mark("d", 4)
+
+    # 新紀錄不會黏在殘行後面
+    assert reopen(path) == ({"a": 1, "b": 2, "d": 4}, 0)
+
+
+def test_damaged_line_in_the_middle_keeps_later_records(tmp_path):
+    path = tmp_path / "cp.jsonl"
+    write_lines(path, line('d', 'a', 1), '\x00\x00garbage\n', line('d', 'b', 2), line('x'), line('d', 'c', 3))
+
+    with Checkpoint(path) as checkpoint:
+        assert dict(checkpoint.items()) == {"a": 1, "b": 2, "c": 3}
+        assert checkpoint.damaged == 2
+        checkpoint.mark("e", 5)
+
+    assert reopen(path) == ({"a": 1, "b": 2, "c": 3, "e": 5}, 0)
+
+
+def test_complete_last_line_without_newline(tmp_path):
+    path = tmp_path / "cp.jsonl"
+    write_lines(path, line('d', 'a', 1), json.dumps(['d', 'b', 2]))
+
+    with Checkpoint(path) as checkpoint:
+        assert dict(checkpoint.items()) == {"a": 1, "b": 2}
+        checkpoint.mark("c", 3)
+
+    assert reopen(path) == ({"a": 1, "b": 2, "c": 3}, 0)
+
+
+def test_truncated_header_starts_over(tmp_path):
+    path = tmp_path / "cp.jsonl"
+    path.write_text('{"vers', encoding='utf-8')
+
+    with Checkpoint(path) as checkpoint:
+        assert len(checkpoint) == 0
+        checkpoint.mark("a", 1)
+
+    assert reopen(path) == ({"a": 1}, 0)
+
+
+def test_hash_records_survive_truncation(tmp_path):
+    path = tmp_path / "cp.jsonl"
+    write_lines(path, line('h', '/x', 3, 10, 'md5', 'abc'), '["h","/y",3')
+
+    class Rec:
+        path, st_size, st_mtime_ns = '/x', 3, 10
+
+    with Checkpoint(path) as checkpoint:
+        assert checkpoint.hashes().get(Rec, 'md5') == 'abc'
+        assert checkpoint.hashes().get(Rec, 'sha1') is None
+
+
+def test_no_resume_discards_previous_run(tmp_path):
+    path = tmp_path / "cp.jsonl"
+    write_lines(path, line('d', 'a', 1))
+    with Checkpoint(path, resume=False) as checkpoint:
+        assert len(checkpoint) == 0
+    assert reopen(path) == ({}, 0)
+
+
+def test_compact_keeps_last_value(tmp_path):
+    path = tmp_path / "cp.jsonl"
+    with Checkpoint(path) as checkpoint:
+        for i in range(5):
+            checkpoint.mark("a", i)
+        checkpoint.compact()
+        checkpoint.mark("b", 1)
+    assert path.read_text(encoding='utf-8') == HEADER + '["d","a",4]\n["d","b",1]\n'
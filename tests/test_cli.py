@@ -0,0 +1,68 @@
+# -*- coding: utf-8 -*-
+import os
+import subprocess
+import sys
+
+import pytest
+
+from journal import Journal
+from mover import MoveExecutor
+
+SRC = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'src')
+
+
+def run_script(args, home):
+    """如同使用者一般在 src/ 底下直接執行腳本 (腳本目錄位於 sys.path 首位)"""
+    env = dict(os.environ, HOME=str(home))
+    return subprocess.run([sys.executable] + args, cwd=SRC, env=env,
+                          capture_output=True, text=True, timeout=120)
+
+
+def test_journal_cli_list_and_restore(tmp_path):
+    src = tmp_path / "data" / "a.txt"
+    src.parent.mkdir()
+    src.write_bytes(b"a")
+    journal_dir = tmp_path / ".cache" / "file_cleaner" / "journals"
+    with Journal.create(tmp_path / "data", 'test', journal_dir=journal_dir) as journal:
+        with MoveExecutor(tmp_path / "archive", journal=journal) as mover:
+            mover.submit(src)
+        journal.finish()
+    assert not src.exists()
+
+    listed = run_script(["journal.py", "list"], tmp_path)
+    assert listed.returncode == 0, listed.stderr
+    assert journal.path.name in listed.stdout
+
+    restored = run_script(["journal.py", "restore"], tmp_path)
+    assert restored.returncode == 0, restored.stderr
+    assert "已還原 1 筆" in restored.stdout
+    assert src.read_bytes() == b"a"
+
+
+def test_pdf_indexer_cli_help(tmp_path):
+    result = run_script(["pdf_indexer.py", "--help"], tmp_path)
+    assert result.returncode == 0, result.stderr
+    assert "--fulltext" in result.stdout
+
+
+def test_pdf_indexer_cli_headless_run(tmp_path):
+    fitz = pytest.importorskip("fitz")
+    (tmp_path / "pdfs").mkdir()
+    doc = fitz.open()
+    doc.new_page().insert_text((72, 72), "hello")
+    doc.save(str(tmp_path / "pdfs" / "a.pdf"))
+    doc.close()
+    out = tmp_path / "out.csv"
+    log = os.path.join(SRC, "process.log")
+    had_log = os.path.exists(log)
+
+    try:
+        result = run_script(["pdf_indexer.py", str(tmp_path / "pdfs"), "-o", str(out), "-w", "2"], tmp_path)
+    finally:
+        # 無介面模式會在目前目錄寫 process.log，不留在原始碼目錄
+        if not had_log and os.path.exists(log):
+            os.remove(log)
+    assert result.returncode == 0, result.stderr
+    rows = out.read_text(encoding="utf-8-sig").splitlines()
+    assert len(rows) == 2
+    assert rows[1].startswith("a.pdf,1,hello,")
@@ -0,0 +1,101 @@
+# -*- coding: utf-8 -*-
+import os
+
+from dedup import stream_duplicates
+from walker import walk_files
+
+SAMPLE = 1024
+
+
+def write(path, data):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_bytes(data)
+    return str(path)
+
+
+def scan(root, **kwargs):
+    stats = {}
+    records = sorted(walk_files(root, skip_prefixes=()), key=lambda r: r.path)
+    pairs = [(dup.path, keep.path) for dup, keep in
+             stream_duplicates(records, sample_size=SAMPLE, workers=2, stats=stats, **kwargs)]
+    return pairs, stats
+
+
+def test_reports_duplicates_against_first_seen(tmp_path):
+    a = write(tmp_path / "a.txt", b"same")
+    b = write(tmp_path / "b.txt", b"same")
+    c = write(tmp_path / "c.txt", b"same")
+    write(tmp_path / "d.txt", b"diff")
+    write(tmp_path / "e.txt", b"unique size")
+
+    pairs, _ = scan(tmp_path)
+
+    assert pairs == [(b, a), (c, a)]
+
+
+def test_skips_empty_files(tmp_path):
+    write(tmp_path / "a", b"")
+    write(tmp_path / "b", b"")
+
+    pairs, stats = scan(tmp_path)
+
+    assert pairs == []
+    assert stats['size'] == {'input': 2, 'eliminated': 2}
+
+
+def test_sample_stage_eliminates_different_heads(tmp_path):
+    size = 4 * SAMPLE
+    write(tmp_path / "a.bin", b"a" * size)
+    write(tmp_path / "b.bin", b"b" * size)
+
+    pairs, stats = scan(tmp_path)
+
+    assert pairs == []
+    assert stats['sample'] == {'input': 2, 'eliminated': 2}
+    assert stats['full']['input'] == 0
+
+
+def test_full_hash_separates_same_sample(tmp_path):
+    # 頭尾相同、只有中段不同：取樣無法區分，必須由完整雜湊排除
+    head, tail = b"h" * SAMPLE, b"t" * SAMPLE
+    write(tmp_path / "a.bin", head + b"x" * SAMPLE + tail)
+    write(tmp_path / "b.bin", head + b"y" * SAMPLE + tail)
+    write(tmp_path / "c.bin", head + b"x" * SAMPLE + tail)
+
+    pairs, stats = scan(tmp_path)
+
+    assert pairs == [(str(tmp_path / "c.bin"), str(tmp_path / "a.bin"))]
+    assert stats['full'] == {'input': 3, 'eliminated': 1}
+
+
+def test_uses_and_fills_cache(tmp_path):
+    a = write(tmp_path / "a", b"one")
+    b = write(tmp_path / "b", b"two")
+
+    class Cache:
+        def __init__(self):
+            self.store = {}
+
+        def get(self, st, algorithm):
+            return self.store.get((st.path, algorithm))
+
+        def put(self, st, algorithm, digest):
+            self.store[(st.path, algorithm)] = digest
+
+    cache = Cache()
+    assert scan(tmp_path, cache=cache)[0] == []
+    assert {path for path, _ in cache.store} == {a, b}
+
+    # 快取宣稱兩者相同時，串流結果以快取為準 (處置前仍會由 actions 逐位元組驗證)
+    cache.store[(b, 'blake2b')] = cache.store[(a, 'blake2b')]
+    assert scan(tmp_path, cache=cache)[0] == [(b, a)]
+
+
+def test_accepts_generator_input(tmp_path):
+    for i in range(50):
+        write(tmp_path / f"{i:02d}", b"x" * (i % 5 + 1))
+
+    pairs = list(stream_duplicates(walk_files(tmp_path, skip_prefixes=()), sample_size=SAMPLE, workers=1))
+
+    assert len(pairs) == 45
+    assert all(os.path.getsize(dup.path) == os.path.getsize(keep.path) for dup, keep in pairs)
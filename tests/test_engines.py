@@ -0,0 +1,67 @@
+# -*- coding: utf-8 -*-
+import pytest
+
+from src.engines import BLOCK_FULL, HAN_MIN, SC_CHARS, TC_CHARS, block_coverage, detect_language, format_coverage
+
+KANA = range(0x3040, 0x3100)
+HANGUL = range(0xAC00, 0xD7B0)
+LATIN = range(0x20, 0x7F)
+
+
+def han(percent):
+    """CJK 統一漢字區段開頭約 percent% 的碼位 (不含繁簡取樣字，由各測試自行加入)"""
+    return set(range(0x4E00, 0x4E00 + (0x9FFF - 0x4E00 + 1) * percent // 100)) - TC_CHARS - SC_CHARS
+
+
+def test_block_coverage_counts_inclusive_bounds():
+    coverage = block_coverage({0x3040, 0x30FF, 0x4E00, 0x9FFF, 0x41})
+    assert coverage['Kana'] == round(2 * 100 / 192, 1)
+    assert coverage['CJK'] == round(2 * 100 / 20992, 1)
+    assert coverage['Hangul'] == 0 and coverage['Ext-A'] == 0
+
+
+def test_block_coverage_full_and_empty():
+    assert block_coverage(list(KANA) + list(LATIN))['Kana'] == 100.0
+    assert block_coverage([]) == {'CJK': 0, 'Ext-A': 0, 'Hangul': 0, 'Kana': 0}
+
+
+def test_format_coverage_lists_only_covered_blocks():
+    assert format_coverage({'CJK': 98.2, 'Ext-A': 0, 'Hangul': 0, 'Kana': 100.0}) == "CJK 98.2% | Kana 100.0%"
+    assert format_coverage({'CJK': 0, 'Kana': 0}) == ""
+
+
+@pytest.mark.parametrize("codepoints, lang", [
+    # 日文 / 韓文字體同樣含有大量漢字與繁簡取樣字，仍應依假名 / 諺文判定
+    (set(KANA) | han(30) | TC_CHARS | SC_CHARS, "日文"),
+    (set(HANGUL) | han(20) | TC_CHARS | SC_CHARS, "韓文"),
+    (han(60) | TC_CHARS, "繁體中文"),
+    (han(40) | SC_CHARS, "簡體中文"),
+    (han(90) | TC_CHARS | SC_CHARS, "中日韓 (繁簡全)"),
+    # 西文字體附帶少數漢字 (含取樣字「一」) 不算中文字體
+    (set(LATIN) | {0x4E00, 0x4E8C, 0x4E09}, "西文/其他"),
+    (set(LATIN), "西文/其他"),
+])
+def test_detect_language(codepoints, lang):
+    assert detect_language(block_coverage(codepoints), codepoints) == lang
+
+
+def test_detect_language_thresholds():
+    below_kana = set(range(0x3040, 0x3040 + int(192 * BLOCK_FULL / 100) - 1)) | han(30) | TC_CHARS
+    assert detect_language(block_coverage(below_kana), below_kana) == "繁體中文"
+    below_han = han(int(HAN_MIN) - 1) | TC_CHARS
+    assert detect_language(block_coverage(below_han), below_han) == "西文/其他"
+
+
+def test_analyze_and_filter_reports_language_and_coverage(tmp_path):
+    pytest.importorskip("fontTools")
+    from test_sfnt_reader import build_font
+    from src.engines import analyze_and_filter
+
+    mapping = {cp: "g1" for cp in set(KANA) | han(30) | TC_CHARS | SC_CHARS}
+    path = tmp_path / "jp.ttf"
+    path.write_bytes(build_font(mapping, family="JP Test"))
+
+    [row] = analyze_and_filter(path, min_glyph_threshold=5000)
+    assert row['Lang'] == "日文"
+    assert row['Count'] == len(mapping)
+    assert row['Coverage'].startswith("CJK ") and "Kana 100.0%" in row['Coverage']
@@ -0,0 +1,92 @@
+# -*- coding: utf-8 -*-
+import random
+
+from file_index import FileIndex, merge_join
+from walker import FileRecord
+
+
+def build(root, names):
+    return FileIndex.from_records((FileRecord(f"{root}/{name}", i, 0, 0, 0) for i, name in enumerate(names)), root)
+
+
+def test_sorted_order_matches_byte_order():
+    rng = random.Random(0)
+    alphabet = ["a", "b", "/", ".", "Z", "é", "中", "a/b"]
+    names = ["".join(rng.choice(alphabet) for _ in range(rng.randint(1, 25))) for _ in range(2000)]
+    names += ["a", "a/", "ab", "a" * 40]
+    index = build("/root", names)
+
+    order = index.sorted_order().tolist()
+
+    assert order == sorted(range(len(names)), key=lambda i: names[i].encode("utf-8"))
+    assert [index.rel_path(i) for i in order][:3] == sorted(names, key=str.encode)[:3]
+
+
+def test_sorted_order_empty():
+    assert len(FileIndex().sorted_order()) == 0
+
+
+def test_merge_join():
+    a = build("/a", ["same", "only_a", "sub/x", "changed"])
+    b = build("/b", ["changed", "sub/x", "only_b", "same"])
+
+    rows = [(rel, i is not None, j is not None) for rel, i, j in merge_join(a, b)]
+
+    assert rows == [("changed", True, True), ("only_a", True, False), ("only_b", False, True),
+                    ("same", True, True), ("sub/x", True, True)]
+
+
+def test_merge_join_matches_dict_reference():
+    rng = random.Random(1)
+    alphabet = ["a", "b", "/", "é", "中", "x" * 9]
+    pool = sorted({"".join(rng.choice(alphabet) for _ in range(rng.randint(1, 12))) for _ in range(3000)})
+    names_a = rng.sample(pool, 1500)
+    names_b = rng.sample(pool, 1500)
+    a, b = build("/a", names_a), build("/b", names_b)
+
+    rows = list(merge_join(a, b))
+
+    pos_a = {name: i for i, name in enumerate(names_a)}
+    pos_b = {name: j for j, name in enumerate(names_b)}
+    expected = [(name, pos_a.get(name), pos_b.get(name)) for name in sorted(set(pos_a) | set(pos_b), key=str.encode)]
+    assert rows == expected
+
+
+def test_merge_join_empty_sides():
+    a = build("/a", ["x", "y"])
+    assert list(merge_join(a, FileIndex("/b"))) == [("x", 0, None), ("y", 1, None)]
+    assert list(merge_join(FileIndex("/b"), a)) == [("x", None, 0), ("y", None, 1)]
+    assert list(merge_join(FileIndex(), FileIndex())) == []
+
+
+def test_size_groups():
+    index = FileIndex("/r")
+    for name, size in [("a", 5), ("b", 0), ("c", 7), ("d", 5), ("e", 0), ("f", 5), ("g", 7), ("h", 9)]:
+        index.append(FileRecord(f"/r/{name}", size, 0, 0, 0))
+
+    groups = [run.tolist() for run in index.size_groups()]
+
+    # 依大小排序，組內維持加入順序；大小 0 (低於 min_size) 與獨一無二的大小不列入
+    assert groups == [[0, 3, 5], [2, 6]]
+    assert [run.tolist() for run in index.size_groups(min_size=0)] == [[1, 4], [0, 3, 5], [2, 6]]
+    assert FileIndex().size_groups() == []
+
+
+def test_digest_column_and_groups():
+    index = build("/r", ["a", "b", "c", "d", "e"])
+    for i, digest in [(0, "aa" * 64), (1, "bb" * 64), (3, "aa" * 64), (4, "bb" * 64)]:
+        index.set_digest(i, digest)
+
+    assert index.digest(0) == "aa" * 64
+    assert index.digest(2) is None
+    assert [run.tolist() for run in index.digest_groups()] == [[0, 3], [1, 4]]
+    # 只在候選 (例如同大小群組) 中分群；未計算雜湊的 2 不列入
+    assert [run.tolist() for run in index.digest_groups([0, 2, 3, 4])] == [[0, 3]]
+    assert index.digest_groups([2]) == []
+    assert index.memory_bytes() == 5 + 5 * 64 + 6 * 8 + 4 * 5 * 8
+
+
+def test_record_round_trip():
+    index = FileIndex("/root")
+    index.append(FileRecord("/root/d/файл.txt", 5, 6, 7, 8))
+    assert index.record(0) == FileRecord("/root/d/файл.txt", 5, 6, 7, 8)
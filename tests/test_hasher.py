@@ -0,0 +1,98 @@
+# -*- coding: utf-8 -*-
+import io
+import os
+
+import hasher
+from hasher import compare_pairs, files_identical, hash_file, hash_files
+
+
+class ShortReads(io.RawIOBase):
+    """包裝無緩衝檔案，每次最多只回傳 step 個位元組，模擬 NFS / SMB 上的部分讀取"""
+
+    def __init__(self, raw, step):
+        self.raw, self.step = raw, step
+
+    def readable(self):
+        return True
+
+    def readinto(self, buf):
+        with memoryview(buf) as view:
+            return self.raw.readinto(view[:self.step])
+
+    def fileno(self):
+        return self.raw.fileno()
+
+    def close(self):
+        self.raw.close()
+        super().close()
+
+
+def test_files_identical(tmp_path):
+    a, b, c = tmp_path / "a", tmp_path / "b", tmp_path / "c"
+    a.write_bytes(b"x" * 300000)
+    b.write_bytes(b"x" * 300000)
+    c.write_bytes(b"x" * 299999 + b"y")
+
+    assert files_identical(a, b) is True
+    assert files_identical(a, c) is False
+    assert files_identical(a, tmp_path / "missing") is None
+    assert [same for _, same in compare_pairs([(a, b), (a, c)], workers=2)] == [True, False]
+
+
+def test_files_identical_tolerates_short_reads(tmp_path, monkeypatch):
+    data = bytes(range(256)) * 1000
+    a, b = tmp_path / "a", tmp_path / "b"
+    a.write_bytes(data)
+    b.write_bytes(data)
+    steps = iter([1000, 4093])
+
+    def short_open(path, mode="r", buffering=-1):
+        raw = ShortReads(open(path, "rb", buffering=0), next(steps))
+        return raw if buffering == 0 else io.BufferedReader(raw)
+
+    monkeypatch.setattr(hasher, "open", short_open, raising=False)
+    assert files_identical(a, b) is True
+
+
+def test_hash_files_keeps_order_and_uses_cache(tmp_path):
+    paths = []
+    for i in range(20):
+        p = tmp_path / f"{i:02d}"
+        p.write_bytes(str(i).encode())
+        paths.append(str(p))
+
+    class Cache(dict):
+        def get(self, st, algorithm):
+            return dict.get(self, (st.st_ino, algorithm))
+
+        def put(self, st, algorithm, digest):
+            self[(st.st_ino, algorithm)] = digest
+
+    cache = Cache()
+    first = list(hash_files(iter(paths), workers=3, cache=cache))
+    assert [p for p, _ in first] == paths
+    assert [d for _, d in first] == [hash_file(p) for p in paths]
+    assert len(cache) == 20
+
+    cache.clear()
+    cache[(os.stat(paths[0]).st_ino, "blake2b")] = "cached"
+    assert next(hash_files(paths, cache=cache))[1] == "cached"
+
+
+def test_hash_files_parse_when(tmp_path):
+    paths = []
+    for name in ("a", "b"):
+        p = tmp_path / name
+        p.write_bytes(name.encode() * 3)
+        paths.append(str(p))
+    parsed = []
+
+    def parse(buf):
+        parsed.append(bytes(buf))
+        return len(buf)
+
+    results = list(hash_files(paths, parse=parse, parse_when=lambda p: p.endswith("a")))
+
+    assert [(r[0], r[2]) for r in results] == [(paths[0], 3), (paths[1], None)]
+    assert [r[1] for r in results] == [hash_file(p) for p in paths]
+    assert parsed == [b"aaa"]
@@ -0,0 +1,121 @@
+# -*- coding: utf-8 -*-
+import os
+import stat
+
+from actions import apply_action
+from journal import DONE, FAILED, PENDING, UNDONE, Journal
+from mover import MoveExecutor
+
+
+def make_journal(tmp_path):
+    return Journal.create(tmp_path, 'test', journal_dir=tmp_path / "journals")
+
+
+def test_restore_moves_files_back(tmp_path):
+    src = tmp_path / "data" / "a.txt"
+    src.parent.mkdir()
+    src.write_bytes(b"a")
+    with make_journal(tmp_path) as journal:
+        with MoveExecutor(tmp_path / "archive", journal=journal) as mover:
+            mover.submit(src)
+        journal.finish()
+        assert not src.exists()
+
+        assert journal.restore() == (1, [])
+        assert src.read_bytes() == b"a"
+        assert journal.counts() == {UNDONE: 1}
+        assert journal.meta('status') == 'restored'
+
+
+def test_restore_rebuilds_independent_file_for_links(tmp_path):
+    keep, dup = tmp_path / "keep.txt", tmp_path / "dup.txt"
+    keep.write_bytes(b"same")
+    dup.write_bytes(b"same")
+    os.chmod(dup, 0o640)
+    os.utime(dup, ns=(10**18, 10**18))
+    with make_journal(tmp_path) as journal:
+        apply_action('hardlink', dup, keep, MoveExecutor(journal=journal))
+        assert os.path.samefile(dup, keep)
+
+        assert journal.restore() == (1, [])
+
+    st = os.stat(dup)
+    assert not os.path.samefile(dup, keep)
+    assert dup.read_bytes() == b"same"
+    assert stat.S_IMODE(st.st_mode) == 0o640
+    assert st.st_mtime_ns == 10**18
+
+
+def test_restore_undoes_later_entries_first(tmp_path):
+    # 同一路徑先後被搬移兩次：須先還原後一次，才能還原前一次
+    first, second = tmp_path / "first", tmp_path / "second"
+    first.mkdir()
+    second.mkdir()
+    src = tmp_path / "a.txt"
+    src.write_bytes(b"a")
+    with make_journal(tmp_path) as journal:
+        mover = MoveExecutor(journal=journal)
+        moved = mover.submit(src, dest_dir=first)
+        mover.submit(moved, dest_dir=second)
+
+        assert journal.restore() == (2, [])
+    assert src.read_bytes() == b"a"
+    assert os.listdir(first) == os.listdir(second) == []
+
+
+def test_restore_keeps_file_that_reappeared(tmp_path):
+    src = tmp_path / "a.txt"
+    src.write_bytes(b"old")
+    with make_journal(tmp_path) as journal:
+        with MoveExecutor(tmp_path / "archive", journal=journal) as mover:
+            mover.submit(src)
+        src.write_bytes(b"new")
+
+        undone, errors = journal.restore()
+    assert (undone, [path for path, _ in errors]) == (0, [str(src)])
+    assert src.read_bytes() == b"new"
+    assert (tmp_path / "archive" / "a.txt").read_bytes() == b"old"
+
+
+def test_resume_finishes_interrupted_moves(tmp_path):
+    archive = tmp_path / "archive"
+    archive.mkdir()
+    pending, applied, vanished = (tmp_path / name for name in ("pending.txt", "applied.txt", "vanished.txt"))
+    pending.write_bytes(b"p")
+    (archive / "applied.txt").write_bytes(b"a")
+    with make_journal(tmp_path) as journal:
+        # 模擬中斷：日誌已寫入，但處置尚未執行 / 已執行但狀態未更新 / 原檔已不存在
+        journal.begin('move', pending, archive / "pending.txt")
+        journal.begin('move', applied, archive / "applied.txt")
+        journal.begin('move', vanished, archive / "vanished.txt")
+        assert journal.counts() == {PENDING: 3}
+
+        assert journal.resume() == (1, 1)
+        assert journal.counts() == {DONE: 2, FAILED: 1}
+    assert not pending.exists()
+    assert (archive / "pending.txt").read_bytes() == b"p"
+
+
+def test_resume_leaves_unapplied_link_to_rescan(tmp_path):
+    keep, dup = tmp_path / "keep.txt", tmp_path / "dup.txt"
+    keep.write_bytes(b"same")
+    dup.write_bytes(b"same")
+    with make_journal(tmp_path) as journal:
+        journal.begin('hardlink', dup, keep=keep)
+        assert journal.resume() == (0, 1)
+        assert journal.counts() == {FAILED: 1}
+    assert not os.path.samefile(dup, keep)
+
+
+def test_unfinished_lists_interrupted_runs(tmp_path):
+    journal_dir = tmp_path / "journals"
+    with Journal.create(tmp_path, 'a', journal_dir=journal_dir) as finished:
+        finished.finish()
+    with Journal.create(tmp_path, 'b', journal_dir=journal_dir) as running:
+        pass
+    with Journal.create(tmp_path / "other", 'c', journal_dir=journal_dir):
+        pass
+    found = Journal.unfinished(tmp_path, journal_dir=journal_dir)
+    assert [journal.path for journal in found] == [running.path]
+    for journal in found:
+        journal.close()
@@ -0,0 +1,57 @@
+# -*- coding: utf-8 -*-
+import merkle
+from merkle import build_tree, compare_trees
+
+
+def make(root, files):
+    for rel, data in files.items():
+        path = root / rel
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_bytes(data)
+    return root
+
+
+def test_identical_subtrees_are_skipped(tmp_path):
+    files = {"a.txt": b"a", "lib/x.py": b"x", "lib/deep/y.py": b"y"}
+    a = make(tmp_path / "a", files)
+    b = make(tmp_path / "b", dict(files, **{"a.txt": b"A"}))
+
+    stats = {}
+    diff = list(compare_trees(build_tree(a, save=False), build_tree(b, save=False), stats))
+
+    assert diff == [("changed", "a.txt", 1, 1)]
+    assert stats == {"skipped_dirs": 1, "visited_dirs": 1}
+
+
+def test_only_on_one_side(tmp_path):
+    a = make(tmp_path / "a", {"x": b"1", "gone/y": b"22"})
+    b = make(tmp_path / "b", {"x": b"1", "new": b"333"})
+
+    diff = sorted(compare_trees(build_tree(a, save=False), build_tree(b, save=False)))
+
+    assert diff == [("only_a", "gone/y", 2, None), ("only_b", "new", None, 3)]
+
+
+def test_sidecar_avoids_rehashing(tmp_path):
+    root = make(tmp_path / "a", {"x": b"1", "sub/y": b"2"})
+    assert build_tree(root)["rehashed"] == 2
+    (root / "sub" / "z").write_bytes(b"3")
+    assert build_tree(root)["rehashed"] == 1
+
+
+def test_unreadable_files_never_compare_equal(tmp_path, monkeypatch):
+    files = {"ok": b"1", "sub/bad": b"2"}
+    a = make(tmp_path / "a", files)
+    b = make(tmp_path / "b", files)
+    hash_files = merkle.hash_files
+
+    def failing(records, **kwargs):
+        for rec, digest in hash_files(records, **kwargs):
+            yield rec, None if rec.path.endswith("bad") else digest
+
+    monkeypatch.setattr(merkle, "hash_files", failing)
+    tree_a, tree_b = build_tree(a, save=False), build_tree(b, save=False)
+
+    assert tree_a["dirs"]["sub"]["digest"] is None
+    assert tree_a["dirs"][""]["digest"] is None
+    assert list(compare_trees(tree_a, tree_b)) == [("changed", "sub/bad", 1, 1)]
@@ -0,0 +1,56 @@
+# -*- coding: utf-8 -*-
+import os
+
+from mover import MoveExecutor, NamePlanner
+
+
+def test_plan_keeps_first_name_then_numbers(tmp_path):
+    planner = NamePlanner(tmp_path)
+    names = [os.path.basename(planner.plan("foo.pdf")) for _ in range(3)]
+    assert names == ["foo.pdf", "foo_1.pdf", "foo_2.pdf"]
+
+
+def test_plan_skips_existing_files(tmp_path):
+    for name in ("foo.pdf", "foo_1.pdf", "foo_3.pdf"):
+        (tmp_path / name).write_bytes(b"")
+    planner = NamePlanner(tmp_path)
+    names = [os.path.basename(planner.plan("foo.pdf")) for _ in range(3)]
+    assert names == ["foo_2.pdf", "foo_4.pdf", "foo_5.pdf"]
+
+
+def test_plan_numbered_name_collides_with_planned_name(tmp_path):
+    planner = NamePlanner(tmp_path)
+    planner.plan("foo.pdf")
+    assert os.path.basename(planner.plan("foo.pdf")) == "foo_1.pdf"
+    assert os.path.basename(planner.plan("foo_1.pdf")) == "foo_1_1.pdf"
+    assert os.path.basename(planner.plan("foo.pdf")) == "foo_2.pdf"
+
+
+def test_plan_names_without_extension(tmp_path):
+    planner = NamePlanner(tmp_path)
+    assert [os.path.basename(planner.plan("README")) for _ in range(2)] == ["README", "README_1"]
+
+
+def test_executor_moves_same_named_files_without_overwriting(tmp_path):
+    archive = tmp_path / "archive"
+    sources = []
+    for i in range(3):
+        src = tmp_path / f"dir{i}" / "report.pdf"
+        src.parent.mkdir()
+        src.write_bytes(str(i).encode())
+        sources.append(src)
+
+    with MoveExecutor(archive) as mover:
+        dests = [mover.submit(src, size=1) for src in sources]
+
+    assert [os.path.basename(d) for d in dests] == ["report.pdf", "report_1.pdf", "report_2.pdf"]
+    assert [open(d, 'rb').read() for d in dests] == [b"0", b"1", b"2"]
+    assert not any(src.exists() for src in sources)
+    assert (mover.completed, mover.completed_bytes, mover.errors) == (3, 3, [])
+
+
+def test_executor_records_failures(tmp_path):
+    with MoveExecutor(tmp_path / "archive") as mover:
+        mover.submit(tmp_path / "missing.pdf")
+    assert mover.completed == 0
+    assert [os.path.basename(src) for src, _ in mover.errors] == ["missing.pdf"]
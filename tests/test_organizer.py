@@ -0,0 +1,76 @@
+# -*- coding: utf-8 -*-
+import csv
+import multiprocessing
+
+import pytest
+
+pytest.importorskip("fontTools")
+from test_sfnt_reader import build_font  # noqa: E402
+
+from src import organizer  # noqa: E402
+from src.organizer import FIELDNAMES, _audit_one, audit_fonts, run_font_audit  # noqa: E402
+
+
+@pytest.fixture
+def fonts(tmp_path):
+    """一個有效的合成字體與一個損毀的字體"""
+    valid = tmp_path / "fonts" / "valid.ttf"
+    valid.parent.mkdir()
+    valid.write_bytes(build_font({0x41: "g1", 0x42: "g2"}, family="Valid"))
+    corrupt = tmp_path / "fonts" / "corrupt.ttf"
+    corrupt.write_bytes(b"\x00\x01\x00\x00" + b"garbage" * 10)
+    return valid, corrupt
+
+
+def test_audit_one_reports_corrupt_font_as_error_row(fonts):
+    valid, corrupt = fonts
+    [row] = _audit_one((str(corrupt), 5000))
+    assert row['Risk_Tag'].startswith("❌ 損毀或無法解析")
+    assert row['Path'] == str(corrupt)
+
+    [row] = _audit_one((str(valid), 1))
+    assert row['Name'] == "valid"
+    assert row['Count'] == 2
+    assert row['Lang'] == "西文/其他"
+    assert "損毀" not in row['Risk_Tag']
+
+
+def test_audit_one_turns_unexpected_exceptions_into_error_rows(fonts, monkeypatch):
+    def explode(path, threshold):
+        raise RecursionError("cmap 迴圈")
+
+    monkeypatch.setattr(organizer, "analyze_and_filter", explode)
+    [row] = _audit_one((str(fonts[0]), 5000))
+    assert set(row) == set(FIELDNAMES)
+    assert row['Risk_Tag'].startswith("❌ 稽核失敗: RecursionError")
+
+
+def test_audit_fonts_in_process_keeps_order(fonts):
+    valid, corrupt = fonts
+    results = list(audit_fonts([corrupt, valid], 5000, workers=1))
+    assert [rows[0]['Path'] for rows in results] == [str(corrupt), str(valid)]
+    assert results[0][0]['Risk_Tag'].startswith("❌")
+    assert results[1][0]['Count'] == 2
+
+
+@pytest.mark.skipif(multiprocessing.get_start_method() != "fork", reason="需以 fork 建立工作程序")
+def test_audit_fonts_pool_completes_despite_corrupt_font(fonts, tmp_path):
+    valid, corrupt = fonts
+    files = [valid, corrupt, tmp_path / "missing.ttf"] + [valid] * 5
+    results = list(audit_fonts(files, 5000, workers=2))
+    # 程序池路徑：每個檔案一筆結果且順序不變，損毀 / 不存在的檔案只影響自己那一列
+    assert [rows[0]['Path'] for rows in results] == [str(p) for p in files]
+    assert results[1][0]['Risk_Tag'].startswith("❌ 損毀或無法解析")
+    assert results[2][0]['Risk_Tag'].startswith("⚠️ 無法讀取檔案大小")
+    assert all(rows[0]['Count'] == 2 for i, rows in enumerate(results) if i not in (1, 2))
+
+
+def test_run_font_audit_writes_report(fonts, tmp_path):
+    report = tmp_path / "report"
+    run_font_audit(fonts[0].parent, report, 5000, dry_run=False, workers=1)
+    [csv_path] = report.glob("Font_Risk_Report_*.csv")
+    with open(csv_path, encoding="utf-8-sig", newline="") as f:
+        rows = {row['Name']: row for row in csv.DictReader(f)}
+    assert set(rows) == {"valid", "corrupt"}
+    assert rows["corrupt"]['Risk_Tag'].startswith("❌")
+    assert rows["valid"]['Count'] == "2"
@@ -0,0 +1,67 @@
+# -*- coding: utf-8 -*-
+import os
+
+import pytest
+
+from pdf_fulltext import FullTextIndex
+from walker import FileRecord
+
+
+@pytest.fixture
+def index(tmp_path):
+    with FullTextIndex(tmp_path / "fulltext.sqlite3") as idx:
+        yield idx
+
+
+def add(index, path, text="hello"):
+    index.add(FileRecord(path, 1, 1, 1, 1), [text], "test")
+
+
+def paths(index):
+    return sorted(p for (p,) in index.conn.execute("SELECT path FROM docs"))
+
+
+def test_prune_only_removes_missing_documents_under_root(index):
+    root = os.path.join(os.sep, "data", "pdfs")
+    kept = os.path.join(root, "kept.pdf")
+    gone = os.path.join(root, "sub", "gone.pdf")
+    sibling = os.path.join(os.sep, "data", "pdfs_archive", "old.pdf")
+    add(index, kept)
+    add(index, gone)
+    add(index, sibling)
+
+    assert index.prune(root, {kept}) == 1
+    assert paths(index) == sorted([kept, sibling])
+
+
+def test_prune_treats_wildcards_and_case_literally(index):
+    root = os.path.join(os.sep, "data", "a_b%")
+    inside = os.path.join(root, "x.pdf")
+    lookalike = os.path.join(os.sep, "data", "aXbY", "x.pdf")
+    upper = os.path.join(os.sep, "data", "A_B%", "x.pdf")
+    for p in (inside, lookalike, upper):
+        add(index, p)
+
+    assert index.prune(root + os.sep, set()) == 1
+    assert paths(index) == sorted([lookalike, upper])
+
+
+def test_prune_removes_page_text(index):
+    root = os.path.join(os.sep, "docs")
+    add(index, os.path.join(root, "a.pdf"), "unique needle")
+    assert index.search("needle")
+
+    index.prune(root, set())
+
+    assert index.search("needle") == []
+    assert index.count() == (0, 0)
+
+
+def test_search_cjk(index):
+    path = os.path.join(os.sep, "docs", "a.pdf")
+    add(index, path, "這是一份關於重複檔案清理的文件")
+
+    results = index.search("檔案清理")
+
+    assert [(p, page) for p, page, _ in results] == [(path, 1)]
+    assert "[檔案清理]" in results[0][2].replace("][", "")
@@ -0,0 +1,191 @@
+# -*- coding: utf-8 -*-
+import csv
+import json
+import multiprocessing
+import random
+
+import pytest
+
+import pdf_indexer
+from pdf_indexer import (MAX_CHUNK, META_FIELDS, SUMMARY_CHARS, TARGET_CHUNK_BYTES, PDFBackend, ResultSink,
+                         adaptive_chunksize, available_backends, backend_chain, get_file_metadata, run_headless)
+
+
+class StubBackend(PDFBackend):
+    """不讀取檔案的假引擎：module 用標準庫模組，確保一定能載入"""
+    module = "json"
+    result = (1, "")
+
+    def read(self, file_path):
+        if isinstance(self.result, Exception):
+            raise self.result
+        return self.result
+
+    def read_pages(self, file_path):
+        return [self.read(file_path)[1]]
+
+
+def stub(name, result=(1, ""), module="json"):
+    return type(f"Stub_{name}", (StubBackend,), {"name": name, "module": module, "result": result})
+
+
+@pytest.fixture
+def backends(monkeypatch):
+    """以假引擎取代 BACKENDS；回傳設定函式，參數依速度排序"""
+    def install(*classes):
+        monkeypatch.setattr(pdf_indexer, "BACKENDS", {cls.name: cls for cls in classes})
+        monkeypatch.setattr(pdf_indexer, "_loaded", {})
+    return install
+
+
+@pytest.fixture
+def pdf(tmp_path):
+    path = tmp_path / "a.pdf"
+    path.write_bytes(b"%PDF-1.4 stub")
+    return path
+
+
+def test_backend_chain_skips_missing_backends(backends):
+    backends(stub("fast", module="no_such_pdf_module"), stub("mid"), stub("slow"))
+    assert available_backends() == ["mid", "slow"]
+    assert backend_chain() == ["mid", "slow"]
+
+
+def test_backend_chain_puts_preferred_first(backends):
+    backends(stub("fast"), stub("mid"), stub("slow"))
+    assert backend_chain("slow") == ["slow", "fast", "mid"]
+
+
+def test_backend_chain_rejects_missing_preferred_or_no_backends(backends):
+    backends(stub("fast", module="no_such_pdf_module"), stub("slow"))
+    with pytest.raises(ImportError):
+        backend_chain("fast")
+    backends(stub("fast", module="no_such_pdf_module"))
+    with pytest.raises(ImportError):
+        backend_chain()
+
+
+def test_metadata_falls_back_to_next_backend(backends, pdf):
+    backends(stub("broken", RuntimeError("xref 損毀")), stub("garbled", (3, 12345)), stub("good", (7, "  hello\n  world ")))
+    meta = get_file_metadata((pdf, False, ["broken", "garbled", "good"]))
+    assert meta["解析引擎"] == "good"
+    assert meta["頁數"] == 7
+    assert meta["內容摘要"] == "hello world"
+
+
+def test_metadata_uses_first_successful_backend(backends, pdf):
+    backends(stub("first", (2, "x" * 200)), stub("second", RuntimeError("不應被呼叫")))
+    meta = get_file_metadata((pdf, False, ["first", "second"]))
+    assert meta["解析引擎"] == "first"
+    assert meta["內容摘要"] == "x" * SUMMARY_CHARS
+
+
+def test_metadata_reports_error_when_every_backend_fails(backends, pdf):
+    backends(stub("a", RuntimeError("壞掉了")), stub("b", ValueError("也壞了")))
+    meta = get_file_metadata((pdf, False, ["a", "b"]))
+    assert meta["解析引擎"] == ""
+    assert meta["頁數"] == 0
+    assert meta["內容摘要"].startswith("錯誤: b: 也壞了")
+
+
+def test_metadata_image_only_missing_and_dry_run(backends, pdf, tmp_path):
+    backends(stub("good", (4, "   ")))
+    assert get_file_metadata((pdf, False, ["good"]))["內容摘要"] == "影像 PDF (無可視文字)"
+    assert get_file_metadata((tmp_path / "gone.pdf", False, ["good"]))["內容摘要"] == "檔案不存在"
+    dry = get_file_metadata((pdf, True, ["good"]))
+    assert dry["內容摘要"] == "[Dry Run] 模擬完成" and dry["解析引擎"] == ""
+
+
+def test_adaptive_chunksize_extremes():
+    assert adaptive_chunksize([], 4) == 1
+    # 大量小檔案：受 MAX_CHUNK 限制
+    assert adaptive_chunksize([1024] * 100000, 4) == MAX_CHUNK
+    # 大檔案：一批一個
+    assert adaptive_chunksize([TARGET_CHUNK_BYTES * 2] * 1000, 4) == 1
+    # 檔案少：每個行程至少分到 4 批
+    assert adaptive_chunksize([1024] * 64, 4) == 4
+    assert adaptive_chunksize([0] * 10, 8) == 1
+
+
+def test_adaptive_chunksize_stays_within_bounds():
+    rng = random.Random(1)
+    for _ in range(500):
+        sizes = [rng.randrange(0, 1 << rng.randrange(1, 32)) for _ in range(rng.randrange(1, 2000))]
+        workers = rng.randrange(1, 65)
+        chunk = adaptive_chunksize(sizes, workers)
+        assert 1 <= chunk <= MAX_CHUNK
+        assert chunk == 1 or chunk <= len(sizes) // (workers * 4)
+
+
+class ContentBackend(StubBackend):
+    """以檔案內容當作第一頁文字；內容以 BAD 開頭時模擬解析失敗"""
+    name = "content"
+
+    def read(self, file_path):
+        data = open(file_path, "rb").read()
+        if data.startswith(b"BAD"):
+            raise RuntimeError("無法解析")
+        return 1, data.decode()
+
+
+def meta(name):
+    return {"檔案名稱": name, "頁數": 1, "內容摘要": "中文摘要", "修改日期": "2026-01-01 00:00:00",
+            "解析引擎": "stub", "完整路徑": f"/data/{name}"}
+
+
+def test_result_sink_csv_flushes_every_n_rows(tmp_path):
+    out = tmp_path / "out" / "report.csv"
+    with ResultSink(out, "csv", flush_every=2) as sink:
+        sink.write(meta("a.pdf"))
+        sink.write(meta("b.pdf"))
+        # 尚未關閉，但已寫出的兩筆必須能讀到 (中途中斷時報表仍可用)
+        with open(out, encoding="utf-8-sig", newline="") as f:
+            assert [row["檔案名稱"] for row in csv.DictReader(f)] == ["a.pdf", "b.pdf"]
+        sink.write(meta("c.pdf"))
+    assert sink.count == 3
+    with open(out, encoding="utf-8-sig", newline="") as f:
+        reader = csv.DictReader(f)
+        assert reader.fieldnames == META_FIELDS
+        assert [row["檔案名稱"] for row in reader] == ["a.pdf", "b.pdf", "c.pdf"]
+
+
+def test_result_sink_jsonl_and_bad_format(tmp_path):
+    out = tmp_path / "report.jsonl"
+    with ResultSink(out, "jsonl") as sink:
+        sink.write(meta("a.pdf"))
+    text = out.read_text(encoding="utf-8")
+    assert "中文摘要" in text
+    assert [json.loads(line) for line in text.splitlines()] == [meta("a.pdf")]
+    with pytest.raises(ValueError):
+        ResultSink(tmp_path / "report.xml", "xml")
+
+
+@pytest.mark.skipif(multiprocessing.get_start_method() != "fork",
+                    reason="工作行程須以 fork 繼承測試替換的假引擎")
+@pytest.mark.parametrize("fmt", ["csv", "jsonl"])
+def test_run_headless_streams_one_row_per_file(backends, tmp_path, fmt):
+    backends(stub("broken", RuntimeError("永遠失敗")), ContentBackend)
+    source = tmp_path / "pdfs"
+    (source / "sub").mkdir(parents=True)
+    names = []
+    for i in range(30):
+        path = source / ("sub" if i % 3 else "") / f"doc{i:02d}.pdf"
+        path.write_bytes(b"BAD" if i == 7 else f"page {i}".encode())
+        names.append(path.name)
+    (source / "notes.txt").write_text("not a pdf")
+    out = tmp_path / f"report.{fmt}"
+
+    count = run_headless(source, out, workers=3, fmt=fmt)
+
+    if fmt == "csv":
+        with open(out, encoding="utf-8-sig", newline="") as f:
+            rows = list(csv.DictReader(f))
+    else:
+        rows = [json.loads(line) for line in out.read_text(encoding="utf-8").splitlines()]
+    assert count == len(rows) == 30
+    assert sorted(row["檔案名稱"] for row in rows) == sorted(names)
+    by_name = {row["檔案名稱"]: row for row in rows}
+    # 其中一個檔案在工作行程中所有引擎都失敗：記錄為錯誤列，其餘檔案照常完成
+    assert by_name["doc07.pdf"]["內容摘要"].startswith("錯誤: content: 無法解析")
+    assert by_name["doc12.pdf"]["內容摘要"] == "page 12"
+    assert all(row["解析引擎"] == "content" for name, row in by_name.items() if name != "doc07.pdf")
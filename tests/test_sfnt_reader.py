@@ -0,0 +1,149 @@
+# -*- coding: utf-8 -*-
+import glob
+import io
+import struct
+
+import pytest
+
+fontTools = pytest.importorskip("fontTools")
+from fontTools.fontBuilder import FontBuilder  # noqa: E402
+from fontTools.pens.ttGlyphPen import TTGlyphPen  # noqa: E402
+from fontTools.ttLib import TTCollection, TTFont  # noqa: E402
+from fontTools.ttLib.tables.DefaultTable import DefaultTable  # noqa: E402
+
+from sfnt_reader import SfntReader, parse_faces  # noqa: E402
+
+GLYPHS = [".notdef"] + [f"g{i}" for i in range(1, 40)]
+SYSTEM_FONTS = sorted(glob.glob("/usr/share/fonts/**/*.tt[fc]", recursive=True))[:8]
+
+
+def build_font(mapping=None, raw_cmap=None, family="Test"):
+    """以 fontTools 建立最小的 TrueType 字體；raw_cmap 提供時直接寫入手工組成的 cmap 表"""
+    fb = FontBuilder(1000, isTTF=True)
+    fb.setupGlyphOrder(GLYPHS)
+    fb.setupCharacterMap(mapping or {0x41: "g1"})
+    empty = TTGlyphPen(None).glyph()
+    fb.setupGlyf({name: empty for name in GLYPHS})
+    fb.setupHorizontalMetrics({name: (500, 0) for name in GLYPHS})
+    fb.setupHorizontalHeader()
+    fb.setupNameTable({"familyName": family, "styleName": "Regular"})
+    fb.setupOS2()
+    fb.setupPost()
+    if raw_cmap is not None:
+        table = DefaultTable("cmap")
+        table.data = raw_cmap
+        fb.font["cmap"] = table
+    out = io.BytesIO()
+    fb.save(out)
+    return out.getvalue()
+
+
+def fonttools_codes(buf, face=0):
+    with TTFont(io.BytesIO(buf), fontNumber=face) as font:
+        return frozenset(font.getBestCmap())
+
+
+def fast_codes(buf, face=0):
+    return SfntReader(buf).face(face, cmap=True).cmap
+
+
+def cmap_table(platform_id, enc_id, subtable):
+    return struct.pack(">HHHHI", 0, 1, platform_id, enc_id, 12) + subtable
+
+
+def format4(segments, glyph_ids=()):
+    """segments 為 (start, end, delta, range_offset) 的 list，最後自動補上 0xFFFF 區段"""
+    segments = list(segments) + [(0xFFFF, 0xFFFF, 1, 0)]
+    n = len(segments)
+    body = struct.pack(f">{n}H", *(s[1] for s in segments)) + b"\0\0"
+    body += struct.pack(f">{n}H", *(s[0] for s in segments))
+    body += struct.pack(f">{n}H", *(s[2] & 0xFFFF for s in segments))
+    body += struct.pack(f">{n}H", *(s[3] for s in segments))
+    body += struct.pack(f">{len(glyph_ids)}H", *glyph_ids)
+    return struct.pack(">7H", 4, 14 + len(body), 0, n * 2, 0, 0, 0) + body
+
+
+def format12(groups):
+    body = b"".join(struct.pack(">3I", *g) for g in groups)
+    return struct.pack(">HHIII", 12, 0, 16 + len(body), 0, len(groups)) + body
+
+
+def test_format4_matches_fonttools_for_builder_font():
+    # 不連續的字形編號會讓 fontTools 以 idRangeOffset 編碼部分區段
+    mapping = {0x41: "g1", 0x42: "g2", 0x43: "g3", 0x61: "g9", 0x62: "g4", 0x63: "g30",
+               0x4E00: "g5", 0x4E01: "g6", 0xFF01: "g7"}
+    buf = build_font(mapping)
+    assert fast_codes(buf) == fonttools_codes(buf) == frozenset(mapping)
+
+
+def test_format4_handcrafted_edge_cases():
+    segments = [
+        (0x30, 0x31, -0x30, 0),   # 0x30 -> glyph 0 (缺字)，0x31 -> glyph 1
+        (0x41, 0x43, -0x40, 0),   # 連續對應 glyph 1..3
+        (0x61, 0x64, 0, 8),       # 經由 glyphIdArray[0:4]；0x62 對應 glyph 0
+        (0x70, 0x71, 0xFFFF, 14), # glyphIdArray[4:6]：1 + delta 繞回 0
+        (0x80, 0x7F, 0, 0),       # start > end：略過
+    ]
+    glyph_ids = [4, 0, 5, 6, 1, 2]
+    buf = build_font(raw_cmap=cmap_table(3, 1, format4(segments, glyph_ids)))
+    codes = fonttools_codes(buf)
+    assert fast_codes(buf) == codes
+    assert codes == {0x31, 0x41, 0x42, 0x43, 0x61, 0x63, 0x64, 0x71}
+
+
+def test_format4_overlapping_segment_keeps_earlier_mapping():
+    # 後面的區段把 0x42 對應到缺字字形，不會抹除前一個區段的對應
+    segments = [(0x41, 0x43, -0x40, 0), (0x42, 0x42, -0x42, 0)]
+    buf = build_font(raw_cmap=cmap_table(3, 1, format4(segments)))
+    assert fast_codes(buf) == fonttools_codes(buf) == {0x41, 0x42, 0x43}
+
+
+def test_format12_matches_fonttools_for_builder_font():
+    mapping = {0x41: "g1", 0x42: "g2", 0x1F600: "g3", 0x1F601: "g4", 0x20000: "g5", 0x10FFFD: "g6"}
+    buf = build_font(mapping)
+    assert fast_codes(buf) == fonttools_codes(buf) == frozenset(mapping)
+
+
+def test_format12_handcrafted_edge_cases():
+    groups = [
+        (0x41, 0x43, 0),            # 第一個碼位對應 glyph 0
+        (0x42, 0x45, 10),           # 與前一組重疊：略過
+        (0x1F600, 0x1F602, 20),
+        (0x10FFFE, 0x110005, 30),   # 超過 U+10FFFF 的部分截斷
+    ]
+    buf = build_font(raw_cmap=cmap_table(3, 10, format12(groups)))
+    codes = fonttools_codes(buf)
+    assert fast_codes(buf) == codes
+    assert codes == {0x42, 0x43, 0x1F600, 0x1F601, 0x1F602, 0x10FFFE, 0x10FFFF}
+
+
+def test_prefers_same_subtable_as_fonttools():
+    # 同時有 (3,1) 與 (3,10) 時，getBestCmap 選用 (3,10)
+    sub4 = format4([(0x41, 0x41, -0x40, 0)])
+    sub12 = format12([(0x42, 0x42, 2)])
+    raw = struct.pack(">HH", 0, 2) + struct.pack(">HHI", 3, 1, 20) + struct.pack(">HHI", 3, 10, 20 + len(sub4))
+    buf = build_font(raw_cmap=raw + sub4 + sub12)
+    assert fast_codes(buf) == fonttools_codes(buf) == {0x42}
+
+
+def test_collection_faces_match_fonttools():
+    collection = TTCollection()
+    collection.fonts = [TTFont(io.BytesIO(build_font({0x41: "g1"}, family="One"))),
+                        TTFont(io.BytesIO(build_font({0x42: "g2", 0x1F600: "g3"}, family="Two")))]
+    out = io.BytesIO()
+    collection.save(out)
+    buf = out.getvalue()
+
+    faces = parse_faces(buf, cmap=True)
+    assert [face.name(1) for face in faces] == ["One", "Two"]
+    assert [face.cmap for face in faces] == [fonttools_codes(buf, 0), fonttools_codes(buf, 1)]
+
+
+@pytest.mark.skipif(not SYSTEM_FONTS, reason="系統中沒有可比對的字體")
+@pytest.mark.parametrize("path", SYSTEM_FONTS)
+def test_system_fonts_match_fonttools(path):
+    with open(path, "rb") as f:
+        buf = f.read()
+    reader = SfntReader(buf)
+    for face in range(reader.num_faces):
+        assert fast_codes(buf, face) == fonttools_codes(buf, face)
@@ -0,0 +1,218 @@
+# -*- coding: utf-8 -*-
+import threading
+import time
+from contextlib import contextmanager
+
+import pytest
+
+from walker import FileRecord, stat_record
+from watcher import BackgroundHasher, BackgroundWorker, DuplicateIndex
+
+
+def rec(path, size):
+    return FileRecord(path, size, 0, 0, 0)
+
+
+def test_admit_waits_for_second_file_of_same_size():
+    index = DuplicateIndex()
+    a, b, c = rec("/r/a", 5), rec("/r/b", 5), rec("/r/c", 5)
+
+    assert index.admit(a) == []
+    assert index.admit(rec("/r/other", 7)) == []
+    assert index.admit(b) == [a, b]
+    assert index.admit(c) == [c]
+    assert index.files == 4
+
+
+def test_removed_waiting_file_is_not_hashed():
+    index = DuplicateIndex()
+    index.admit(rec("/r/a", 5))
+    index.remove("/r/a")
+    b = rec("/r/b", 5)
+    assert index.admit(b) == []
+    assert index.admit(rec("/r/c", 5))[0] is b
+
+
+def test_keeper_changes_when_removed():
+    index = DuplicateIndex()
+    assert index.add("/r/a", 5, "d") is None
+    assert index.add("/r/b", 5, "d") == "/r/a"
+    index.remove("/r/a")
+    assert index.add("/r/c", 5, "d") is None
+    assert index.add("/r/b", 5, "d") == "/r/c"
+
+
+def test_readmitted_file_with_new_size_leaves_old_group():
+    index = DuplicateIndex()
+    index.admit(rec("/r/a", 5))
+    index.admit(rec("/r/b", 5))
+    assert index.admit(rec("/r/b", 9)) == []
+    # 大小 5 只剩 a：新的同大小檔案只需雜湊自己 (a 已送去雜湊過)
+    assert [r.path for r in index.admit(rec("/r/c", 5))] == ["/r/c"]
+
+
+def test_remove_tree():
+    index = DuplicateIndex()
+    index.admit(rec("/r/sub/a", 5))
+    index.add("/r/sub/a", 5, "d")
+    index.admit(rec("/r/subway", 5))
+    index.remove_tree("/r/sub")
+    assert index.files == 1
+    assert len(index) == 0
+    assert index.add("/r/x", 5, "d") is None
+
+
+def collect(hasher, count, timeout=10):
+    results, deadline = [], time.time() + timeout
+    while len(results) < count and time.time() < deadline:
+        results.extend(hasher.results())
+        time.sleep(0.01)
+    return results
+
+
+def test_background_hasher(tmp_path):
+    paths = []
+    for i in range(10):
+        p = tmp_path / str(i)
+        p.write_bytes(b"same" if i % 2 else str(i).encode() * 4)
+        paths.append(p)
+    records = [stat_record(p) for p in paths]
+
+    with BackgroundHasher() as hasher:
+        hasher.submit(records[:5])
+        hasher.submit(records[5:])
+        results = collect(hasher, 10)
+
+    assert [r for r, _ in results] == records
+    assert len({d for r, d in results if r.path.endswith(("1", "3", "5", "7", "9"))}) == 1
+
+
+def test_background_hasher_opens_cache_in_worker_thread(tmp_path):
+    opened = []
+
+    class Cache:
+        def __init__(self):
+            opened.append(threading.current_thread())
+
+        def get(self, st, algorithm):
+            return None
+
+        def put(self, st, algorithm, digest):
+            pass
+
+        def close(self):
+            opened.append("closed")
+
+    (tmp_path / "a").write_bytes(b"a")
+    with BackgroundHasher(Cache) as hasher:
+        hasher.submit([stat_record(tmp_path / "a")])
+        assert len(collect(hasher, 1)) == 1
+    assert opened[0] is not threading.current_thread()
+    assert opened[-1] == "closed"
+
+
+def test_background_hasher_reraises_worker_errors():
+    def broken():
+        raise RuntimeError("cache unavailable")
+
+    hasher = BackgroundHasher(broken)
+    try:
+        hasher._thread.join(5)
+        with pytest.raises(RuntimeError):
+            list(hasher.results())
+    finally:
+        hasher.close()
+
+
+def test_background_worker_runs_jobs_in_order_and_survives_failures():
+    events = []
+
+    @contextmanager
+    def open_state():
+        events.append(("open", threading.current_thread()))
+        yield "state"
+        events.append(("close", threading.current_thread()))
+
+    def handle(state, job):
+        if job == 2:
+            raise ValueError("內容不同")
+        return state, job * 10
+
+    with BackgroundWorker(open_state, handle) as worker:
+        for job in range(5):
+            worker.submit(job)
+        results = collect(worker, 5)
+
+    assert [job for job, _, _ in results] == [0, 1, 2, 3, 4]
+    assert [value for _, value, _ in results] == [("state", 0), ("state", 10), None, ("state", 30), ("state", 40)]
+    assert isinstance(results[2][2], ValueError)
+    assert [kind for kind, _ in events] == ["open", "close"]
+    assert all(thread is not threading.current_thread() for _, thread in events)
+
+
+def test_background_worker_submit_does_not_wait_for_slow_jobs():
+    release = threading.Event()
+
+    @contextmanager
+    def open_state():
+        yield None
+
+    with BackgroundWorker(open_state, lambda state, job: release.wait(10)) as worker:
+        start = time.monotonic()
+        for job in range(3):
+            worker.submit(job)
+        assert time.monotonic() - start < 1
+        assert list(worker.results()) == []
+        release.set()
+        assert len(collect(worker, 3)) == 3
+
+
+def test_background_worker_reraises_setup_errors():
+    def open_state():
+        raise RuntimeError("journal unavailable")
+
+    worker = BackgroundWorker(open_state, lambda state, job: job)
+    try:
+        worker._thread.join(5)
+        with pytest.raises(RuntimeError):
+            list(worker.results())
+        with pytest.raises(RuntimeError):
+            worker.submit(1)
+    finally:
+        worker.close()
+
+
+def test_background_worker_verifies_and_moves_with_thread_local_journal(tmp_path):
+    from actions import apply_action
+    from journal import DONE, Journal
+    from mover import MoveExecutor
+
+    root = tmp_path / "data"
+    root.mkdir()
+    (root / "keep").write_bytes(b"x" * 5000)
+    (root / "dup").write_bytes(b"x" * 5000)
+    (root / "diff").write_bytes(b"x" * 4999 + b"y")
+    journal_dir = tmp_path / "journals"
+
+    @contextmanager
+    def open_state():
+        # SQLite 連線只在背景執行緒內建立與使用
+        with Journal.create(root, 'test', journal_dir=journal_dir) as journal:
+            with MoveExecutor(tmp_path / "archive", journal=journal) as mover:
+                yield mover
+            journal.finish()
+
+    def handle(mover, dup):
+        return apply_action('move', root / dup, root / "keep", mover)
+
+    with BackgroundWorker(open_state, handle) as worker:
+        worker.submit("dup")
+        worker.submit("diff")
+        results = collect(worker, 2)
+
+    assert results[0][2] is None
+    assert isinstance(results[1][2], ValueError)  # 逐位元組驗證失敗，不處置
+    assert not (root / "dup").exists() and (root / "diff").exists()
+    [path] = Journal.all(journal_dir)
+    with Journal(path) as journal:
+        assert journal.counts() == {DONE: 1}